@@ -0,0 +1,6 @@
+"""Run the production server: ``python -m app``."""
+
+from app.server import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Upstream API clients."""
@@ -0,0 +1,304 @@
+"""HTTP client factory for upstream (OpenAI-compatible) backends."""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Optional, cast
+
+import httpx
+
+from app.utils.concurrency_limit import BYPASS_LIMIT_EXTENSION, AIMDLimiter, is_drop
+from app.utils.deadline import get_deadline
+from app.utils.inflight import STAGE_UPSTREAM, get_current_inflight
+from app.utils.metrics import UPSTREAM_REQUEST_DURATION, UPSTREAM_RESPONSES
+from app.utils.request_id import REQUEST_ID_HEADER, get_request_id
+from app.utils import timing
+from app.utils.tracing import STAGE_UPSTREAM_TTFB, TRACEPARENT_HEADER, tracer
+
+_START_NS_EXTENSION = "proxy_start_ns"
+
+
+async def inject_correlation_headers(request: httpx.Request) -> None:
+    """Forward the current request ID and trace context to the upstream.
+
+    Args:
+        request: Outgoing upstream request
+    """
+    request_id = get_request_id()
+    if request_id is not None and REQUEST_ID_HEADER not in request.headers:
+        request.headers[REQUEST_ID_HEADER] = request_id
+
+    span = tracer.current_span()
+    if span is not None:
+        request.headers[TRACEPARENT_HEADER] = span.traceparent()
+    request.extensions[_START_NS_EXTENSION] = time.time_ns()
+
+
+async def track_inflight_upstream(request: httpx.Request) -> None:
+    """Report the backend of the current request to the in-flight registry.
+
+    Args:
+        request: Outgoing upstream request
+    """
+    entry = get_current_inflight()
+    if entry is not None:
+        entry.backend = request.url.host
+        entry.stage = STAGE_UPSTREAM
+
+
+async def apply_deadline(request: httpx.Request) -> None:
+    """Cap the upstream timeouts at the current request's remaining budget.
+
+    Args:
+        request: Outgoing upstream request
+
+    Raises:
+        DeadlineExceededException: If the budget is already exhausted
+    """
+    deadline = get_deadline()
+    if deadline is None:
+        return
+    deadline.check()
+    remaining = deadline.remaining()
+    timeouts = dict(request.extensions.get("timeout", {}))
+    for phase in ("connect", "read", "write", "pool"):
+        current = timeouts.get(phase)
+        timeouts[phase] = remaining if current is None else min(current, remaining)
+    request.extensions["timeout"] = timeouts
+
+
+async def record_upstream_ttfb(response: httpx.Response) -> None:
+    """Record the time until upstream response headers arrived.
+
+    The time is added to the request's Server-Timing breakdown and recorded
+    as a trace span.
+
+    Args:
+        response: Upstream response with headers received
+    """
+    start_ns = response.request.extensions.get(_START_NS_EXTENSION)
+    if start_ns is not None:
+        end_ns = time.time_ns()
+        timing.record_stage(timing.STAGE_UPSTREAM_TTFB, (end_ns - start_ns) / 1e9)
+        tracer.record_span(
+            STAGE_UPSTREAM_TTFB,
+            start_ns,
+            end_ns,
+            backend=response.request.url.host,
+            http_status_code=response.status_code,
+        )
+
+
+async def observe_upstream_response(response: httpx.Response) -> None:
+    """Count the upstream response and time the request until its body closes.
+
+    The time from the response headers until the body closed is added to
+    the request's Server-Timing breakdown.
+
+    Args:
+        response: Upstream response with headers received
+    """
+    backend = response.request.url.host
+    UPSTREAM_RESPONSES.labels(backend, str(response.status_code)).inc()
+    start_ns = response.request.extensions.get(_START_NS_EXTENSION)
+    if start_ns is None:
+        return
+    duration = UPSTREAM_REQUEST_DURATION.labels(backend)
+    headers_ns = time.time_ns()
+
+    def observe() -> None:
+        end_ns = time.time_ns()
+        duration.observe((end_ns - start_ns) / 1e9)
+        timing.record_stage(timing.STAGE_UPSTREAM_BODY, (end_ns - headers_ns) / 1e9)
+
+    if response.is_closed:
+        observe()
+    else:
+        response.stream = _ClosingStream(
+            cast(httpx.AsyncByteStream, response.stream), observe
+        )
+
+
+class _ClosingStream(httpx.AsyncByteStream):
+    """Response body that calls ``on_close`` once when closed."""
+
+    def __init__(
+        self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]
+    ) -> None:
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close()
+
+
+class LimitedTransport(httpx.AsyncBaseTransport):
+    """Transport that holds an adaptive concurrency slot per request.
+
+    The slot is held until the response body is closed, so streamed
+    generations count against the limit for their whole duration. The
+    time to response headers and the status code feed the limiter, as do
+    transport errors; cancelled requests only free their slot. The wait
+    for a slot is reported as the request's upstream queue time.
+    Requests carrying the :data:`BYPASS_LIMIT_EXTENSION` extension skip it.
+
+    Args:
+        transport: Transport that sends the requests
+        limiter: Limiter for the backend behind ``transport``
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: AIMDLimiter):
+        self.transport = transport
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request once the limiter admits it."""
+        if request.extensions.get(BYPASS_LIMIT_EXTENSION):
+            return await self.transport.handle_async_request(request)
+
+        queued_ns = time.time_ns()
+        started = await self.limiter.acquire()
+        sent_ns = time.time_ns()
+        timing.record_stage(timing.STAGE_UPSTREAM_QUEUE, (sent_ns - queued_ns) / 1e9)
+        # Time to first byte is measured from leaving the queue
+        request.extensions[_START_NS_EXTENSION] = sent_ns
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TransportError:
+            # Connection failures and timeouts signal an overloaded backend
+            self.limiter.release(started, None, dropped=True)
+            raise
+        except BaseException:
+            # Cancellation (client gone, deadline, shutdown) and other
+            # failures of our own say nothing about the backend
+            self.limiter.abandon()
+            raise
+        latency = time.monotonic() - started
+        dropped = is_drop(response.status_code)
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.limiter.release(started, latency, dropped)
+
+        if response.is_closed:
+            # Body already buffered (e.g. a response built from content)
+            release()
+        else:
+            response.stream = _ClosingStream(
+                cast(httpx.AsyncByteStream, response.stream), release
+            )
+        return response
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self.transport.aclose()
+
+
+def create_http_client(**kwargs: Any) -> httpx.AsyncClient:
+    """Create an HTTP client for upstream calls.
+
+    The client is suitable as the ``http_client`` of the OpenAI SDK. It
+    attaches correlation and trace headers to every outgoing request,
+    reports the backend to the in-flight registry, caps its timeouts at the
+    remaining request deadline, records the upstream time to first byte as
+    a span and observes the upstream response metrics.
+
+    Args:
+        **kwargs: Additional ``httpx.AsyncClient`` arguments
+
+    Returns:
+        Configured async HTTP client
+    """
+    event_hooks = kwargs.pop("event_hooks", {})
+    request_hooks = [
+        inject_correlation_headers,
+        track_inflight_upstream,
+        apply_deadline,
+        *event_hooks.get("request", []),
+    ]
+    response_hooks = [
+        record_upstream_ttfb,
+        observe_upstream_response,
+        *event_hooks.get("response", []),
+    ]
+    return httpx.AsyncClient(
+        event_hooks={
+            **event_hooks,
+            "request": request_hooks,
+            "response": response_hooks,
+        },
+        **kwargs,
+    )
+
+
+def create_upstream_client(
+    base_url: str,
+    api_key: Optional[str] = None,
+    limiter: Optional[AIMDLimiter] = None,
+    **kwargs: Any,
+) -> httpx.AsyncClient:
+    """Create the shared client for an upstream backend.
+
+    Args:
+        base_url: Backend base URL, e.g. ``https://api.openai.com/v1``
+        api_key: Bearer token sent with every request
+        limiter: Adaptive concurrency limit for requests to the backend
+        **kwargs: Additional ``httpx.AsyncClient`` arguments
+
+    Returns:
+        Configured async HTTP client
+    """
+    headers = dict(kwargs.pop("headers", {}))
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    if limiter is not None:
+        transport = kwargs.pop("transport", None)
+        if transport is None:
+            # The client ignores pool limits once a transport is given
+            pool = {"limits": kwargs.pop("limits")} if "limits" in kwargs else {}
+            transport = httpx.AsyncHTTPTransport(**pool)
+        kwargs["transport"] = LimitedTransport(transport, limiter)
+    return create_http_client(base_url=base_url, headers=headers, **kwargs)
+
+
+async def warm_connections(
+    client: httpx.AsyncClient, count: int, timeout: float, path: str = "/models"
+) -> int:
+    """Open ``count`` keep-alive connections to the client's backend.
+
+    Concurrent requests force the pool to open separate connections (and
+    complete their TLS handshakes); the connections stay pooled afterwards.
+    Any HTTP response counts, including authentication errors.
+
+    Args:
+        client: Upstream client
+        count: Number of connections to open
+        timeout: Timeout per request in seconds
+        path: Cheap endpoint to request
+
+    Returns:
+        Number of connections established
+    """
+
+    async def _open() -> None:
+        response = await client.get(
+            path, timeout=timeout, extensions={BYPASS_LIMIT_EXTENSION: True}
+        )
+        await response.aread()
+
+    results = await asyncio.gather(
+        *(_open() for _ in range(count)), return_exceptions=True
+    )
+    return sum(1 for result in results if not isinstance(result, BaseException))
@@ -1,6 +1,36 @@
-"""Application configuration management."""
+"""Application configuration management.
 
-from pydantic_settings import BaseSettings, SettingsConfigDict
+Settings come from ``APP_*`` environment variables, ``.env`` and an optional
+JSON or TOML file named by ``APP_CONFIG_FILE``. The current snapshot lives
+in a :class:`ConfigStore` and can be replaced at runtime (see
+``app.utils.config_reload``); the module-level ``settings`` object always
+resolves to the snapshot pinned for the current request, or the latest
+snapshot outside of a request.
+"""
+
+import os
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Type, cast
+
+from pydantic import field_validator
+from pydantic_settings import (
+    BaseSettings,
+    JsonConfigSettingsSource,
+    PydanticBaseSettingsSource,
+    SettingsConfigDict,
+    TomlConfigSettingsSource,
+)
+
+from app.utils.load_shedding import validate_priority_classes
+from app.utils.log_sampling import parse_sample_ratios
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+CONFIG_FILE_ENV = "APP_CONFIG_FILE"
+
+# Metrics label of requested models that are not configured
+OTHER_MODEL = "other"
 
 
 class Settings(BaseSettings):
@@ -15,9 +45,121 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 11434
 
+    # Upstream OpenAI-compatible backend
+    openai_api_base_url: str = "https://api.openai.com/v1"
+    openai_api_key: Optional[str] = None
+
+    # Startup warm-up; readiness is reported only once it finishes
+    warmup_upstream_connections: int = 2
+    warmup_timeout: float = 5.0
+
+    # Background upstream health probing for /health/ready
+    health_probe_interval: float = 5.0
+    health_probe_timeout: float = 2.0
+    health_cache_ttl: float = 15.0
+    breaker_failure_threshold: int = 3
+    breaker_reset_timeout: float = 30.0
+
+    # Adaptive (AIMD) concurrency limit per upstream backend
+    upstream_initial_concurrency: int = 16
+    upstream_min_concurrency: int = 1
+    upstream_max_concurrency: int = 256
+    upstream_limit_backoff_ratio: float = 0.9
+    upstream_latency_tolerance: float = 2.0
+
+    # Request deadlines: default budget in seconds (0 disables) and
+    # budgets by path prefix as a JSON object, e.g. {"/api/embed": 30}
+    request_timeout: float = 600.0
+    route_timeouts: Dict[str, float] = {}
+
+    # Admission control for upstream-bound requests (model limits and
+    # tenant weights are JSON objects, e.g. {"llama3": 4})
+    admission_max_concurrency: int = 64
+    admission_model_limits: Dict[str, int] = {}
+    admission_default_model_limit: int = 0
+    admission_max_queue_size: int = 256
+    admission_max_queue_wait: float = 30.0
+    admission_tenant_header: str = "X-Tenant-ID"
+    admission_tenant_weights: Dict[str, int] = {}
+
+    # Priority classes (interactive, batch, background) by API key and path
+    # prefix; the priority header can only lower a request's class
+    priority_header: str = "X-Priority"
+    priority_api_keys: Dict[str, str] = {}
+    priority_routes: Dict[str, str] = {
+        "/api/embed": "background",
+        "/api/embeddings": "background",
+        "/v1/embeddings": "background",
+    }
+
+    # Load shedding: SLOs (0 disables a signal), the load pressure at which
+    # each class is shed, and how long a shed request may be deferred
+    slo_p99_latency: float = 10.0
+    slo_queue_depth: int = 64
+    shed_thresholds: Dict[str, float] = {"batch": 1.5, "background": 1.0}
+    shed_window: float = 30.0
+    shed_retry_after: float = 5.0
+    shed_defer_timeout: float = 0.0
+
+    # Distinct translated tools catalogues kept serialized, and the total
+    # bytes they may hold (raw and translated JSON)
+    tools_cache_max_entries: int = 256
+    tools_cache_max_bytes: int = 16 * 1024 * 1024
+    # Distinct structured-output format schemas kept converted, and the
+    # total bytes they may hold (serialized response formats)
+    format_cache_max_entries: int = 128
+    format_cache_max_bytes: int = 16 * 1024 * 1024
+
+    # Production launcher (python -m app); workers=0 means one per CPU core
+    workers: int = 0
+    reuse_port: bool = False
+
+    # Seconds in-flight requests may keep running after SIGTERM
+    drain_timeout: float = 30.0
+
+    # Shared directory for aggregating metrics across workers
+    metrics_dir: Optional[str] = None
+    metrics_snapshot_interval: float = 5.0
+    # Models reported by name in per-model metrics, in addition to the
+    # admission_model_limits keys; any other model is reported as "other"
+    metrics_models: FrozenSet[str] = frozenset()
+
+    # Debug mode enables costlier diagnostics
+    debug: bool = False
+
     # Logging configuration
     log_level: str = "INFO"
 
+    # Event loop monitoring (block detection runs in debug mode only)
+    loop_monitor_interval: float = 0.25
+    loop_lag_warning_threshold: float = 0.1
+    loop_block_threshold: float = 0.1
+
+    # Request correlation
+    trust_inbound_request_id: bool = False
+
+    # Add a server_timing field to the final chunk of NDJSON streams
+    server_timing_stream_trailer: bool = False
+
+    # Admin/debug endpoints are disabled unless a token is configured
+    admin_token: Optional[str] = None
+    profiler_sample_rate_hz: int = 100
+    profiler_max_seconds: float = 300.0
+
+    # Tracing configuration (exporter: none, console, file or otlp)
+    tracing_exporter: str = "none"
+    tracing_file_path: str = "traces.jsonl"
+    tracing_otlp_endpoint: str = "http://localhost:4318"
+    tracing_sample_ratio: float = 0.01
+    tracing_slow_threshold: float = 1.0
+
+    # Hot reload: the config file is watched, and SIGHUP reloads everything
+    config_file: Optional[str] = None
+    config_watch_interval: float = 2.0
+
+    # Log sampling ratios ("event=ratio,..."); overrides LOG_SAMPLE_RATIOS
+    log_sample_ratios: Optional[str] = None
+
     model_config = SettingsConfigDict(
         env_prefix="APP_",
         case_sensitive=False,
@@ -25,6 +167,143 @@ class Settings(BaseSettings):
         extra="ignore",
     )
 
+    @field_validator("log_sample_ratios")
+    @classmethod
+    def _validate_log_sample_ratios(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            parse_sample_ratios(value)
+        return value
+
+    @field_validator("priority_api_keys", "priority_routes")
+    @classmethod
+    def _validate_priority_mapping(cls, value: Dict[str, str]) -> Dict[str, str]:
+        validate_priority_classes(value.values())
+        return value
+
+    @field_validator("shed_thresholds")
+    @classmethod
+    def _validate_shed_thresholds(cls, value: Dict[str, float]) -> Dict[str, float]:
+        validate_priority_classes(value)
+        return value
+
+    def model_label(self, model: str) -> str:
+        """Bounded metrics label for a requested model.
+
+        Model names come from request bodies, so only configured models
+        are used as label values; other names become ``"other"``.
+        """
+        if not model or model in self.metrics_models:
+            return model
+        return model if model in self.admission_model_limits else OTHER_MODEL
+
+    @classmethod
+    def settings_customise_sources(
+        cls,
+        settings_cls: Type[BaseSettings],
+        init_settings: PydanticBaseSettingsSource,
+        env_settings: PydanticBaseSettingsSource,
+        dotenv_settings: PydanticBaseSettingsSource,
+        file_secret_settings: PydanticBaseSettingsSource,
+    ) -> Tuple[PydanticBaseSettingsSource, ...]:
+        """Add the config file below environment variables in priority."""
+        sources = [init_settings, env_settings, dotenv_settings]
+        config_file = os.getenv(CONFIG_FILE_ENV)
+        if config_file:
+            if config_file.endswith(".toml"):
+                sources.append(
+                    TomlConfigSettingsSource(settings_cls, toml_file=config_file)
+                )
+            else:
+                sources.append(
+                    JsonConfigSettingsSource(settings_cls, json_file=config_file)
+                )
+        return (*sources, file_secret_settings)
+
+
+SettingsListener = Callable[[Settings, Settings], None]
+
+# Snapshot pinned for the duration of a request
+current_settings: ContextVar[Optional[Settings]] = ContextVar(
+    "current_settings", default=None
+)
+
+
+class ConfigStore:
+    """Hold the current settings snapshot and swap it atomically.
+
+    Snapshots are never mutated by a reload; a new validated ``Settings``
+    replaces the reference in one assignment, so readers see either the
+    old or the new snapshot in full.
+    """
+
+    def __init__(self, initial: Settings) -> None:
+        self._current = initial
+        self._listeners: List[SettingsListener] = []
+
+    @property
+    def current(self) -> Settings:
+        """Latest settings snapshot."""
+        return self._current
+
+    def get(self) -> Settings:
+        """Snapshot pinned for the current request, else the latest one."""
+        return current_settings.get() or self._current
+
+    def pin(self) -> "Token[Optional[Settings]]":
+        """Pin the latest snapshot for the current request."""
+        return current_settings.set(self._current)
+
+    def subscribe(self, listener: SettingsListener) -> None:
+        """Call ``listener(old, new)`` after every successful reload.
+
+        A listener that raises is logged; the new snapshot stays in place
+        and the remaining listeners still run.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: SettingsListener) -> None:
+        """Remove a reload listener."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def reload(self) -> Settings:
+        """Load and validate new settings, then swap them in.
+
+        Returns:
+            The new snapshot
+
+        Raises:
+            pydantic.ValidationError: If the new settings are invalid; the
+                current snapshot is kept
+        """
+        new = Settings()
+        old, self._current = self._current, new
+        for listener in list(self._listeners):
+            try:
+                listener(old, new)
+            except Exception as e:
+                logger.error(
+                    "config_listener_failed",
+                    listener=getattr(listener, "__qualname__", repr(listener)),
+                    error=str(e),
+                )
+        return new
+
+
+config_store = ConfigStore(Settings())
+
+
+class _SettingsProxy:
+    """Resolve attribute access to the active settings snapshot."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(config_store.get(), name)
+
+    def __repr__(self) -> str:
+        return repr(config_store.get())
+
 
-# Create global settings instance - can be overridden
-settings = Settings()
+# Global settings; always reflects the active snapshot
+settings = cast(Settings, _SettingsProxy())
@@ -0,0 +1,107 @@
+"""Admin-only debugging endpoint handlers."""
+
+import asyncio
+import secrets
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.utils.errors import ConflictException, ForbiddenException, NotFoundException
+from app.utils.inflight import registry
+from app.utils.logging import get_logger
+from app.utils.profiler import profile
+
+logger = get_logger(__name__)
+
+
+async def require_admin(
+    x_admin_token: Optional[str] = Header(None),
+    authorization: Optional[str] = Header(None),
+) -> None:
+    """Allow the request only if it carries the configured admin token.
+
+    The token is accepted from ``X-Admin-Token`` or an ``Authorization:
+    Bearer`` header. Debug endpoints are disabled when no token is set.
+
+    Raises:
+        ForbiddenException: If debug endpoints are disabled or the token is
+            missing or wrong
+    """
+    expected = settings.admin_token
+    if not expected:
+        raise ForbiddenException("Debug endpoints are disabled")
+
+    token = x_admin_token
+    if token is None and authorization and authorization.startswith("Bearer "):
+        token = authorization[len("Bearer ") :]
+
+    if token is None or not secrets.compare_digest(token, expected):
+        raise ForbiddenException("Invalid admin token")
+
+
+# Create router for debug endpoints
+router = APIRouter(prefix="/debug", dependencies=[Depends(require_admin)])
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_endpoint(
+    seconds: float = Query(30.0, gt=0),
+    rate: Optional[int] = Query(None, gt=0, le=1000),
+) -> PlainTextResponse:
+    """Sample all thread stacks and return collapsed-stack output.
+
+    Args:
+        seconds: Sampling duration (capped by ``profiler_max_seconds``)
+        rate: Samples per second (defaults to ``profiler_sample_rate_hz``)
+
+    Returns:
+        Collapsed stacks, one ``stack count`` line each, suitable for
+        flamegraph.pl, speedscope or inferno.
+
+    Raises:
+        ConflictException: If a profiling session is already running
+    """
+    seconds = min(seconds, settings.profiler_max_seconds)
+    rate_hz = rate or settings.profiler_sample_rate_hz
+
+    logger.info("profile_started", seconds=seconds, rate_hz=rate_hz)
+    output = await asyncio.to_thread(profile, seconds, rate_hz)
+    if output is None:
+        raise ConflictException("A profiling session is already running")
+
+    logger.info("profile_completed", stacks=output.count("\n"))
+    return PlainTextResponse(output)
+
+
+@router.get("/requests")
+async def list_requests() -> Dict[str, Any]:
+    """List in-flight requests.
+
+    Returns:
+        Every in-flight request with its route, model, backend, elapsed
+        time, bytes sent and pipeline stage.
+    """
+    requests = [entry.to_dict() for entry in registry.snapshot()]
+    return {"count": len(requests), "requests": requests}
+
+
+@router.delete("/requests/{request_id}")
+async def cancel_request(request_id: str) -> Dict[str, Any]:
+    """Cancel the in-flight requests with an ID.
+
+    Args:
+        request_id: ID of the requests to cancel
+
+    Returns:
+        Confirmation of the cancellation
+
+    Raises:
+        NotFoundException: If no such request is in flight
+    """
+    if not registry.cancel(request_id, "Request cancelled by administrator"):
+        raise NotFoundException("Request not found", details={"request_id": request_id})
+
+    logger.info("request_cancel_requested", target_request_id=request_id)
+    return {"request_id": request_id, "cancelled": True}
@@ -1,15 +1,17 @@
 """Health check endpoint handler."""
 
-from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from app.config import settings
-from app.utils.logging import get_logger
-
-logger = get_logger(__name__)
+from app.utils.concurrency_limit import AIMDLimiter
+from app.utils.lifecycle import lifecycle
+from app.utils.load_shedding import shedder
+from app.utils.static_responses import StaticJSONResponse, TimestampedJSONResponse
+from app.utils.upstream_health import UpstreamProber
 
 
 class HealthResponse(BaseModel):
@@ -21,24 +23,122 @@ class HealthResponse(BaseModel):
     timestamp: str
 
 
+class ConcurrencyStatus(BaseModel):
+    """Adaptive concurrency limit of one upstream backend."""
+
+    limit: int
+    in_flight: int
+    waiting: int
+
+
+class BackendStatus(BaseModel):
+    """Cached health of one upstream backend."""
+
+    healthy: bool
+    latency_ms: Optional[float] = None
+    breaker: str
+    checked_ago_s: Optional[float] = None
+    error: Optional[str] = None
+    concurrency: Optional[ConcurrencyStatus] = None
+
+
+class LoadStatus(BaseModel):
+    """Load relative to the SLOs, for autoscalers."""
+
+    pressure: float
+    p99_latency_s: Optional[float] = None
+    queued: int
+    shedding: List[str]
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness check response model."""
+
+    status: str
+    draining: bool
+    backends: Dict[str, BackendStatus]
+    load: LoadStatus
+
+
+def _health_content(timestamp: str) -> Dict[str, Any]:
+    return {
+        "status": "healthy",
+        "version": settings.app_version,
+        "environment": settings.environment,
+        "timestamp": timestamp,
+    }
+
+
+# Probe bodies are pre-serialized; /health is rebuilt at most once a second
+_HEALTH = TimestampedJSONResponse(_health_content)
+_LIVE = StaticJSONResponse({"status": "alive"})
+
 # Create router for health endpoints
 router = APIRouter()
 
 
 @router.get("/health", response_model=HealthResponse)
-async def health_check() -> Dict[str, Any]:
+async def health_check() -> Response:
     """Health check endpoint.
 
+    ``HealthResponse`` documents the body; the cached bytes are returned as
+    is, without per-request validation.
+
     Returns:
-        Health status with version and environment information.
+        Health status with version and environment information; the
+        timestamp has one-second resolution.
     """
-    response = {
-        "status": "healthy",
-        "version": settings.app_version,
-        "environment": settings.environment,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-    }
+    return _HEALTH.response()
+
 
-    logger.debug("health_check_requested", response=response)
+@router.get("/health/live", response_class=Response)
+async def liveness() -> Response:
+    """Liveness probe: the process is up and its event loop is serving.
 
-    return response
+    Returns:
+        A constant ``{"status": "alive"}`` body.
+    """
+    return _LIVE.response()
+
+
+@router.get(
+    "/health/ready",
+    response_model=ReadinessResponse,
+    responses={503: {"model": ReadinessResponse}},
+)
+async def readiness(request: Request) -> JSONResponse:
+    """Readiness probe: startup finished, not draining, an upstream is healthy.
+
+    Upstream health comes from the background prober's cache; this endpoint
+    never calls an upstream itself. Load shedding does not fail readiness
+    (interactive traffic is still served); the ``load`` section reports the
+    saturation instead.
+
+    Returns:
+        Readiness with per-backend latency, breaker state and adaptive
+        concurrency limit, plus the load pressure and the priority classes
+        being shed; 503 when the process should not receive traffic.
+    """
+    prober: Optional[UpstreamProber] = getattr(
+        request.app.state, "upstream_prober", None
+    )
+    limiters: Dict[str, AIMDLimiter] = getattr(
+        request.app.state, "upstream_limiters", {}
+    )
+    backends = prober.snapshot() if prober is not None else {}
+    for name, entry in backends.items():
+        if name in limiters:
+            entry["concurrency"] = limiters[name].to_dict()
+    ready = (
+        lifecycle.ready
+        and not lifecycle.draining
+        and prober is not None
+        and prober.any_healthy()
+    )
+    body = ReadinessResponse(
+        status="ready" if ready else "not_ready",
+        draining=lifecycle.draining,
+        backends={name: BackendStatus(**entry) for name, entry in backends.items()},
+        load=LoadStatus(**shedder.snapshot()),
+    )
+    return JSONResponse(status_code=200 if ready else 503, content=body.model_dump())
@@ -0,0 +1,24 @@
+"""Prometheus metrics endpoint handler."""
+
+from fastapi import APIRouter, Response
+
+from app.config import settings
+from app.utils.metrics import CONTENT_TYPE_LATEST, REGISTRY, render_multiprocess
+
+# Create router for metrics endpoints
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=Response)
+async def metrics() -> Response:
+    """Prometheus metrics endpoint.
+
+    Returns:
+        All registered metrics in the Prometheus text exposition format,
+        aggregated across workers when a metrics directory is configured.
+    """
+    if settings.metrics_dir:
+        content = render_multiprocess(settings.metrics_dir)
+    else:
+        content = REGISTRY.render()
+    return Response(content=content, media_type=CONTENT_TYPE_LATEST)
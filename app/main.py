@@ -2,31 +2,59 @@
 
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
+from urllib.parse import urlsplit
 
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import ValidationError
 
-from app.config import settings
+from app.config import config_store, settings
+from app.handlers.debug import router as debug_router
 from app.handlers.health import router as health_router
+from app.handlers.metrics import router as metrics_router
+from app.translators.request import apply_translation_settings
 from app.utils.errors import (
     ProxyException,
     proxy_exception_handler as handle_proxy_exception,
     validation_error_handler as handle_validation_error,
     generic_exception_handler as handle_generic_exception,
 )
-from app.utils.logging import get_logger
-from app.utils.middleware import LoggingMiddleware
+from app.utils.admission import apply_admission_settings
+from app.utils.concurrency_limit import AIMDLimiter
+from app.utils.config_reload import ConfigWatcher
+from app.utils.lifecycle import lifecycle
+from app.utils.load_shedding import apply_load_shedding_settings
+from app.utils.logging import ensure_logging_configured, get_logger
+from app.utils.loop_monitor import EventLoopMonitor
+from app.utils.metrics import SnapshotWriter
+from app.utils.upstream_health import UpstreamProber
+from app.utils.warmup import run_warmup
+from app.utils.middleware import (
+    AdmissionMiddleware,
+    DeadlineMiddleware,
+    InflightMiddleware,
+    LoadSheddingMiddleware,
+    LoggingMiddleware,
+)
+from app.utils.tracing import create_exporter, tracer
 
-# Get logger (logging is already configured in utils/logging.py)
+# Loggers are lazy; logging itself is configured at startup, not on import
 logger = get_logger(__name__)
 
+# Components configured from settings at startup and on every reload
+SETTINGS_LISTENERS = (
+    apply_admission_settings,
+    apply_load_shedding_settings,
+    apply_translation_settings,
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Application lifespan manager."""
     # Startup
+    ensure_logging_configured()
     logger.info(
         "application_starting",
         app_name=settings.app_name,
@@ -35,11 +63,86 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         host=settings.host,
         port=settings.port,
     )
+    config_watcher = ConfigWatcher(
+        config_file=settings.config_file, interval=settings.config_watch_interval
+    )
+    config_watcher.start()
+    for listener in SETTINGS_LISTENERS:
+        listener(config_store.current, config_store.current)
+        config_store.subscribe(listener)
+    tracer.configure(
+        create_exporter(
+            settings.tracing_exporter,
+            file_path=settings.tracing_file_path,
+            otlp_endpoint=settings.tracing_otlp_endpoint,
+            service_name=settings.app_name,
+        ),
+        sample_ratio=settings.tracing_sample_ratio,
+        slow_threshold=settings.tracing_slow_threshold,
+    )
+    loop_monitor = EventLoopMonitor(
+        interval=settings.loop_monitor_interval,
+        lag_threshold=settings.loop_lag_warning_threshold,
+        debug=settings.debug,
+        block_threshold=settings.loop_block_threshold,
+    )
+    loop_monitor.start()
+    snapshot_writer = None
+    if settings.metrics_dir:
+        snapshot_writer = SnapshotWriter(
+            settings.metrics_dir, interval=settings.metrics_snapshot_interval
+        )
+        snapshot_writer.start()
+
+    # Imported here to keep httpx off the cold-start import path
+    from app.clients.upstream import create_upstream_client
+
+    backend = urlsplit(settings.openai_api_base_url).netloc
+    limiter = AIMDLimiter(
+        backend,
+        initial_limit=settings.upstream_initial_concurrency,
+        min_limit=settings.upstream_min_concurrency,
+        max_limit=settings.upstream_max_concurrency,
+        backoff_ratio=settings.upstream_limit_backoff_ratio,
+        latency_tolerance=settings.upstream_latency_tolerance,
+    )
+    upstream_client = create_upstream_client(
+        settings.openai_api_base_url, api_key=settings.openai_api_key, limiter=limiter
+    )
+    app.state.upstream_client = upstream_client
+    app.state.upstream_limiters = {backend: limiter}
+    await run_warmup(
+        app,
+        upstream_client,
+        connections=settings.warmup_upstream_connections,
+        timeout=settings.warmup_timeout,
+    )
+    upstream_prober = UpstreamProber(
+        {backend: upstream_client},
+        interval=settings.health_probe_interval,
+        timeout=settings.health_probe_timeout,
+        ttl=settings.health_cache_ttl,
+        failure_threshold=settings.breaker_failure_threshold,
+        reset_timeout=settings.breaker_reset_timeout,
+    )
+    await upstream_prober.start()
+    app.state.upstream_prober = upstream_prober
+    lifecycle.mark_ready()
 
     yield
 
-    # Shutdown
+    # Shutdown: let in-flight streams finish before tearing anything down
     logger.info("application_shutting_down", app_name=settings.app_name)
+    await lifecycle.drain(settings.drain_timeout)
+    await loop_monitor.stop()
+    await config_watcher.stop()
+    for listener in SETTINGS_LISTENERS:
+        config_store.unsubscribe(listener)
+    await upstream_prober.stop()
+    await upstream_client.aclose()
+    if snapshot_writer is not None:
+        await snapshot_writer.stop()
+    tracer.shutdown()
 
 
 # Create FastAPI app instance
@@ -66,6 +169,20 @@ app.add_exception_handler(ValidationError, handle_validation_error)
 app.add_exception_handler(Exception, handle_generic_exception)
 
 
+# Queue upstream-bound requests for an admission slot (innermost, so a
+# queued request is already visible in the in-flight registry)
+app.add_middleware(AdmissionMiddleware)
+
+# Shed low-priority requests before they queue when the SLOs are at risk
+app.add_middleware(LoadSheddingMiddleware)
+
+# Give each request a deadline, enforced through the in-flight registry
+app.add_middleware(DeadlineMiddleware)
+
+# Track in-flight requests (runs inside the logging middleware so the
+# request ID is already assigned)
+app.add_middleware(InflightMiddleware)
+
 # Add logging middleware
 app.add_middleware(LoggingMiddleware)
 
@@ -81,3 +198,5 @@ app.add_middleware(
 
 # Include routers
 app.include_router(health_router, tags=["health"])
+app.include_router(metrics_router, tags=["metrics"])
+app.include_router(debug_router, tags=["debug"])
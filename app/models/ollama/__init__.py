@@ -0,0 +1,5 @@
+"""Ollama API models, following the Ollama Python SDK types."""
+
+from app.models.ollama.options import Options
+
+__all__ = ["Options"]
@@ -0,0 +1,49 @@
+"""Model ``options`` of Ollama generate, chat and embed requests."""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class Options(BaseModel):
+    """Runtime and load-time model options.
+
+    Mirrors ``Options`` in the Ollama SDK. Options the SDK does not know are
+    kept as extra fields so they can be accounted for when dropped.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+    # Load time options
+    numa: Optional[bool] = None
+    num_ctx: Optional[int] = None
+    num_batch: Optional[int] = None
+    num_gpu: Optional[int] = None
+    main_gpu: Optional[int] = None
+    low_vram: Optional[bool] = None
+    f16_kv: Optional[bool] = None
+    logits_all: Optional[bool] = None
+    vocab_only: Optional[bool] = None
+    use_mmap: Optional[bool] = None
+    use_mlock: Optional[bool] = None
+    embedding_only: Optional[bool] = None
+    num_thread: Optional[int] = None
+
+    # Runtime options
+    num_keep: Optional[int] = None
+    seed: Optional[int] = None
+    num_predict: Optional[int] = None
+    top_k: Optional[int] = None
+    top_p: Optional[float] = None
+    tfs_z: Optional[float] = None
+    typical_p: Optional[float] = None
+    repeat_last_n: Optional[int] = None
+    temperature: Optional[float] = None
+    repeat_penalty: Optional[float] = None
+    presence_penalty: Optional[float] = None
+    frequency_penalty: Optional[float] = None
+    mirostat: Optional[int] = None
+    mirostat_tau: Optional[float] = None
+    mirostat_eta: Optional[float] = None
+    penalize_newline: Optional[bool] = None
+    stop: Optional[List[str]] = None
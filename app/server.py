@@ -0,0 +1,301 @@
+"""Multi-worker production launcher.
+
+Run with ``python -m app``. The supervisor starts one uvicorn worker process
+per CPU core (or ``APP_WORKERS``), restarts workers that die, and forwards
+SIGTERM/SIGINT for a graceful shutdown in which each worker stops
+accepting connections and drains in-flight streams before exiting. SIGHUP
+is forwarded to the workers, which reload their configuration. Workers
+use uvloop and httptools when they are installed and fall back to asyncio
+and h11 otherwise.
+
+By default the supervisor binds a single listening socket that all workers
+inherit. With ``APP_REUSE_PORT`` each worker binds its own ``SO_REUSEPORT``
+socket instead, letting the kernel balance connections across workers.
+"""
+
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+from importlib.util import find_spec
+from multiprocessing.process import BaseProcess
+from types import FrameType
+from typing import Callable, Dict, List, Literal, Optional
+
+import uvicorn
+
+from app.config import settings
+from app.utils.lifecycle import lifecycle
+from app.utils.logging import ensure_logging_configured, get_logger
+from app.utils.metrics import mark_process_dead
+
+logger = get_logger(__name__)
+
+# Restart backoff for crashing workers; reset once a worker stays up
+MIN_RESTART_DELAY = 0.5
+MAX_RESTART_DELAY = 30.0
+STABLE_UPTIME = 60.0
+
+# Seconds to wait for workers to exit, on top of the drain timeout, before
+# killing them
+SHUTDOWN_GRACE = 10.0
+
+WorkerTarget = Callable[[Optional[socket.socket], str, int], None]
+
+
+def detect_loop() -> Literal["asyncio", "uvloop"]:
+    """Return the uvicorn event loop implementation to use."""
+    return "uvloop" if find_spec("uvloop") is not None else "asyncio"
+
+
+def detect_http() -> Literal["h11", "httptools"]:
+    """Return the uvicorn HTTP protocol implementation to use."""
+    return "httptools" if find_spec("httptools") is not None else "h11"
+
+
+def resolve_workers(configured: int) -> int:
+    """Return the number of workers, defaulting to the CPU core count.
+
+    Args:
+        configured: Configured worker count; zero or less means auto
+
+    Returns:
+        Number of worker processes to run
+    """
+    if configured > 0:
+        return configured
+    return os.cpu_count() or 1
+
+
+def create_socket(host: str, port: int, reuse_port: bool = False) -> socket.socket:
+    """Create a bound, inheritable listening socket.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind
+        reuse_port: Set ``SO_REUSEPORT`` so several sockets can share the port
+
+    Returns:
+        Bound socket
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+class DrainingServer(uvicorn.Server):
+    """Uvicorn server that drains in-flight requests on shutdown.
+
+    Uvicorn only runs the lifespan shutdown once every connection has
+    closed, so the drain has to start here: stop listening, let streams
+    finish (or cancel them after the drain timeout), then continue with
+    uvicorn's regular shutdown.
+    """
+
+    async def shutdown(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        """Stop accepting connections, drain, then shut down."""
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+        await lifecycle.drain(settings.drain_timeout)
+        await super().shutdown(sockets)
+
+
+def run_worker(sock: Optional[socket.socket], host: str, port: int) -> None:
+    """Serve the application in a worker process.
+
+    Args:
+        sock: Shared listening socket, or None to bind a SO_REUSEPORT socket
+        host: Interface to bind when no socket is given
+        port: Port to bind when no socket is given
+    """
+    ensure_logging_configured()
+    # SIGHUP reloads the configuration once the application has started;
+    # until then it must not terminate the worker
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    if sock is None:
+        sock = create_socket(host, port, reuse_port=True)
+    config = uvicorn.Config(
+        "app.main:app",
+        loop=detect_loop(),
+        http=detect_http(),
+        log_config=None,
+        access_log=False,
+    )
+    DrainingServer(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Start, watch and restart worker processes."""
+
+    def __init__(
+        self,
+        workers: int,
+        host: str,
+        port: int,
+        reuse_port: bool = False,
+        metrics_dir: Optional[str] = None,
+        target: WorkerTarget = run_worker,
+        shutdown_timeout: float = SHUTDOWN_GRACE,
+    ) -> None:
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.reuse_port = reuse_port
+        self.metrics_dir = metrics_dir
+        self.target = target
+        self.shutdown_timeout = shutdown_timeout
+        self.processes: List[Optional[BaseProcess]] = [None] * workers
+        self.restarts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._socket: Optional[socket.socket] = None
+        self._started_at: Dict[int, float] = {}
+        self._restart_delay: Dict[int, float] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        """Bind the shared socket (unless using SO_REUSEPORT) and start workers."""
+        if not self.reuse_port:
+            self._socket = create_socket(self.host, self.port)
+        for slot in range(self.workers):
+            self._spawn(slot)
+
+    def _spawn(self, slot: int) -> None:
+        process = self._context.Process(
+            target=self.target,
+            args=(self._socket, self.host, self.port),
+            name=f"worker-{slot}",
+        )
+        process.start()
+        self.processes[slot] = process
+        self._started_at[slot] = time.monotonic()
+        logger.info("worker_started", worker=slot, pid=process.pid)
+
+    def poll(self) -> None:
+        """Reap dead workers and restart them once their backoff elapses."""
+        now = time.monotonic()
+        for slot, process in enumerate(self.processes):
+            if process is not None and not process.is_alive():
+                self._reap(slot, process, now)
+            elif process is None and now >= self._restart_at.get(slot, 0.0):
+                if not self._stopping.is_set():
+                    self.restarts += 1
+                    self._spawn(slot)
+
+    def _reap(self, slot: int, process: BaseProcess, now: float) -> None:
+        process.join()
+        self.processes[slot] = None
+        if self.metrics_dir and process.pid is not None:
+            mark_process_dead(self.metrics_dir, process.pid)
+
+        uptime = now - self._started_at.get(slot, now)
+        if uptime >= STABLE_UPTIME:
+            delay = MIN_RESTART_DELAY
+        else:
+            previous = self._restart_delay.get(slot, 0.0)
+            delay = min(max(previous * 2, MIN_RESTART_DELAY), MAX_RESTART_DELAY)
+        self._restart_delay[slot] = delay
+        self._restart_at[slot] = now + delay
+        logger.warning(
+            "worker_exited",
+            worker=slot,
+            pid=process.pid,
+            exitcode=process.exitcode,
+            uptime=round(uptime, 3),
+            restart_in=delay,
+        )
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Ask all workers to exit, killing any that outlive ``timeout``."""
+        self._stopping.set()
+        if timeout is None:
+            timeout = self.shutdown_timeout
+        alive = [p for p in self.processes if p is not None and p.is_alive()]
+        for process in alive:
+            process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in alive:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("worker_killed", pid=process.pid)
+                process.kill()
+                process.join()
+        self.processes = [None] * self.workers
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def forward_signal(self, signum: int, frame: Optional[FrameType] = None) -> None:
+        """Signal handler: pass a signal (SIGHUP) on to every worker."""
+        for process in self.processes:
+            if process is not None and process.pid is not None and process.is_alive():
+                os.kill(process.pid, signum)
+
+    def request_stop(self, signum: int, frame: Optional[FrameType] = None) -> None:
+        """Signal handler: leave the supervision loop."""
+        logger.info("supervisor_stopping", signal=signal.Signals(signum).name)
+        self._stopping.set()
+
+    def run(self, poll_interval: float = 0.5) -> None:
+        """Supervise workers until SIGTERM or SIGINT, forwarding SIGHUP."""
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGHUP, self.forward_signal)
+        self.start()
+        try:
+            while not self._stopping.wait(poll_interval):
+                self.poll()
+        finally:
+            self.stop()
+
+
+def main() -> None:
+    """Run the multi-worker production server."""
+    ensure_logging_configured()
+    workers = resolve_workers(settings.workers)
+    metrics_dir = settings.metrics_dir
+    owns_metrics_dir = False
+    if workers > 1 and not metrics_dir:
+        metrics_dir = tempfile.mkdtemp(prefix="ollama-proxy-metrics-")
+        owns_metrics_dir = True
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for filename in os.listdir(metrics_dir):
+            if filename.endswith((".json", ".tmp")):
+                os.remove(os.path.join(metrics_dir, filename))
+        # Spawned workers read their settings from the environment
+        os.environ["APP_METRICS_DIR"] = metrics_dir
+
+    logger.info(
+        "supervisor_starting",
+        workers=workers,
+        host=settings.host,
+        port=settings.port,
+        reuse_port=settings.reuse_port,
+        loop=detect_loop(),
+        http=detect_http(),
+    )
+    supervisor = Supervisor(
+        workers,
+        settings.host,
+        settings.port,
+        reuse_port=settings.reuse_port,
+        metrics_dir=metrics_dir,
+        shutdown_timeout=settings.drain_timeout + SHUTDOWN_GRACE,
+    )
+    try:
+        supervisor.run()
+    finally:
+        if owns_metrics_dir and metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
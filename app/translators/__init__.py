@@ -0,0 +1 @@
+"""Translation between Ollama and OpenAI API formats."""
@@ -0,0 +1,166 @@
+"""Mapping of Ollama model options onto OpenAI request parameters.
+
+Most Ollama options (GPU placement, mirostat sampling, ``tfs_z`` and the
+like) have no OpenAI equivalent. The mapping is compiled at import into a
+table with one entry per option: the OpenAI parameter, a validator of the
+raw value and the value transformer for mapped options, or the metrics
+counter for dropped ones. Translating a request then walks only the
+options it set, in one pass, and dropped options are counted in aggregate
+rather than logged per request.
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from pydantic import TypeAdapter
+from pydantic import ValidationError as PydanticValidationError
+
+from app.models.ollama import Options
+from app.utils.errors import ValidationException
+from app.utils.metrics import DROPPED_OPTIONS, CounterValue
+
+# Ollama option -> OpenAI parameter
+PARAMETER_MAP: Dict[str, str] = {
+    "temperature": "temperature",
+    "top_p": "top_p",
+    "seed": "seed",
+    "num_predict": "max_tokens",
+    "stop": "stop",
+    "presence_penalty": "presence_penalty",
+    "frequency_penalty": "frequency_penalty",
+}
+
+
+def _max_tokens(value: Any) -> Optional[int]:
+    # -1 (no limit) and -2 (fill the context) have no OpenAI equivalent
+    # other than leaving max_tokens unset
+    return value if value > 0 else None
+
+
+# Most stop sequences OpenAI accepts
+MAX_STOP_SEQUENCES = 4
+
+
+def _stop(value: Any) -> Any:
+    if isinstance(value, str):
+        return value
+    if len(value) > MAX_STOP_SEQUENCES:
+        raise ValidationException(
+            f"At most {MAX_STOP_SEQUENCES} stop sequences are supported",
+            details={"option": "stop", "count": len(value)},
+        )
+    return list(value)
+
+
+# Converts an option value for OpenAI; None omits the parameter
+VALUE_TRANSFORMERS: Dict[str, Callable[[Any], Any]] = {
+    "num_predict": _max_tokens,
+    "stop": _stop,
+}
+
+# Types raw option values are validated against where they differ from
+# the Options field (a single stop string is accepted as is)
+VALUE_TYPES: Dict[str, Any] = {
+    "stop": Union[str, List[str]],
+}
+
+# Options that are dropped because OpenAI has no equivalent
+UNSUPPORTED_PARAMS: Tuple[str, ...] = tuple(
+    name for name in Options.model_fields if name not in PARAMETER_MAP
+)
+
+# Label for options that are not Ollama options at all
+UNKNOWN_OPTION = "unknown"
+
+# OpenAI parameter, raw value validator and transformer of a mapped
+# option, or the counter of a dropped one
+_Entry = Union[
+    Tuple[str, "TypeAdapter[Any]", Optional[Callable[[Any], Any]]], CounterValue
+]
+
+
+def _compile() -> Dict[str, _Entry]:
+    table: Dict[str, _Entry] = {
+        name: (
+            target,
+            TypeAdapter(VALUE_TYPES.get(name, Options.model_fields[name].annotation)),
+            VALUE_TRANSFORMERS.get(name),
+        )
+        for name, target in PARAMETER_MAP.items()
+    }
+    for name in UNSUPPORTED_PARAMS:
+        table[name] = DROPPED_OPTIONS.labels(name)
+    return table
+
+
+_TABLE = _compile()
+_UNKNOWN = DROPPED_OPTIONS.labels(UNKNOWN_OPTION)
+
+
+def map_options(options: Union[Options, Mapping[str, Any], None]) -> Dict[str, Any]:
+    """Translate Ollama ``options`` into OpenAI request parameters.
+
+    Only options the client set are looked at. Options without an OpenAI
+    equivalent are dropped and counted in ``ollama_proxy_dropped_options``
+    by name (``unknown`` for names that are not Ollama options). Raw values
+    of mapped options are validated and coerced as :class:`Options` would
+    (``"100"`` becomes ``100``).
+
+    Args:
+        options: Parsed options, or the raw ``options`` object of a request
+
+    Returns:
+        OpenAI parameters to merge into the request
+
+    Raises:
+        ValidationException: If a mapped option has an invalid value, or
+            more than :data:`MAX_STOP_SEQUENCES` stop sequences are given
+    """
+    if options is None:
+        return {}
+    if isinstance(options, Options):
+        # Extra (non-Ollama) options are part of the set fields too
+        items: Iterable[Tuple[str, Any]] = [
+            (name, getattr(options, name)) for name in options.model_fields_set
+        ]
+        raw = False
+    else:
+        items = options.items()
+        raw = True
+
+    params: Dict[str, Any] = {}
+    for name, value in items:
+        if value is None:
+            continue
+        entry = _TABLE.get(name, _UNKNOWN)
+        if not isinstance(entry, tuple):
+            entry.inc()
+            continue
+        target, adapter, transform = entry
+        if raw:
+            value = _validate(name, adapter, value)
+        if transform is not None:
+            value = transform(value)
+            if value is None:
+                continue
+        params[target] = value
+    return params
+
+
+def _validate(name: str, adapter: "TypeAdapter[Any]", value: Any) -> Any:
+    try:
+        return adapter.validate_python(value)
+    except PydanticValidationError as exc:
+        raise ValidationException(
+            f"Invalid value for option {name!r}",
+            details={"option": name, "error": exc.errors()[0]["msg"]},
+        ) from exc
@@ -0,0 +1,515 @@
+"""Translation of Ollama requests into OpenAI requests.
+
+Chat messages are translated directly on every request. Translating a
+text message only builds a small dict around the client's strings, so it
+is cheaper than hashing the message to look it up in a cache would be
+(see ``scripts/benchmark_chat_translation.py``).
+
+Agents likewise send the same ``tools`` catalogue with every request. The
+translated catalogue is cached as serialized JSON and spliced into the
+upstream request body as is (see :func:`dumps_with_fragments`).
+
+Structured-output clients send the same few ``format`` schemas over and
+over; each distinct schema is converted for OpenAI strict mode once and the
+resulting ``response_format`` reused.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import orjson
+
+from app.translators.schema import (
+    ANY_NODE,
+    IncrementalValidator,
+    SchemaNode,
+    compile_schema,
+    drop_nulls,
+    schema_name,
+    strip_optional_nulls,
+    to_strict_schema,
+)
+from app.utils.errors import ValidationException
+from app.utils.metrics import CACHE_LOOKUPS
+
+if TYPE_CHECKING:
+    from app.config import Settings
+
+TOOLS_CACHE_NAME = "tools"
+FORMAT_CACHE_NAME = "format_schemas"
+
+# Default bound on the bytes held by each translation cache
+DEFAULT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# Leading base64 characters of common image formats
+_IMAGE_SIGNATURES = (
+    ("iVBORw0KGgo", "image/png"),
+    ("/9j/", "image/jpeg"),
+    ("R0lGOD", "image/gif"),
+    ("UklGR", "image/webp"),
+)
+
+_DIGEST_SIZE = 16
+
+
+def json_digest(value: Any) -> bytes:
+    """Hash the canonical JSON form of a value.
+
+    Raises:
+        TypeError: If the value is not JSON-serializable
+    """
+    canonical = orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(canonical, digest_size=_DIGEST_SIZE).digest()
+
+
+def _image_url(image: str) -> str:
+    """Turn a base64 image (or an existing data URL) into a data URL."""
+    if image.startswith("data:"):
+        return image
+    for prefix, media_type in _IMAGE_SIGNATURES:
+        if image.startswith(prefix):
+            break
+    else:
+        media_type = "image/jpeg"
+    return f"data:{media_type};base64,{image}"
+
+
+def translate_message(message: Mapping[str, Any], position: int = 0) -> Dict[str, Any]:
+    """Translate one Ollama chat message into an OpenAI chat message.
+
+    Images become ``image_url`` content parts and tool calls get string
+    arguments. Ollama tool calls have no IDs, so each call gets one derived
+    from the message's position in the history, which stays the same on
+    every turn of the conversation. Tool results are not linked to their
+    call here; see :func:`translate_messages`.
+
+    Args:
+        message: Ollama message (``role``, ``content``, ``images``,
+            ``tool_calls``, ``tool_name``)
+        position: Index of the message in the history
+
+    Returns:
+        OpenAI message
+    """
+    translated: Dict[str, Any] = {"role": message.get("role", "user")}
+    content = message.get("content")
+    images = message.get("images")
+    if images:
+        parts: List[Dict[str, Any]] = []
+        if content:
+            parts.append({"type": "text", "text": content})
+        parts.extend(
+            {"type": "image_url", "image_url": {"url": _image_url(image)}}
+            for image in images
+        )
+        translated["content"] = parts
+    else:
+        translated["content"] = content if content is not None else ""
+
+    tool_calls = message.get("tool_calls")
+    if tool_calls:
+        prefix = f"call_{position}"
+        translated["tool_calls"] = [
+            {
+                "id": f"{prefix}_{index}",
+                "type": "function",
+                "function": {
+                    "name": call["function"]["name"],
+                    "arguments": orjson.dumps(
+                        call["function"].get("arguments") or {}
+                    ).decode(),
+                },
+            }
+            for index, call in enumerate(tool_calls)
+        ]
+        if not content:
+            translated["content"] = None
+    return translated
+
+
+def translate_messages(messages: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """Translate an Ollama chat history into OpenAI messages.
+
+    Tool results are linked to the call they answer: each ``tool`` message
+    gets the ID of the earliest unanswered call to its ``tool_name`` (or,
+    failing that, of any unanswered call) in the preceding assistant
+    message.
+
+    Args:
+        messages: Ollama messages, oldest first
+
+    Returns:
+        OpenAI messages
+    """
+    translated: List[Dict[str, Any]] = []
+    pending: List[Tuple[str, str]] = []
+    for position, message in enumerate(messages):
+        result = translate_message(message, position)
+        if result.get("tool_calls"):
+            pending = [
+                (call["function"]["name"], call["id"]) for call in result["tool_calls"]
+            ]
+        elif result["role"] == "tool" and pending:
+            name = message.get("tool_name")
+            index = next((i for i, (n, _) in enumerate(pending) if n == name), 0)
+            result["tool_call_id"] = pending.pop(index)[1]
+        translated.append(result)
+    return translated
+
+
+def translate_tool(tool: Any, index: int = 0) -> Dict[str, Any]:
+    """Translate one Ollama tool definition into an OpenAI tool.
+
+    Args:
+        tool: Ollama tool (``type`` and ``function`` with ``name``,
+            ``description`` and a JSON schema in ``parameters``)
+        index: Position of the tool in the request, for error details
+
+    Returns:
+        OpenAI tool
+
+    Raises:
+        ValidationException: If the tool is not a named function
+    """
+    function = tool.get("function") if isinstance(tool, Mapping) else None
+    if (
+        not isinstance(function, Mapping)
+        or tool.get("type", "function") not in ("function", None)
+        or not isinstance(function.get("name"), str)
+        or not function["name"]
+    ):
+        raise ValidationException(
+            "Each tool must be a function with a name", details={"index": index}
+        )
+
+    translated: Dict[str, Any] = {"name": function["name"]}
+    if function.get("description") is not None:
+        translated["description"] = function["description"]
+    parameters = function.get("parameters")
+    if isinstance(parameters, Mapping):
+        translated["parameters"] = {
+            key: value for key, value in parameters.items() if value is not None
+        }
+    else:
+        translated["parameters"] = {"type": "object", "properties": {}}
+    return {"type": "function", "function": translated}
+
+
+class ToolsTranslationCache:
+    """LRU of translated ``tools`` catalogues, stored serialized.
+
+    Args:
+        max_entries: Maximum number of distinct catalogues kept (0 disables
+            the cache)
+        max_bytes: Maximum total size of the cached catalogues, raw and
+            translated JSON; larger catalogues are translated uncached
+    """
+
+    def __init__(
+        self, max_entries: int = 256, max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    ) -> None:
+        self._entries: "OrderedDict[bytes, bytes]" = OrderedDict()
+        self.size = 0
+        self.configure(max_entries, max_bytes)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(
+        self, max_entries: int, max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    ) -> None:
+        """Update the limits, e.g. after a configuration reload."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > max(self.max_entries, 0) or self.size > self.max_bytes
+        ):
+            key, serialized = self._entries.popitem(last=False)
+            self.size -= len(key) + len(serialized)
+
+    def translate(self, tools: Sequence[Any]) -> bytes:
+        """Translate a ``tools`` list into the serialized OpenAI ``tools``.
+
+        Raises:
+            ValidationException: If a tool definition is invalid
+        """
+        if self.max_entries <= 0:
+            return _dump_tools(tools)
+        # Keyed by the raw JSON itself: hashing it with the built-in bytes
+        # hash is cheaper than a digest, and a hit is confirmed byte for byte
+        try:
+            key = orjson.dumps(tools)
+        except TypeError:
+            return _dump_tools(tools)
+        cached = self._entries.get(key)
+        if cached is not None:
+            CACHE_LOOKUPS.labels(TOOLS_CACHE_NAME, "hit").inc()
+            self._entries.move_to_end(key)
+            return cached
+
+        CACHE_LOOKUPS.labels(TOOLS_CACHE_NAME, "miss").inc()
+        serialized = _dump_tools(tools)
+        size = len(key) + len(serialized)
+        if size <= self.max_bytes:
+            self._entries[key] = serialized
+            self.size += size
+            self._evict()
+        return serialized
+
+    def clear(self) -> None:
+        """Drop every cached catalogue."""
+        self._entries.clear()
+        self.size = 0
+
+
+def _dump_tools(tools: Sequence[Any]) -> bytes:
+    return orjson.dumps([translate_tool(tool, i) for i, tool in enumerate(tools)])
+
+
+tools_cache = ToolsTranslationCache()
+
+
+def translate_tools(
+    tools: Sequence[Any], cache: Optional[ToolsTranslationCache] = None
+) -> bytes:
+    """Translate an Ollama ``tools`` list into serialized OpenAI ``tools``.
+
+    Args:
+        tools: Ollama tool definitions
+        cache: Translation cache (the global one by default)
+
+    Returns:
+        JSON array of OpenAI tools, ready for :func:`dumps_with_fragments`
+
+    Raises:
+        ValidationException: If a tool definition is invalid
+    """
+    return (tools_cache if cache is None else cache).translate(tools)
+
+
+def dumps_with_fragments(
+    payload: Mapping[str, Any], fragments: Mapping[str, bytes]
+) -> bytes:
+    """Serialize a request body, splicing in pre-serialized fields.
+
+    Args:
+        payload: Fields to serialize
+        fragments: Serialized JSON values by field name, inserted verbatim;
+            they must not also be in ``payload``
+
+    Returns:
+        JSON object
+    """
+    body = orjson.dumps(payload)
+    if not fragments:
+        return body
+    parts = [body[:-1]]
+    separator = b"," if len(body) > 2 else b""
+    for name, value in fragments.items():
+        parts.append(separator + orjson.dumps(name) + b":" + value)
+        separator = b","
+    parts.append(b"}")
+    return b"".join(parts)
+
+
+class CompiledFormat:
+    """OpenAI ``response_format`` for an Ollama ``format``.
+
+    Args:
+        response_format: OpenAI ``response_format``; shared, must not be
+            modified
+        schema: Schema the output must match, None for any JSON value
+        client_schema: The client's schema if ``schema`` is its strict
+            rewrite, whose nullable optional properties are stripped from
+            the output by :meth:`restore`
+    """
+
+    __slots__ = (
+        "response_format",
+        "serialized",
+        "schema",
+        "client_schema",
+        "_node",
+        "_client_node",
+    )
+
+    def __init__(
+        self,
+        response_format: Dict[str, Any],
+        schema: Optional[Dict[str, Any]],
+        client_schema: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.response_format = response_format
+        self.serialized = orjson.dumps(response_format)
+        self.schema = schema
+        self.client_schema = client_schema
+        self._node: Optional[SchemaNode] = None if schema is not None else ANY_NODE
+        self._client_node: Optional[SchemaNode] = None
+
+    def validator(self) -> IncrementalValidator:
+        """Create a validator for one streamed response.
+
+        The schema is compiled on first use and shared by later validators.
+        """
+        if self._node is None:
+            assert self.schema is not None
+            self._node = compile_schema(self.schema)
+        return IncrementalValidator(self._node)
+
+    def restore(self, value: Any) -> Any:
+        """Bring parsed output back to the client's schema.
+
+        Strict mode makes the model answer null for optional properties it
+        would have omitted; those nulls are removed again.
+
+        Args:
+            value: Parsed model output
+
+        Returns:
+            Output matching the client's schema
+        """
+        if self.client_schema is None:
+            return value
+        if self._client_node is None:
+            self._client_node = compile_schema(self.client_schema)
+        return strip_optional_nulls(value, self._client_node)
+
+
+JSON_FORMAT = CompiledFormat({"type": "json_object"}, None)
+
+
+def _compile_format(schema: Mapping[str, Any]) -> CompiledFormat:
+    converted, strict = to_strict_schema(schema)
+    json_schema: Dict[str, Any] = {"name": schema_name(schema), "schema": converted}
+    if strict:
+        json_schema["strict"] = True
+    return CompiledFormat(
+        {"type": "json_schema", "json_schema": json_schema},
+        converted,
+        drop_nulls(schema) if strict else None,
+    )
+
+
+class FormatTranslationCache:
+    """LRU of translated ``format`` schemas keyed by schema digest.
+
+    Args:
+        max_entries: Maximum number of distinct schemas kept (0 disables
+            the cache)
+        max_bytes: Maximum total size of the cached formats, measured as
+            their serialized ``response_format``; larger formats are
+            translated uncached
+    """
+
+    def __init__(
+        self, max_entries: int = 128, max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    ) -> None:
+        self._entries: "OrderedDict[bytes, CompiledFormat]" = OrderedDict()
+        self.size = 0
+        self.configure(max_entries, max_bytes)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(
+        self, max_entries: int, max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    ) -> None:
+        """Update the limits, e.g. after a configuration reload."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > max(self.max_entries, 0) or self.size > self.max_bytes
+        ):
+            _, compiled = self._entries.popitem(last=False)
+            self.size -= len(compiled.serialized)
+
+    def translate(self, format: Any) -> Optional[CompiledFormat]:
+        """Translate an Ollama ``format`` into an OpenAI ``response_format``.
+
+        Args:
+            format: ``"json"``, a JSON schema, or None/empty for free text
+
+        Returns:
+            Translated format, or None for free-text output
+
+        Raises:
+            ValidationException: If the format is neither ``"json"`` nor a
+                JSON schema
+        """
+        if format is None or format == "":
+            return None
+        if format == "json":
+            return JSON_FORMAT
+        if not isinstance(format, Mapping):
+            raise ValidationException(
+                'format must be "json" or a JSON schema',
+                details={"format": str(format)[:100]},
+            )
+        if self.max_entries <= 0:
+            return _compile_format(format)
+        try:
+            digest = json_digest(format)
+        except TypeError:
+            return _compile_format(format)
+        cached = self._entries.get(digest)
+        if cached is not None:
+            CACHE_LOOKUPS.labels(FORMAT_CACHE_NAME, "hit").inc()
+            self._entries.move_to_end(digest)
+            return cached
+
+        CACHE_LOOKUPS.labels(FORMAT_CACHE_NAME, "miss").inc()
+        compiled = _compile_format(format)
+        if len(compiled.serialized) <= self.max_bytes:
+            self._entries[digest] = compiled
+            self.size += len(compiled.serialized)
+            self._evict()
+        return compiled
+
+    def clear(self) -> None:
+        """Drop every cached schema."""
+        self._entries.clear()
+        self.size = 0
+
+
+format_cache = FormatTranslationCache()
+
+
+def translate_format(
+    format: Any, cache: Optional[FormatTranslationCache] = None
+) -> Optional[CompiledFormat]:
+    """Translate an Ollama ``format`` into an OpenAI ``response_format``.
+
+    Args:
+        format: ``"json"``, a JSON schema, or None/empty for free text
+        cache: Translation cache (the global one by default)
+
+    Returns:
+        Translated format, or None for free-text output
+
+    Raises:
+        ValidationException: If the format is neither ``"json"`` nor a JSON
+            schema
+    """
+    return (format_cache if cache is None else cache).translate(format)
+
+
+def apply_translation_settings(old: "Settings", new: "Settings") -> None:
+    """Configure the global translation caches from settings (a reload listener)."""
+    tools_cache.configure(new.tools_cache_max_entries, new.tools_cache_max_bytes)
+    format_cache.configure(new.format_cache_max_entries, new.format_cache_max_bytes)
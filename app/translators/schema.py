@@ -0,0 +1,569 @@
+"""JSON schemas for structured output.
+
+Ollama constrains output with a plain JSON schema in ``format``; OpenAI's
+``json_schema`` response format is only enforced in *strict* mode, which
+requires an object at the root, every object to list all of its properties
+as required and to forbid additional ones, and supports only a subset of
+keywords. :func:`to_strict_schema` rewrites a schema into that form, making
+optional properties nullable instead; :func:`strip_optional_nulls` removes
+the nulls the model then returns for them from the output.
+
+:func:`compile_schema` turns a schema into a tree of nodes with references
+resolved, which :class:`IncrementalValidator` checks streamed output
+against character by character, so a response that leaves the schema can
+be aborted as soon as it does rather than after the last token.
+"""
+
+import re
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    List,
+    Mapping,
+    NoReturn,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import orjson
+
+from app.utils.errors import StructuredOutputException
+
+# Keywords OpenAI strict mode supports; any other makes a schema non-strict
+_STRICT_KEYWORDS = frozenset(
+    {
+        "type",
+        "properties",
+        "required",
+        "additionalProperties",
+        "items",
+        "anyOf",
+        "enum",
+        "const",
+        "$ref",
+        "$defs",
+        "definitions",
+        "title",
+        "description",
+    }
+)
+
+# Keywords holding a list of subschemas
+_SCHEMA_LISTS = ("anyOf", "allOf", "oneOf")
+
+# Keywords holding a map of named subschemas
+_SCHEMA_MAPS = ("$defs", "definitions")
+
+_SCHEMA_NAME = re.compile(r"[^a-zA-Z0-9_-]+")
+
+_WHITESPACE = frozenset(" \t\r\n")
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+_LITERALS = {"t": "true", "f": "false", "n": "null"}
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+def schema_name(schema: Mapping[str, Any]) -> str:
+    """Derive an OpenAI schema name (``[a-zA-Z0-9_-]{1,64}``) from a title."""
+    title = schema.get("title")
+    name = (
+        _SCHEMA_NAME.sub("_", title).strip("_")[:64] if isinstance(title, str) else ""
+    )
+    return name or "response"
+
+
+def _nullable(schema: Dict[str, Any]) -> Dict[str, Any]:
+    if "enum" in schema and None not in schema["enum"]:
+        schema = {**schema, "enum": [*schema["enum"], None]}
+    kind = schema.get("type")
+    if isinstance(kind, str):
+        return {**schema, "type": [kind, "null"]} if kind != "null" else schema
+    if isinstance(kind, list):
+        return schema if "null" in kind else {**schema, "type": [*kind, "null"]}
+    return {"anyOf": [schema, {"type": "null"}]}
+
+
+def to_strict_schema(schema: Mapping[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """Rewrite a JSON schema for OpenAI strict mode.
+
+    Every object gets ``additionalProperties: false`` and lists all of its
+    properties as required; properties that were optional become nullable.
+    Schemas without an object root, with open objects or with keywords
+    strict mode does not support (``allOf``, ``not``, string formats,
+    numeric ranges, ...) cannot be used in strict mode.
+
+    Args:
+        schema: JSON schema
+
+    Returns:
+        The rewritten schema and whether it can be used in strict mode; if
+        not, the schema is returned unchanged apart from dropped nulls
+    """
+    strict = True
+
+    def walk(node: Any) -> Any:
+        nonlocal strict
+        if isinstance(node, list):
+            return [walk(item) for item in node]
+        if not isinstance(node, Mapping):
+            return node
+        result = {key: value for key, value in node.items() if value is not None}
+        if not _STRICT_KEYWORDS.issuperset(result):
+            strict = False
+        for key in ("items", "not"):
+            if key in result:
+                result[key] = walk(result[key])
+        for key in _SCHEMA_LISTS:
+            if isinstance(result.get(key), list):
+                result[key] = walk(result[key])
+        for key in _SCHEMA_MAPS:
+            if isinstance(result.get(key), Mapping):
+                result[key] = {name: walk(sub) for name, sub in result[key].items()}
+
+        properties = result.get("properties")
+        if result.get("type") == "object" or isinstance(properties, Mapping):
+            properties = properties if isinstance(properties, Mapping) else {}
+            if result.get("additionalProperties", False) is not False:
+                strict = False
+            required = set(result.get("required") or ())
+            result["properties"] = {
+                name: walk(sub) if name in required else _nullable(walk(sub))
+                for name, sub in properties.items()
+            }
+            result["required"] = list(properties)
+            result.setdefault("additionalProperties", False)
+        return result
+
+    strict_schema = walk(schema)
+    if strict_schema.get("type") != "object":
+        strict = False
+    if not strict:
+        return drop_nulls(schema), False
+    return strict_schema, True
+
+
+def drop_nulls(node: Any) -> Any:
+    """Copy a schema without its null-valued keywords (unset by the client)."""
+    if isinstance(node, Mapping):
+        return {
+            key: drop_nulls(value) for key, value in node.items() if value is not None
+        }
+    if isinstance(node, list):
+        return [drop_nulls(item) for item in node]
+    return node
+
+
+class SchemaNode:
+    """Compiled constraints of one schema position.
+
+    ``types`` is None when any JSON type is allowed; ``integer`` implies
+    ``number`` for the first character of a value and is checked once the
+    number is complete.
+    """
+
+    __slots__ = (
+        "types",
+        "properties",
+        "required",
+        "additional",
+        "items",
+        "enum",
+        "any_of",
+    )
+
+    def __init__(self) -> None:
+        self.types: Optional[FrozenSet[str]] = None
+        self.properties: Dict[str, SchemaNode] = {}
+        self.required: FrozenSet[str] = frozenset()
+        self.additional: Optional[SchemaNode] = None
+        self.items: Optional[SchemaNode] = None
+        self.enum: Optional[List[Any]] = None
+        self.any_of: List[SchemaNode] = []
+
+    def allows(self, kind: str) -> bool:
+        """Whether a value of a JSON type may start here."""
+        if self.types is None:
+            return True
+        if kind == "number":
+            return "number" in self.types or "integer" in self.types
+        return kind in self.types
+
+    def select(self, kind: str) -> Optional["SchemaNode"]:
+        """Narrow ``anyOf`` branches by the type of the value starting here.
+
+        Returns:
+            The node constraining the value, or None if no branch allows it
+        """
+        if not self.allows(kind):
+            return None
+        if not self.any_of:
+            return self
+        branches = [node for node in self.any_of if node.select(kind) is not None]
+        if not branches:
+            return None
+        if len(branches) == 1:
+            return branches[0].select(kind)
+        return ANY_NODE
+
+
+# Allows any value
+ANY_NODE = SchemaNode()
+ANY_NODE.additional = ANY_NODE
+ANY_NODE.items = ANY_NODE
+
+# Allows no value (the ``false`` schema)
+_NEVER_NODE = SchemaNode()
+_NEVER_NODE.types = frozenset()
+
+
+def _json_types(node: Mapping[str, Any]) -> Optional[FrozenSet[str]]:
+    kind = node.get("type")
+    if isinstance(kind, str):
+        return frozenset({kind})
+    if isinstance(kind, list):
+        return frozenset(kind)
+    if "properties" in node:
+        return frozenset({"object"})
+    if "items" in node:
+        return frozenset({"array"})
+    return None
+
+
+def compile_schema(schema: Mapping[str, Any]) -> SchemaNode:
+    """Compile a JSON schema into a node tree for incremental validation.
+
+    Local references (``#/$defs/...``, ``#/definitions/...``) are resolved,
+    including recursive ones. Constraints beyond types, properties, items
+    and enums (string patterns, numeric ranges, ...) are not checked.
+    """
+    compiled: Dict[int, SchemaNode] = {}
+
+    def resolve(ref: str) -> Any:
+        target: Any = schema
+        parts = ref[2:].split("/") if ref.startswith("#/") else []
+        for part in parts:
+            part = part.replace("~1", "/").replace("~0", "~")
+            if not isinstance(target, Mapping) or part not in target:
+                return {}
+            target = target[part]
+        return target
+
+    def build(node: Any) -> SchemaNode:
+        if not isinstance(node, Mapping):
+            return ANY_NODE if node is not False else _NEVER_NODE
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#"):
+            node = resolve(ref)
+            if not isinstance(node, Mapping):
+                return ANY_NODE
+        if id(node) in compiled:
+            return compiled[id(node)]
+        result = SchemaNode()
+        compiled[id(node)] = result
+
+        result.types = _json_types(node)
+        branches = [
+            sub
+            for key in ("anyOf", "oneOf")
+            if isinstance(node.get(key), list)
+            for sub in node[key]
+        ]
+        result.any_of = [build(sub) for sub in branches]
+        if result.any_of and result.types is None:
+            types: Set[str] = set()
+            for branch in result.any_of:
+                if branch.types is None:
+                    break
+                types |= branch.types
+            else:
+                result.types = frozenset(types)
+        if isinstance(node.get("properties"), Mapping):
+            result.properties = {
+                name: build(sub) for name, sub in node["properties"].items()
+            }
+        result.required = frozenset(node.get("required") or ())
+        additional = node.get("additionalProperties", True)
+        result.additional = None if additional is False else build(additional)
+        result.items = build(node.get("items", True))
+        if isinstance(node.get("enum"), list):
+            result.enum = list(node["enum"])
+        elif "const" in node:
+            result.enum = [node["const"]]
+        return result
+
+    return build(schema)
+
+
+def strip_optional_nulls(value: Any, node: SchemaNode) -> Any:
+    """Remove the nulls strict mode put in place of omitted properties.
+
+    A null property is dropped when the client's schema had it optional
+    and does not allow null for it; properties under ambiguous ``anyOf``
+    branches are left alone.
+
+    Args:
+        value: Parsed model output
+        node: The client's compiled schema (not the strict rewrite)
+
+    Returns:
+        The output with those properties removed (a copy if any were)
+    """
+    if isinstance(value, dict):
+        target = node.select("object")
+        if target is None:
+            return value
+        result = {}
+        for key, item in value.items():
+            sub = target.properties.get(key)
+            if sub is None:
+                sub = target.additional
+            elif item is None and key not in target.required:
+                if not sub.allows("null"):
+                    continue
+            result[key] = item if sub is None else strip_optional_nulls(item, sub)
+        return result
+    if isinstance(value, list):
+        target = node.select("array")
+        if target is None or target.items is None:
+            return value
+        return [strip_optional_nulls(item, target.items) for item in value]
+    return value
+
+
+class _Frame:
+    """An open object or array."""
+
+    __slots__ = ("node", "is_object", "state", "key", "index", "seen")
+
+    def __init__(self, node: SchemaNode, is_object: bool) -> None:
+        self.node = node
+        self.is_object = is_object
+        self.state = "first"
+        self.key: Optional[str] = None
+        self.index = 0
+        self.seen: Set[str] = set()
+
+
+class IncrementalValidator:
+    """Check streamed JSON text against a compiled schema as it arrives.
+
+    Feed the output chunk by chunk; :meth:`feed` raises as soon as the text
+    can no longer be a valid instance of the schema, and :meth:`close`
+    raises if the stream ended before the value was complete.
+
+    Args:
+        schema: Compiled schema (see :func:`compile_schema`)
+    """
+
+    def __init__(self, schema: SchemaNode) -> None:
+        self._root = schema
+        self._stack: List[_Frame] = []
+        self._done = False
+        self.position = 0
+        # Scalar being read: its node, kind and text so far
+        self._scalar: Optional[Tuple[SchemaNode, str]] = None
+        self._text: List[str] = []
+        self._escape = False
+
+    @property
+    def complete(self) -> bool:
+        """Whether a complete top-level value has been read."""
+        return self._done and self._scalar is None
+
+    def feed(self, chunk: str) -> None:
+        """Validate the next chunk of output.
+
+        Raises:
+            StructuredOutputException: If the output left the schema
+        """
+        i, end = 0, len(chunk)
+        while i < end:
+            if self._scalar is not None and self._scalar[1] in ("string", "key"):
+                i = self._read_string(chunk, i)
+                continue
+            self._consume(chunk[i])
+            i += 1
+            self.position += 1
+
+    def close(self) -> None:
+        """Check that the output ended with a complete value.
+
+        Raises:
+            StructuredOutputException: If the value is incomplete
+        """
+        if self._scalar is not None and self._scalar[1] in ("number", "literal"):
+            self._finish_token()
+        if not self.complete:
+            self._fail("output ended before the JSON value was complete")
+
+    def _path(self) -> str:
+        path = "$"
+        for frame in self._stack:
+            if frame.is_object:
+                path += f".{frame.key}" if frame.key is not None else ""
+            else:
+                path += f"[{frame.index}]"
+        return path
+
+    def _fail(self, reason: str) -> NoReturn:
+        raise StructuredOutputException(
+            "Output does not match the requested format",
+            details={"reason": reason, "path": self._path(), "position": self.position},
+        )
+
+    def _read_string(self, chunk: str, i: int) -> int:
+        """Read string characters up to and including the closing quote."""
+        while i < len(chunk):
+            if self._escape:
+                self._text.append(chunk[i])
+                self._escape = False
+                self.position += 1
+                i += 1
+                continue
+            match = _STRING_SPECIAL.search(chunk, i)
+            stop = match.start() if match else len(chunk)
+            self._text.append(chunk[i:stop])
+            self.position += stop - i
+            if match is None:
+                return stop
+            self.position += 1
+            if chunk[stop] == "\\":
+                self._text.append("\\")
+                self._escape = True
+                i = stop + 1
+                continue
+            self._finish_string()
+            return stop + 1
+        return i
+
+    def _consume(self, char: str) -> None:
+        if self._scalar is not None:
+            if char in (_NUMBER_CHARS if self._scalar[1] == "number" else "aelrstu"):
+                self._text.append(char)
+                if self._scalar[1] == "literal":
+                    self._check_literal_prefix()
+                return
+            self._finish_token()
+        if char in _WHITESPACE:
+            return
+        if self._done:
+            self._fail("unexpected data after the JSON value")
+        if not self._stack:
+            self._begin_value(char, self._root)
+            return
+
+        frame = self._stack[-1]
+        if frame.is_object:
+            if frame.state in ("first", "next") and char == "}":
+                self._close_object(frame)
+            elif frame.state in ("first", "key") and char == '"':
+                self._scalar = (frame.node, "key")
+                self._text = []
+            elif frame.state == "colon" and char == ":":
+                frame.state = "value"
+            elif frame.state == "value":
+                assert frame.key is not None
+                node = frame.node.properties.get(frame.key, frame.node.additional)
+                frame.state = "next"
+                self._begin_value(char, node or _NEVER_NODE)
+            elif frame.state == "next" and char == ",":
+                frame.state = "key"
+                frame.key = None
+            else:
+                self._fail(f"unexpected {char!r} in object")
+        else:
+            if frame.state in ("first", "next") and char == "]":
+                self._stack.pop()
+                self._done = not self._stack
+            elif frame.state in ("first", "value"):
+                frame.state = "next"
+                self._begin_value(char, frame.node.items or ANY_NODE)
+            elif frame.state == "next" and char == ",":
+                frame.state = "value"
+                frame.index += 1
+            else:
+                self._fail(f"unexpected {char!r} in array")
+
+    def _begin_value(self, char: str, node: SchemaNode) -> None:
+        if char == "{":
+            kind = "object"
+        elif char == "[":
+            kind = "array"
+        elif char == '"':
+            kind = "string"
+        elif char == "-" or char.isdigit():
+            kind = "number"
+        elif char in ("t", "f"):
+            kind = "boolean"
+        elif char == "n":
+            kind = "null"
+        else:
+            self._fail(f"unexpected {char!r}; expected a JSON value")
+        selected = node.select(kind)
+        if selected is None:
+            self._fail(f"{kind} not allowed here")
+
+        if kind in ("object", "array"):
+            self._stack.append(_Frame(selected, kind == "object"))
+        elif kind == "string":
+            self._scalar = (selected, "string")
+            self._text = []
+        else:
+            self._scalar = (selected, "number" if kind == "number" else "literal")
+            self._text = [char]
+
+    def _check_literal_prefix(self) -> None:
+        text = "".join(self._text)
+        if not _LITERALS[text[0]].startswith(text):
+            self._fail(f"invalid literal {text!r}")
+
+    def _finish_string(self) -> None:
+        assert self._scalar is not None
+        node, kind = self._scalar
+        self._scalar = None
+        raw = "".join(self._text)
+        try:
+            value = orjson.loads(f'"{raw}"')
+        except orjson.JSONDecodeError:
+            self._fail("invalid string escape")
+        if kind == "key":
+            frame = self._stack[-1]
+            frame.key = value
+            if value not in node.properties and node.additional is None:
+                self._fail(f"unexpected property {value!r}")
+            frame.seen.add(value)
+            frame.state = "colon"
+            return
+        self._finish_value(node, value)
+
+    def _finish_token(self) -> None:
+        assert self._scalar is not None
+        node, kind = self._scalar
+        self._scalar = None
+        text = "".join(self._text)
+        try:
+            value = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            self._fail(f"invalid {kind} {text!r}")
+        if (
+            isinstance(value, float)
+            and node.types is not None
+            and "number" not in node.types
+            and not value.is_integer()
+        ):
+            self._fail(f"{text} is not an integer")
+        self._finish_value(node, value)
+
+    def _finish_value(self, node: SchemaNode, value: Any) -> None:
+        if node.enum is not None and value not in node.enum:
+            self._fail(f"{value!r} is not one of the allowed values")
+        self._done = not self._stack
+
+    def _close_object(self, frame: _Frame) -> None:
+        missing = frame.node.required - frame.seen
+        if missing:
+            frame.key = None
+            self._fail(f"missing required properties {sorted(missing)}")
+        self._stack.pop()
+        self._done = not self._stack
@@ -0,0 +1,267 @@
+"""Admission control with per-tenant fair queueing.
+
+The controller caps the number of concurrent upstream requests globally and
+per model. Requests beyond the caps wait in one FIFO queue per tenant, and
+queues are served by deficit round-robin: each pass a tenant may admit up
+to its weight in requests, so a tenant with a deep backlog (a batch job)
+cannot starve tenants sending a few interactive requests. A request whose
+expected queue wait would exceed its deadline is rejected up front instead
+of timing out later.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Deque, Dict, Mapping, Optional
+
+from app.config import Settings, settings
+from app.utils import timing
+from app.utils.errors import DeadlineExceededException, OverloadedException
+from app.utils.logging import get_logger
+from app.utils.metrics import ADMISSION_QUEUE_TIME, ADMISSION_REJECTIONS
+from app.utils.tracing import STAGE_UPSTREAM_QUEUE, tracer
+
+logger = get_logger(__name__)
+
+# Smoothing factor for the moving average of slot hold times
+SERVICE_TIME_ALPHA = 0.2
+
+
+@dataclass
+class _Waiter:
+    """A request waiting for a slot."""
+
+    tenant: str
+    model: str
+    future: "asyncio.Future[None]"
+    enqueued_at: float
+
+
+class AdmissionController:
+    """Concurrency caps with per-tenant deficit round-robin queues.
+
+    Args:
+        max_concurrency: Maximum concurrent requests overall
+        model_limits: Maximum concurrent requests per model name
+        default_model_limit: Cap for models not in ``model_limits``
+            (0 means only the global cap applies)
+        max_queue_size: Maximum number of waiting requests overall
+        tenant_weights: Requests admitted per round for each tenant
+            (tenants not listed have weight 1)
+        clock: Monotonic clock
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 64,
+        model_limits: Optional[Mapping[str, int]] = None,
+        default_model_limit: int = 0,
+        max_queue_size: int = 256,
+        tenant_weights: Optional[Mapping[str, int]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._clock = clock
+        self.active = 0
+        self._active_by_model: Dict[str, int] = {}
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        # Remaining quantum of a tenant whose turn was cut short
+        self._deficits: Dict[str, int] = {}
+        self.queued = 0
+        # Estimated seconds a request holds its slot
+        self.avg_service_time = 0.0
+        self.configure(
+            max_concurrency,
+            model_limits,
+            default_model_limit,
+            max_queue_size,
+            tenant_weights,
+        )
+
+    def configure(
+        self,
+        max_concurrency: int,
+        model_limits: Optional[Mapping[str, int]] = None,
+        default_model_limit: int = 0,
+        max_queue_size: int = 256,
+        tenant_weights: Optional[Mapping[str, int]] = None,
+    ) -> None:
+        """Update the limits, e.g. after a configuration reload.
+
+        Raising a limit admits waiting requests immediately; lowering it
+        takes effect as running requests finish.
+        """
+        self.max_concurrency = max_concurrency
+        self.model_limits = dict(model_limits or {})
+        self.default_model_limit = default_model_limit
+        self.max_queue_size = max_queue_size
+        self.tenant_weights = dict(tenant_weights or {})
+        self._dispatch()
+
+    def _model_limit(self, model: str) -> int:
+        return self.model_limits.get(model, self.default_model_limit)
+
+    def _has_capacity(self, model: str) -> bool:
+        if self.active >= self.max_concurrency:
+            return False
+        limit = self._model_limit(model)
+        return limit <= 0 or self._active_by_model.get(model, 0) < limit
+
+    def _acquire(self, model: str) -> None:
+        self.active += 1
+        self._active_by_model[model] = self._active_by_model.get(model, 0) + 1
+
+    def _release(self, model: str, held: float) -> None:
+        self.active -= 1
+        remaining = self._active_by_model[model] - 1
+        if remaining:
+            self._active_by_model[model] = remaining
+        else:
+            del self._active_by_model[model]
+        self.avg_service_time += SERVICE_TIME_ALPHA * (held - self.avg_service_time)
+        self._dispatch()
+
+    def expected_wait(self) -> float:
+        """Estimate how long a newly queued request would wait."""
+        if self.max_concurrency <= 0:
+            return float("inf")
+        return (self.queued + 1) * self.avg_service_time / self.max_concurrency
+
+    def _dispatch(self) -> None:
+        """Admit waiting requests in deficit round-robin order."""
+        progress = True
+        while progress and self._queues and self.active < self.max_concurrency:
+            progress = False
+            for tenant in list(self._queues):
+                queue = self._queues[tenant]
+                deficit = self._deficits.pop(tenant, None)
+                if deficit is None:
+                    deficit = max(1, self.tenant_weights.get(tenant, 1))
+                while queue and deficit > 0:
+                    waiter = queue[0]
+                    if not self._has_capacity(waiter.model):
+                        break
+                    queue.popleft()
+                    self.queued -= 1
+                    deficit -= 1
+                    self._acquire(waiter.model)
+                    waiter.future.set_result(None)
+                    progress = True
+
+                if not queue:
+                    del self._queues[tenant]
+                    continue
+                if deficit > 0 and self.active >= self.max_concurrency:
+                    # Turn cut short by the global cap; resume it next time
+                    self._deficits[tenant] = deficit
+                    break
+                self._queues.move_to_end(tenant)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        """Take a waiter that gave up out of its tenant queue."""
+        queue = self._queues.get(waiter.tenant)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self.queued -= 1
+        if not queue:
+            del self._queues[waiter.tenant]
+            self._deficits.pop(waiter.tenant, None)
+
+    @asynccontextmanager
+    async def slot(
+        self, tenant: str, model: str, deadline: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """Hold an admission slot for the duration of the block.
+
+        Args:
+            tenant: Tenant the request is queued under
+            model: Requested model, for per-model caps
+            deadline: Monotonic time by which the request must be admitted
+
+        Raises:
+            OverloadedException: If the queue is full
+            DeadlineExceededException: If the request cannot be admitted
+                before its deadline
+        """
+        enqueued_at = self._clock()
+        if not self._queues and self._has_capacity(model):
+            self._acquire(model)
+        else:
+            await self._wait(tenant, model, deadline, enqueued_at)
+
+        admitted_at = self._clock()
+        queued = admitted_at - enqueued_at
+        ADMISSION_QUEUE_TIME.labels(settings.model_label(model) or "unknown").observe(
+            queued
+        )
+        timing.record_stage(timing.STAGE_UPSTREAM_QUEUE, queued)
+        end_ns = time.time_ns()
+        tracer.record_span(
+            STAGE_UPSTREAM_QUEUE, end_ns - int(queued * 1e9), end_ns, tenant=tenant
+        )
+        try:
+            yield
+        finally:
+            self._release(model, self._clock() - admitted_at)
+
+    async def _wait(
+        self, tenant: str, model: str, deadline: Optional[float], now: float
+    ) -> None:
+        """Queue until a slot is granted, the deadline passes or cancellation."""
+        if self.queued >= self.max_queue_size:
+            ADMISSION_REJECTIONS.labels("queue_full").inc()
+            raise OverloadedException(
+                "Too many queued requests", details={"queued": self.queued}
+            )
+        expected_wait = self.expected_wait()
+        if deadline is not None and now + expected_wait > deadline:
+            ADMISSION_REJECTIONS.labels("deadline").inc()
+            raise DeadlineExceededException(
+                "Request cannot be admitted before its deadline",
+                details=(
+                    {"expected_wait_s": round(expected_wait, 3)}
+                    if math.isfinite(expected_wait)
+                    else None
+                ),
+            )
+
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(tenant, model, future, enqueued_at=now)
+        self._queues.setdefault(tenant, deque()).append(waiter)
+        self.queued += 1
+        # Queues may be blocked only by per-model caps this request avoids
+        self._dispatch()
+
+        timeout = None if deadline is None else max(0.0, deadline - now)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done():
+                # Admitted at the same moment; give the slot back
+                self._release(model, 0.0)
+            else:
+                future.cancel()
+                self._remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                ADMISSION_REJECTIONS.labels("deadline").inc()
+                raise DeadlineExceededException(
+                    "Request was not admitted before its deadline"
+                ) from None
+            raise
+
+
+admission = AdmissionController()
+
+
+def apply_admission_settings(old: Settings, new: Settings) -> None:
+    """Configure the global controller from settings (a reload listener)."""
+    admission.configure(
+        max_concurrency=new.admission_max_concurrency,
+        model_limits=new.admission_model_limits,
+        default_model_limit=new.admission_default_model_limit,
+        max_queue_size=new.admission_max_queue_size,
+        tenant_weights=new.admission_tenant_weights,
+    )
@@ -0,0 +1,57 @@
+"""Circuit breaker for upstream backends."""
+
+import time
+from typing import Callable
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    The breaker opens after ``failure_threshold`` consecutive failures.
+    While open it rejects calls until ``reset_timeout`` seconds have
+    passed, then lets a trial call through (half-open). A successful trial
+    closes the breaker and a failed one opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the timeout ends."""
+        if (
+            self._state == STATE_OPEN
+            and self._clock() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = STATE_HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return whether a call may be attempted now."""
+        return self.state != STATE_OPEN
+
+    def record_success(self) -> None:
+        """Record a successful call and close the breaker."""
+        self._state = STATE_CLOSED
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the breaker if needed."""
+        self._failures += 1
+        if self.state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = STATE_OPEN
+            self._opened_at = self._clock()
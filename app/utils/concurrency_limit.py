@@ -0,0 +1,193 @@
+"""Adaptive concurrency limits toward upstream backends.
+
+A static cap on upstream requests is either too low for quiet periods or
+too high when the backend's capacity drops and it starts answering with
+429s. :class:`AIMDLimiter` adjusts the cap from the responses themselves:
+it grows additively while requests succeed at normal latency and backs
+off multiplicatively on 429/5xx responses, errors, or recent times to
+first byte well above their baseline.
+"""
+
+import asyncio
+import time
+from collections import deque
+from itertools import islice
+from typing import Callable, Deque, Dict, Iterable, Optional
+
+from app.utils.metrics import UPSTREAM_CONCURRENCY_IN_USE, UPSTREAM_CONCURRENCY_LIMIT
+
+# Request extension that exempts a request (health probes, warmup) from the
+# limit; such requests neither wait for nor feed the limiter
+BYPASS_LIMIT_EXTENSION = "proxy_bypass_limit"
+
+# Time-to-first-byte samples the latency baseline is taken over
+LATENCY_WINDOW = 256
+
+# Most recent samples compared against the baseline
+RECENT_LATENCY_WINDOW = 32
+
+# Percentile of a window taken as its latency; low, so that long prompts
+# (slow to first byte even on an idle backend) do not move it
+LATENCY_PERCENTILE = 0.1
+
+
+def _low_percentile(samples: Iterable[float]) -> float:
+    """The :data:`LATENCY_PERCENTILE` of latency samples."""
+    ordered = sorted(samples)
+    return ordered[int(LATENCY_PERCENTILE * (len(ordered) - 1))]
+
+
+def is_drop(status_code: int) -> bool:
+    """Return whether a response status signals upstream overload."""
+    return status_code == 429 or status_code >= 500
+
+
+class AIMDLimiter:
+    """Additive-increase/multiplicative-decrease concurrency limit.
+
+    Each successful sample raises the limit by ``1 / limit`` (one per full
+    window of requests) while the limit is actually being used. A drop
+    multiplies it by ``backoff_ratio``, at most once per window: drops of
+    requests started before the last decrease are ignored, so a burst of
+    429s does not collapse the limit to the minimum.
+
+    Latency is judged by a low percentile of the time to first byte over
+    the last :data:`RECENT_LATENCY_WINDOW` requests against the same
+    percentile over the last :data:`LATENCY_WINDOW` (the baseline, which
+    follows the backend up and down). Long prompts only add to the upper
+    percentiles, so a mix of short and long requests does not read as
+    overload, while a backend getting slower for every request does.
+
+    Args:
+        name: Backend name, used as the metrics label
+        initial_limit: Starting limit
+        min_limit: Lower bound of the limit
+        max_limit: Upper bound of the limit
+        backoff_ratio: Factor applied to the limit on a drop
+        latency_tolerance: A recent time to first byte this many times the
+            baseline counts as a drop (0 disables the latency signal)
+        clock: Monotonic clock
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        backoff_ratio: float = 0.9,
+        latency_tolerance: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self._clock = clock
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self.recent: Optional[float] = None
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._samples = 0
+        self._last_decrease = float("-inf")
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self._limit_gauge = UPSTREAM_CONCURRENCY_LIMIT.labels(name)
+        self._in_use_gauge = UPSTREAM_CONCURRENCY_IN_USE.labels(name)
+        self._limit_gauge.set(self.limit)
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self._limit)
+
+    async def acquire(self) -> float:
+        """Wait until a request may be sent.
+
+        Returns:
+            Start time to pass back to :meth:`release`
+        """
+        if self.in_flight >= self.limit or self._waiters:
+            future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Granted at the same moment; hand the slot on
+                    self.in_flight -= 1
+                    self._wake()
+                elif future in self._waiters:
+                    self._waiters.remove(future)
+                raise
+        else:
+            self.in_flight += 1
+        self._in_use_gauge.set(self.in_flight)
+        return self._clock()
+
+    def release(self, started: float, latency: Optional[float], dropped: bool) -> None:
+        """Record a finished request and adjust the limit.
+
+        Args:
+            started: Value returned by :meth:`acquire`
+            latency: Time to first byte, or None if no response arrived
+            dropped: Whether the upstream signalled overload or failed
+        """
+        self.in_flight -= 1
+        if latency is not None and not dropped:
+            dropped = self._observe_latency(latency)
+
+        if dropped:
+            if started >= self._last_decrease:
+                self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+                self._last_decrease = self._clock()
+        elif self.in_flight + 1 >= self._limit / 2:
+            # Only grow while the limit is actually the constraint
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+        self._limit_gauge.set(self.limit)
+        self._in_use_gauge.set(self.in_flight)
+        self._wake()
+
+    def abandon(self) -> None:
+        """Release a slot without adjusting the limit.
+
+        For requests that ended without saying anything about the backend,
+        such as a client disconnect, cancellation or shutdown.
+        """
+        self.in_flight -= 1
+        self._in_use_gauge.set(self.in_flight)
+        self._wake()
+
+    def _observe_latency(self, latency: float) -> bool:
+        """Record a time to first byte; return whether latency is elevated."""
+        latencies = self._latencies
+        latencies.append(latency)
+        self._samples += 1
+        if len(latencies) < RECENT_LATENCY_WINDOW:
+            return False
+        if self.baseline is None or self._samples % RECENT_LATENCY_WINDOW == 0:
+            self.baseline = _low_percentile(latencies)
+        self.recent = _low_percentile(
+            islice(latencies, len(latencies) - RECENT_LATENCY_WINDOW, None)
+        )
+        return self.latency_tolerance > 0 and (
+            self.recent > self.baseline * self.latency_tolerance
+        )
+
+    def _wake(self) -> None:
+        """Grant slots to waiters while under the limit."""
+        while self._waiters and self.in_flight < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                self.in_flight += 1
+
+    def to_dict(self) -> Dict[str, int]:
+        """Summarize the limiter for the readiness endpoint."""
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+        }
@@ -0,0 +1,127 @@
+"""Runtime configuration reloads triggered by SIGHUP or a config file change."""
+
+import asyncio
+import os
+import signal
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import ConfigStore, Settings, config_store
+from app.utils.log_sampling import parse_sample_ratios
+from app.utils.logging import get_logger, set_log_sample_ratios
+from app.utils.metrics import CONFIG_RELOADS
+
+logger = get_logger(__name__)
+
+
+def changed_fields(old: Settings, new: Settings) -> Dict[str, Any]:
+    """Return the fields whose value differs between two snapshots.
+
+    Secrets are reported as changed without their value.
+    """
+    changes: Dict[str, Any] = {}
+    for name in type(new).model_fields:
+        value = getattr(new, name)
+        if getattr(old, name) != value:
+            changes[name] = "***" if "token" in name or "key" in name else value
+    return changes
+
+
+def apply_log_sampling(old: Settings, new: Settings) -> None:
+    """Reload listener that updates the log sampling ratios.
+
+    Unset ratios fall back to the ``LOG_SAMPLE_RATIOS`` environment
+    variable, as at startup.
+    """
+    ratios = new.log_sample_ratios
+    if ratios is None:
+        ratios = os.getenv("LOG_SAMPLE_RATIOS", "")
+    set_log_sample_ratios(parse_sample_ratios(ratios))
+
+
+class ConfigWatcher:
+    """Reload configuration on SIGHUP or when the config file changes.
+
+    The config file is polled every ``interval`` seconds by comparing its
+    modification time and size, which needs no extra dependency. Failed
+    reloads are logged and leave the current snapshot in place.
+    """
+
+    def __init__(
+        self,
+        store: ConfigStore = config_store,
+        config_file: Optional[str] = None,
+        interval: float = 2.0,
+    ) -> None:
+        self.store = store
+        self.config_file = config_file
+        self.interval = interval
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._signal_installed = False
+        self._file_state = self._stat()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        if not self.config_file:
+            return None
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self, trigger: str) -> bool:
+        """Reload the configuration.
+
+        Args:
+            trigger: What caused the reload, for logging
+
+        Returns:
+            True if the new settings were swapped in
+        """
+        old = self.store.current
+        try:
+            new = self.store.reload()
+        except Exception as e:
+            CONFIG_RELOADS.labels("failure").inc()
+            logger.error("config_reload_failed", trigger=trigger, error=str(e))
+            return False
+        CONFIG_RELOADS.labels("success").inc()
+        logger.info(
+            "config_reloaded", trigger=trigger, changed=changed_fields(old, new)
+        )
+        return True
+
+    def start(self) -> None:
+        """Install the SIGHUP handler and start watching the config file."""
+        loop = asyncio.get_running_loop()
+        self.store.subscribe(apply_log_sampling)
+        apply_log_sampling(self.store.current, self.store.current)
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self.reload, "sighup")
+            self._signal_installed = True
+        except (NotImplementedError, RuntimeError, AttributeError):
+            # No signal support (e.g. Windows, or not on the main thread)
+            pass
+        if self.config_file:
+            self._task = loop.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """Remove the SIGHUP handler and stop watching."""
+        self.store.unsubscribe(apply_log_sampling)
+        if self._signal_installed:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+            self._signal_installed = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            state = self._stat()
+            if state is not None and state != self._file_state:
+                self._file_state = state
+                self.reload("config_file")
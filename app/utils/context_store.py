@@ -0,0 +1,314 @@
+"""Server-side conversation state behind Ollama's ``context`` field.
+
+Ollama's ``/api/generate`` returns an opaque ``context`` array that clients
+send back to continue a conversation. OpenAI-compatible backends are
+stateless, so the proxy keeps the translated message history itself and
+hands out a compact context token instead: a short integer array that fits
+the ``context`` field. Follow-up calls only carry the new prompt; the
+history is looked up by token.
+
+Histories are stored as linked nodes, each holding the messages of one
+turn and a reference to the previous turn's node, so a turn costs memory
+proportional to its own messages and branches share their common prefix.
+The store is bounded by entry count and by the bytes of history it keeps
+alive (a node stays alive while an entry or a later turn refers to it).
+"""
+
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import orjson
+
+from app.utils.metrics import CACHE_LOOKUPS
+
+# First element of every context token, telling proxy tokens apart from
+# genuine Ollama token arrays
+CONTEXT_TOKEN_MARKER = 0x0C7A5E00
+
+# A token is the marker followed by a 128-bit random key in 32-bit words
+_TOKEN_WORDS = 4
+_KEY_BYTES = _TOKEN_WORDS * 4
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ns|us|µs|ms|s|m|h)")
+_DURATION_UNITS = {
+    "ns": 1e-9,
+    "us": 1e-6,
+    "µs": 1e-6,
+    "ms": 1e-3,
+    "s": 1.0,
+    "m": 60.0,
+    "h": 3600.0,
+}
+
+CACHE_NAME = "conversation"
+
+# Default bound on the bytes of history kept alive
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def encode_context_token(key: bytes) -> List[int]:
+    """Encode a store key as an Ollama-style ``context`` array."""
+    words = [int.from_bytes(key[i : i + 4], "big") for i in range(0, _KEY_BYTES, 4)]
+    return [CONTEXT_TOKEN_MARKER, *words]
+
+
+def decode_context_token(context: Optional[Sequence[int]]) -> Optional[bytes]:
+    """Decode a ``context`` array into a store key.
+
+    Returns:
+        The key, or None if the array is not a proxy context token
+    """
+    if (
+        context is None
+        or len(context) != _TOKEN_WORDS + 1
+        or context[0] != CONTEXT_TOKEN_MARKER
+    ):
+        return None
+    try:
+        return b"".join(int(word).to_bytes(4, "big") for word in context[1:])
+    except (OverflowError, TypeError, ValueError):
+        return None
+
+
+def parse_keep_alive(value: Union[None, int, float, str]) -> Optional[float]:
+    """Parse Ollama's ``keep_alive`` into seconds.
+
+    Numbers are seconds and strings are Go-style durations (``"5m"``,
+    ``"1h30m"``); a bare numeric string counts as seconds. A negative value
+    means "keep forever".
+
+    Returns:
+        Seconds (``inf`` for negative values), or None if not given or
+        not understood
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        text = value.strip()
+        negative = text.startswith("-")
+        text = text.lstrip("+-")
+        try:
+            seconds = float(text)
+        except ValueError:
+            parts = _DURATION_PART.findall(text)
+            if not parts or "".join(n + u for n, u in parts) != text:
+                return None
+            seconds = sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+        if negative:
+            seconds = -seconds
+    return float("inf") if seconds < 0 else seconds
+
+
+class _HistoryNode:
+    """Messages of one turn, linked to the turn before.
+
+    ``refs`` counts the store entry and the later turns referring to the
+    node; its ``size`` is released from the store's budget at zero.
+    """
+
+    __slots__ = ("messages", "parent", "size", "refs")
+
+    def __init__(
+        self,
+        messages: Tuple[Dict[str, Any], ...],
+        parent: Optional["_HistoryNode"],
+        size: int,
+    ) -> None:
+        self.messages = messages
+        self.parent = parent
+        self.size = size
+        self.refs = 1
+        if parent is not None:
+            parent.refs += 1
+
+    def history(self) -> List[Dict[str, Any]]:
+        """Return the full message history, oldest first."""
+        turns: List[Tuple[Dict[str, Any], ...]] = []
+        node: Optional[_HistoryNode] = self
+        while node is not None:
+            turns.append(node.messages)
+            node = node.parent
+        return [message for turn in reversed(turns) for message in turn]
+
+
+class _Entry:
+    __slots__ = ("node", "model", "expires_at")
+
+    def __init__(self, node: _HistoryNode, model: str, expires_at: float) -> None:
+        self.node = node
+        self.model = model
+        self.expires_at = expires_at
+
+
+class ConversationStore:
+    """LRU-bounded conversation histories with per-entry TTL.
+
+    Args:
+        max_entries: Maximum number of stored contexts; the least recently
+            used is evicted first
+        ttl: Default seconds a context is kept after its last use
+        max_ttl: Upper bound for TTLs requested through ``keep_alive``
+        max_bytes: Maximum total size of the histories kept alive,
+            measured as the JSON form of each turn's messages
+        clock: Monotonic clock
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 300.0,
+        max_ttl: float = 3600.0,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, _Entry]" = OrderedDict()
+        self.size = 0
+        self.configure(max_entries, ttl, max_ttl, max_bytes)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(
+        self,
+        max_entries: int,
+        ttl: float,
+        max_ttl: float,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        """Update the limits and evict down to them."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_ttl = max_ttl
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _ttl(self, keep_alive: Union[None, int, float, str]) -> float:
+        requested = parse_keep_alive(keep_alive)
+        return self.ttl if requested is None else min(requested, self.max_ttl)
+
+    def _lookup(self, key: Optional[bytes], model: str) -> Optional[_Entry]:
+        if key is None:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self._clock():
+            del self._entries[key]
+            self._release(entry.node)
+            return None
+        if entry.model != model:
+            return None
+        return entry
+
+    def get(
+        self,
+        context: Optional[Sequence[int]],
+        model: str,
+        keep_alive: Union[None, int, float, str] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Look up the history behind a context token.
+
+        A hit refreshes the entry's recency and TTL.
+
+        Args:
+            context: ``context`` array sent by the client
+            model: Model of the request; contexts do not carry across models
+            keep_alive: Ollama ``keep_alive`` of the request, as a TTL hint
+
+        Returns:
+            Message history in OpenAI format, or None if the token is
+            unknown, expired or not a proxy token
+        """
+        key = decode_context_token(context)
+        entry = self._lookup(key, model)
+        if key is None or entry is None:
+            if context:
+                CACHE_LOOKUPS.labels(CACHE_NAME, "miss").inc()
+            return None
+        CACHE_LOOKUPS.labels(CACHE_NAME, "hit").inc()
+        self._entries.move_to_end(key)
+        entry.expires_at = self._clock() + self._ttl(keep_alive)
+        return entry.node.history()
+
+    def save(
+        self,
+        model: str,
+        messages: Sequence[Dict[str, Any]],
+        parent: Optional[Sequence[int]] = None,
+        keep_alive: Union[None, int, float, str] = None,
+    ) -> Optional[List[int]]:
+        """Store the messages of a turn and return the token for it.
+
+        Args:
+            model: Model the conversation runs on
+            messages: New messages of this turn (typically the user prompt
+                and the assistant reply), in OpenAI format
+            parent: Context token the turn continues, if any
+            keep_alive: Ollama ``keep_alive`` of the request, as a TTL hint
+
+        Returns:
+            Context token to return to the client, or None if nothing was
+            stored: the TTL is zero (``keep_alive: 0``) or the history does
+            not fit the byte budget
+        """
+        ttl = self._ttl(keep_alive)
+        if ttl <= 0 or self.max_entries <= 0:
+            return None
+        size = len(orjson.dumps(messages))
+        if size > self.max_bytes:
+            return None
+        parent_entry = self._lookup(decode_context_token(parent), model)
+        node = _HistoryNode(
+            tuple(messages), parent_entry.node if parent_entry else None, size
+        )
+        self.size += size
+        key = os.urandom(_KEY_BYTES)
+        self._entries[key] = _Entry(node, model, self._clock() + ttl)
+        self._evict()
+        return encode_context_token(key) if key in self._entries else None
+
+    def _release(self, node: Optional[_HistoryNode]) -> None:
+        """Drop a reference to a node, freeing turns nothing refers to."""
+        while node is not None:
+            node.refs -= 1
+            if node.refs > 0:
+                return
+            self.size -= node.size
+            node = node.parent
+
+    def _evict(self) -> None:
+        """Drop expired entries at the LRU end and enforce the bounds."""
+        now = self._clock()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if (
+                entry.expires_at > now
+                and len(self._entries) <= self.max_entries
+                and self.size <= self.max_bytes
+            ):
+                break
+            del self._entries[key]
+            self._release(entry.node)
+
+    def clear(self) -> None:
+        """Drop every stored context."""
+        self._entries.clear()
+        self.size = 0
+
+
+conversation_store = ConversationStore()
@@ -0,0 +1,132 @@
+"""Per-request deadlines and timeout budgets.
+
+Every request gets a deadline when it arrives: the budget of its route,
+shortened by the client's own timeout (the ``X-Request-Timeout`` header or
+a ``request_timeout`` body field, in seconds). The deadline is kept in a
+context variable so that queue waits and upstream timeouts can use the
+remaining budget, and the request is cancelled once it is exhausted.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Mapping, Optional
+
+from app.utils.errors import DeadlineExceededException, ValidationException
+
+TIMEOUT_HEADER = "X-Request-Timeout"
+TIMEOUT_BODY_FIELD = "request_timeout"
+
+
+class Deadline:
+    """Point in monotonic time by which a request must complete.
+
+    Args:
+        budget: Seconds the request may take from now
+        clock: Monotonic clock
+    """
+
+    def __init__(
+        self, budget: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._clock = clock
+        self.budget = budget
+        self.expires_at = clock() + budget
+
+    def remaining(self) -> float:
+        """Seconds left until the deadline (negative once it has passed)."""
+        return self.expires_at - self._clock()
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.remaining() <= 0
+
+    def check(self) -> None:
+        """Raise if the deadline has passed.
+
+        Raises:
+            DeadlineExceededException: If no budget is left
+        """
+        if self.expired:
+            raise DeadlineExceededException(
+                "Request deadline exceeded", details={"budget_s": self.budget}
+            )
+
+
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+def get_deadline() -> Optional[Deadline]:
+    """Get the deadline of the request in the current context.
+
+    Returns:
+        Deadline, or None outside of a request or without a budget
+    """
+    return current_deadline.get()
+
+
+def remaining_budget(default: Optional[float] = None) -> Optional[float]:
+    """Get the time left for the current request, capped at ``default``.
+
+    Args:
+        default: Timeout to use when it is shorter than the remaining budget
+
+    Returns:
+        Seconds left, ``default`` if there is no deadline
+    """
+    deadline = current_deadline.get()
+    if deadline is None:
+        return default
+    remaining = max(0.0, deadline.remaining())
+    return remaining if default is None else min(default, remaining)
+
+
+def parse_timeout(value: Any, source: str) -> Optional[float]:
+    """Parse a client-supplied timeout in seconds.
+
+    Args:
+        value: Header or body value; None if not given
+        source: Where the value came from, for the error message
+
+    Returns:
+        Timeout in seconds, or None if not given
+
+    Raises:
+        ValidationException: If the value is not a positive number
+    """
+    if value is None:
+        return None
+    try:
+        if isinstance(value, bool):
+            raise ValueError(value)
+        timeout = float(value)
+    except (TypeError, ValueError):
+        timeout = 0.0
+    if not timeout > 0 or timeout == float("inf"):
+        raise ValidationException(
+            f"{source} must be a positive number of seconds",
+            details={"value": str(value)},
+        )
+    return timeout
+
+
+def route_budget(
+    path: str, route_budgets: Mapping[str, float], default: float
+) -> float:
+    """Get the timeout budget for a request path.
+
+    Args:
+        path: Request path
+        route_budgets: Budgets keyed by path prefix; the longest match wins
+        default: Budget for paths without a matching prefix
+
+    Returns:
+        Budget in seconds (0 means no deadline)
+    """
+    best = ""
+    for prefix in route_budgets:
+        if path.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    return route_budgets[best] if best else default
@@ -28,12 +28,13 @@ class ProxyException(HTTPException):
         message: str,
         details: Optional[Dict[str, Any]] = None,
         status_code: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None,
     ):
         self.message = message
         self.details = details
         if status_code:
             self.status_code = status_code
-        super().__init__(status_code=self.status_code, detail=message)
+        super().__init__(status_code=self.status_code, detail=message, headers=headers)
 
     def to_error_response(self, request_id: Optional[str] = None) -> ErrorResponse:
         """Convert exception to error response model."""
@@ -74,6 +75,79 @@ class NotImplementedException(ProxyException):
     status_code = 501
 
 
+class ForbiddenException(ProxyException):
+    """Caller is not allowed to use the endpoint."""
+
+    error_code = "FORBIDDEN"
+    status_code = 403
+
+
+class ConflictException(ProxyException):
+    """Request conflicts with an operation already in progress."""
+
+    error_code = "CONFLICT"
+    status_code = 409
+
+
+class NotFoundException(ProxyException):
+    """Requested resource does not exist."""
+
+    error_code = "NOT_FOUND"
+    status_code = 404
+
+
+class RequestCancelledException(ProxyException):
+    """Request was cancelled by the proxy before completion."""
+
+    error_code = "REQUEST_CANCELLED"
+    status_code = 503
+
+
+class OverloadedException(ProxyException):
+    """Proxy is at capacity and the request could not be queued."""
+
+    error_code = "OVERLOADED"
+    status_code = 429
+
+
+class DeadlineExceededException(ProxyException):
+    """Request could not complete within its deadline."""
+
+    error_code = "DEADLINE_EXCEEDED"
+    status_code = 504
+
+
+class LoadShedException(ProxyException):
+    """Request was shed to protect higher-priority traffic under overload."""
+
+    error_code = "LOAD_SHED"
+    status_code = 503
+
+    def __init__(
+        self,
+        message: str,
+        details: Optional[Dict[str, Any]] = None,
+        retry_after: int = 5,
+    ):
+        super().__init__(
+            message, details=details, headers={"Retry-After": str(retry_after)}
+        )
+
+
+class StructuredOutputException(ProxyException):
+    """Upstream output does not match the requested JSON schema."""
+
+    error_code = "STRUCTURED_OUTPUT_MISMATCH"
+    status_code = 502
+
+
+class ServiceUnavailableException(ProxyException):
+    """Proxy is not accepting requests, e.g. while draining for shutdown."""
+
+    error_code = "SERVICE_UNAVAILABLE"
+    status_code = 503
+
+
 async def proxy_exception_handler(
     request: Request, exc: ProxyException
 ) -> JSONResponse:
@@ -95,6 +169,7 @@ async def proxy_exception_handler(
     return JSONResponse(
         status_code=exc.status_code,
         content=error_response.model_dump(exclude_none=True),
+        headers=exc.headers,
     )
 
 
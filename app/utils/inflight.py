@@ -0,0 +1,183 @@
+"""Registry of in-flight requests for live introspection and cancellation."""
+
+import asyncio
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.utils.errors import ProxyException
+
+# Pipeline stages reported for in-flight requests
+STAGE_QUEUED = "queued"
+STAGE_HANDLER = "handler"
+STAGE_UPSTREAM = "upstream"
+STAGE_STREAMING = "streaming"
+STAGE_WRITING = "writing"
+
+
+@dataclass(eq=False)
+class InflightRequest:
+    """Live state of a request being processed.
+
+    Entries compare by identity, as request IDs are not unique.
+    """
+
+    request_id: str
+    method: str
+    path: str
+    route: str = ""
+    model: str = ""
+    backend: str = ""
+    priority: str = ""
+    stage: str = STAGE_HANDLER
+    bytes_sent: int = 0
+    started: float = field(default_factory=time.monotonic)
+    task: Optional["asyncio.Task[Any]"] = None
+    cancel_reason: Optional[str] = None
+    cancel_exception: Optional[ProxyException] = None
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.monotonic() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a JSON-serializable summary."""
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "model": self.model,
+            "backend": self.backend,
+            "priority": self.priority,
+            "stage": self.stage,
+            "elapsed": round(self.elapsed, 3),
+            "bytes_sent": self.bytes_sent,
+            "cancelling": self.cancel_reason is not None,
+        }
+
+
+class InflightRegistry:
+    """In-flight requests grouped by request ID.
+
+    Trusted inbound request IDs may repeat across concurrent requests, so
+    every ID maps to the entries carrying it and entries are removed by
+    identity.
+    """
+
+    def __init__(self) -> None:
+        self._requests: Dict[str, List[InflightRequest]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, entry: InflightRequest) -> None:
+        """Register a request."""
+        self._requests.setdefault(entry.request_id, []).append(entry)
+        self._count += 1
+
+    def remove(self, entry: InflightRequest) -> None:
+        """Unregister a request (no-op if unknown)."""
+        entries = self._requests.get(entry.request_id)
+        if entries is None or entry not in entries:
+            return
+        entries.remove(entry)
+        self._count -= 1
+        if not entries:
+            del self._requests[entry.request_id]
+
+    def get(self, request_id: str) -> Optional[InflightRequest]:
+        """Look up the oldest request with an ID."""
+        entries = self._requests.get(request_id)
+        return entries[0] if entries else None
+
+    def snapshot(self) -> List[InflightRequest]:
+        """List in-flight requests, oldest first."""
+        return sorted(
+            (entry for entries in self._requests.values() for entry in entries),
+            key=lambda entry: entry.started,
+        )
+
+    def cancel_entry(
+        self,
+        entry: InflightRequest,
+        reason: str,
+        exception: Optional[ProxyException] = None,
+    ) -> bool:
+        """Cancel a request's task.
+
+        The middleware turns the cancellation into a final error chunk (or
+        an error response if headers were not sent yet).
+
+        Args:
+            entry: Request to cancel
+            reason: Message reported to the client
+            exception: Error response to send instead of the default
+                ``RequestCancelledException``
+
+        Returns:
+            True if the request can be cancelled
+        """
+        if entry.task is None:
+            return False
+        if entry.cancel_reason is None:
+            entry.cancel_reason = reason
+            entry.cancel_exception = exception
+            entry.task.cancel()
+        return True
+
+    def cancel(
+        self,
+        request_id: str,
+        reason: str,
+        exception: Optional[ProxyException] = None,
+    ) -> bool:
+        """Cancel every in-flight request with an ID.
+
+        Args:
+            request_id: ID of the requests to cancel
+            reason: Message reported to the clients
+            exception: Error response to send instead of the default
+                ``RequestCancelledException``
+
+        Returns:
+            True if a request was found and cancelled
+        """
+        cancelled = [
+            self.cancel_entry(entry, reason, exception)
+            for entry in list(self._requests.get(request_id, ()))
+        ]
+        return any(cancelled)
+
+    def cancel_all(self, reason: str) -> int:
+        """Cancel every in-flight request.
+
+        Args:
+            reason: Message reported to the clients
+
+        Returns:
+            Number of requests cancelled
+        """
+        return sum(self.cancel_entry(entry, reason) for entry in self.snapshot())
+
+
+registry = InflightRegistry()
+
+current_inflight: ContextVar[Optional[InflightRequest]] = ContextVar(
+    "current_inflight", default=None
+)
+
+
+def get_current_inflight() -> Optional[InflightRequest]:
+    """Get the in-flight entry of the request in the current context.
+
+    The middleware and upstream client use it to report the model, backend
+    and stage.
+
+    Returns:
+        In-flight entry, or None outside of a request
+    """
+    return current_inflight.get()
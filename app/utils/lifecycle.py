@@ -0,0 +1,74 @@
+"""Process lifecycle state: readiness and graceful draining."""
+
+import asyncio
+import time
+
+from app.utils.inflight import registry
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+DRAIN_CANCEL_REASON = "Server is shutting down"
+
+# Health probes are still served while draining so that liveness keeps
+# passing and readiness can report the drain
+HEALTH_PATH_PREFIX = "/health"
+
+
+class Lifecycle:
+    """Track whether this process is ready for traffic or draining.
+
+    On shutdown, :meth:`drain` stops new requests from being accepted,
+    gives in-flight requests (typically long generation streams) up to a
+    timeout to finish, and then cancels the rest so that streams end with
+    a final error chunk instead of being cut off.
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.draining = False
+
+    def mark_ready(self) -> None:
+        """Mark startup as complete and start accepting requests."""
+        self.ready = True
+        self.draining = False
+
+    async def drain(self, timeout: float, poll_interval: float = 0.05) -> int:
+        """Stop accepting requests and wait for in-flight ones to finish.
+
+        Calling this again while (or after) draining is a no-op.
+
+        Args:
+            timeout: Seconds to let in-flight requests finish on their own
+            poll_interval: Seconds between checks of the in-flight registry
+
+        Returns:
+            Number of requests cancelled after the timeout
+        """
+        if self.draining:
+            return 0
+        self.draining = True
+        self.ready = False
+
+        started = time.monotonic()
+        logger.info("drain_started", in_flight=len(registry), timeout=timeout)
+        deadline = started + timeout
+        while len(registry) and time.monotonic() < deadline:
+            await asyncio.sleep(poll_interval)
+
+        cancelled = registry.cancel_all(DRAIN_CANCEL_REASON)
+        if cancelled:
+            # Give the cancelled requests a moment to send their final chunk
+            grace_deadline = time.monotonic() + 1.0
+            while len(registry) and time.monotonic() < grace_deadline:
+                await asyncio.sleep(poll_interval)
+
+        logger.info(
+            "drain_complete",
+            cancelled=cancelled,
+            duration=round(time.monotonic() - started, 3),
+        )
+        return cancelled
+
+
+lifecycle = Lifecycle()
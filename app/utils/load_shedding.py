@@ -0,0 +1,258 @@
+"""SLO-driven load shedding by priority class.
+
+Requests are sorted into priority classes, from interactive chat down to
+background jobs such as embedding backfills. The shedder compares the
+measured p99 latency and the admission queue depth against their SLOs;
+the ratio of the worse of the two to its SLO is the load *pressure*. Each
+class has a pressure threshold above which its requests are deferred and
+then rejected with ``Retry-After``, so background traffic absorbs an
+overload before interactive traffic notices it.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from app.utils.errors import LoadShedException
+from app.utils.metrics import SHED_REQUESTS
+
+if TYPE_CHECKING:
+    from app.config import Settings
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITY_BACKGROUND = "background"
+
+# Priority classes, most important first
+PRIORITY_CLASSES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH, PRIORITY_BACKGROUND)
+
+# Latency samples kept for the p99 estimate
+MAX_SAMPLES = 2048
+
+# Seconds between recomputations of the p99 estimate
+P99_REFRESH_INTERVAL = 1.0
+
+
+def validate_priority_classes(names: Iterable[str]) -> None:
+    """Check that every name is a known priority class.
+
+    Raises:
+        ValueError: If a name is not in :data:`PRIORITY_CLASSES`
+    """
+    unknown = sorted(set(names) - set(PRIORITY_CLASSES))
+    if unknown:
+        raise ValueError(
+            f"Unknown priority classes {unknown}; "
+            f"expected one of {list(PRIORITY_CLASSES)}"
+        )
+
+
+def classify(
+    path: str,
+    requested: Optional[str] = None,
+    api_key: Optional[str] = None,
+    api_key_classes: Optional[Mapping[str, str]] = None,
+    route_classes: Optional[Mapping[str, str]] = None,
+) -> str:
+    """Select the priority class of a request.
+
+    The base class comes from the API key, else from the longest matching
+    route prefix, else it is interactive. A class requested by the client
+    (e.g. through a header) is honoured only if it is not more important
+    than the base class, so clients can demote their own traffic but not
+    promote it.
+
+    Args:
+        path: Request path
+        requested: Class requested by the client, if any
+        api_key: API key the request authenticated with, if any
+        api_key_classes: Priority class by API key
+        route_classes: Priority class by path prefix
+
+    Returns:
+        Priority class name
+    """
+    base = None
+    if api_key is not None and api_key_classes:
+        base = api_key_classes.get(api_key)
+    if base is None and route_classes:
+        best = ""
+        for prefix in route_classes:
+            if path.startswith(prefix) and len(prefix) > len(best):
+                best = prefix
+        base = route_classes.get(best) if best else None
+    if base is None:
+        base = PRIORITY_INTERACTIVE
+    if requested in PRIORITY_CLASSES and PRIORITY_CLASSES.index(
+        requested
+    ) > PRIORITY_CLASSES.index(base):
+        return requested
+    return base
+
+
+class LoadShedder:
+    """Shed low-priority requests when latency or queueing breaks the SLOs.
+
+    Args:
+        slo_p99_latency: Target p99 time to response headers in seconds
+            (0 disables the latency signal)
+        slo_queue_depth: Target admission queue depth (0 disables the
+            queue signal)
+        thresholds: Pressure at which each class is shed; classes not
+            listed are never shed
+        window: Seconds of latency samples the p99 is computed over
+        retry_after: Seconds clients are asked to wait before retrying
+        queue_depth: Returns the current admission queue depth
+        clock: Monotonic clock
+    """
+
+    def __init__(
+        self,
+        slo_p99_latency: float = 10.0,
+        slo_queue_depth: int = 64,
+        thresholds: Optional[Mapping[str, float]] = None,
+        window: float = 30.0,
+        retry_after: float = 5.0,
+        queue_depth: Callable[[], int] = lambda: 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._queue_depth = queue_depth
+        self._clock = clock
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=MAX_SAMPLES)
+        self._p99: Optional[float] = None
+        self._p99_at = float("-inf")
+        self.configure(
+            slo_p99_latency, slo_queue_depth, thresholds, window, retry_after
+        )
+
+    def configure(
+        self,
+        slo_p99_latency: float,
+        slo_queue_depth: int,
+        thresholds: Optional[Mapping[str, float]] = None,
+        window: float = 30.0,
+        retry_after: float = 5.0,
+    ) -> None:
+        """Update the SLOs and thresholds, e.g. after a configuration reload."""
+        self.slo_p99_latency = slo_p99_latency
+        self.slo_queue_depth = slo_queue_depth
+        self.thresholds = dict(thresholds or {})
+        self.window = window
+        self.retry_after = retry_after
+
+    def observe(self, latency: float) -> None:
+        """Record the time to response headers of a finished request."""
+        self._samples.append((self._clock(), latency))
+
+    def p99(self) -> Optional[float]:
+        """Return the p99 latency over the window, or None without samples.
+
+        The estimate is recomputed at most once per
+        :data:`P99_REFRESH_INTERVAL`.
+        """
+        now = self._clock()
+        if now - self._p99_at < P99_REFRESH_INTERVAL:
+            return self._p99
+        cutoff = now - self.window
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        latencies = sorted(latency for _, latency in self._samples)
+        self._p99 = (
+            latencies[min(len(latencies) - 1, math.ceil(0.99 * len(latencies)) - 1)]
+            if latencies
+            else None
+        )
+        self._p99_at = now
+        return self._p99
+
+    def pressure(self) -> float:
+        """Return the load relative to the SLOs (1.0 means at the SLO)."""
+        pressure = 0.0
+        p99 = self.p99()
+        if self.slo_p99_latency > 0 and p99 is not None:
+            pressure = p99 / self.slo_p99_latency
+        if self.slo_queue_depth > 0:
+            pressure = max(pressure, self._queue_depth() / self.slo_queue_depth)
+        return pressure
+
+    def should_shed(self, priority: str) -> bool:
+        """Return whether requests of a class are currently shed."""
+        threshold = self.thresholds.get(priority)
+        return threshold is not None and self.pressure() >= threshold
+
+    def shedding(self) -> List[str]:
+        """List the classes currently being shed."""
+        return [name for name in PRIORITY_CLASSES if self.should_shed(name)]
+
+    async def admit(self, priority: str, defer: float = 0.0) -> None:
+        """Let a request through unless its class is being shed.
+
+        A shed request is first deferred for up to ``defer`` seconds in
+        case the overload clears.
+
+        Args:
+            priority: Priority class of the request
+            defer: Seconds to wait for the pressure to drop before rejecting
+
+        Raises:
+            LoadShedException: If the class is still shed after the deferral
+        """
+        if not self.should_shed(priority):
+            return
+        give_up = self._clock() + defer
+        while self._clock() < give_up:
+            await asyncio.sleep(min(P99_REFRESH_INTERVAL, give_up - self._clock()))
+            if not self.should_shed(priority):
+                return
+
+        SHED_REQUESTS.labels(priority).inc()
+        raise LoadShedException(
+            "Server is overloaded; retry later",
+            details={"priority": priority, "pressure": round(self.pressure(), 3)},
+            retry_after=math.ceil(self.retry_after),
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summarize the load for the readiness endpoint."""
+        p99 = self.p99()
+        return {
+            "pressure": round(self.pressure(), 3),
+            "p99_latency_s": round(p99, 3) if p99 is not None else None,
+            "queued": self._queue_depth(),
+            "shedding": self.shedding(),
+        }
+
+
+def _admission_queued() -> int:
+    # Imported lazily: admission imports the settings, which validate
+    # priority class names against this module
+    from app.utils.admission import admission
+
+    return admission.queued
+
+
+shedder = LoadShedder(queue_depth=_admission_queued)
+
+
+def apply_load_shedding_settings(old: "Settings", new: "Settings") -> None:
+    """Configure the global shedder from settings (a reload listener)."""
+    shedder.configure(
+        slo_p99_latency=new.slo_p99_latency,
+        slo_queue_depth=new.slo_queue_depth,
+        thresholds=new.shed_thresholds,
+        window=new.shed_window,
+        retry_after=new.shed_retry_after,
+    )
@@ -0,0 +1,216 @@
+"""Sampling and rate limiting for high-volume log events."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import structlog
+from structlog.types import EventDict, WrappedLogger
+
+# Levels that are never sampled away
+ALWAYS_KEEP_LEVELS = frozenset({"error", "critical", "exception"})
+
+# Fields ignored when deciding whether two warnings are identical
+VOLATILE_FIELDS = frozenset({"timestamp", "request_id"})
+
+# Upper bound on distinct warnings tracked for collapsing
+MAX_TRACKED_WARNINGS = 1024
+
+
+def parse_sample_ratios(value: str) -> Dict[str, float]:
+    """Parse a sampling specification such as ``"request_started=0.1,x=0.5"``.
+
+    Args:
+        value: Comma-separated ``event=ratio`` pairs
+
+    Returns:
+        Mapping of event name to keep ratio
+
+    Raises:
+        ValueError: If an entry is malformed or a ratio is outside [0, 1]
+    """
+    ratios: Dict[str, float] = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        event, sep, ratio = item.partition("=")
+        if not sep or not event.strip():
+            raise ValueError(f"Invalid log sample ratio entry: {item!r}")
+        parsed = float(ratio)
+        if not 0.0 <= parsed <= 1.0:
+            raise ValueError(f"Log sample ratio for {event!r} must be in [0, 1]")
+        ratios[event.strip()] = parsed
+    return ratios
+
+
+class _CollapsedWarning:
+    """A tracked warning and the duplicates suppressed since it was emitted."""
+
+    __slots__ = ("first_seen", "fields", "count")
+
+    def __init__(self, first_seen: float, fields: Dict[str, Any]) -> None:
+        self.first_seen = first_seen
+        self.fields = fields
+        self.count = 0
+
+    def summary(self) -> EventDict:
+        """The warning with its repeat count, for emitting on its own."""
+        return {**self.fields, "repeated": self.count}
+
+
+class LogSampler:
+    """Structlog processor that samples hot-path events.
+
+    Events listed in ``sample_ratios`` are kept at the configured ratio using
+    a per-event counter (a ratio of 0.1 keeps every tenth event). Errors,
+    responses with a 5xx status and requests slower than
+    ``slow_request_threshold`` are always kept. Repeated identical warnings
+    are collapsed: the first one is emitted, duplicates within
+    ``warning_summary_interval`` seconds are counted, and the next occurrence
+    after the interval carries the count in a ``repeated`` field. Counts
+    whose warning does not occur again are taken with :meth:`flush`.
+
+    The processor runs on every thread that logs, so its state is guarded
+    by a lock.
+    """
+
+    def __init__(
+        self,
+        sample_ratios: Optional[Mapping[str, float]] = None,
+        slow_request_threshold: float = 1.0,
+        warning_summary_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._periods = {
+            event: self._ratio_to_period(ratio)
+            for event, ratio in (sample_ratios or {}).items()
+        }
+        self._counters: Dict[str, int] = {}
+        self._slow_request_threshold = slow_request_threshold
+        self._warning_summary_interval = warning_summary_interval
+        self._warnings: "OrderedDict[Tuple[Any, ...], _CollapsedWarning]" = (
+            OrderedDict()
+        )
+        # Evicted warnings that still had suppressed duplicates
+        self._evicted: List[_CollapsedWarning] = []
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def set_sample_ratios(self, sample_ratios: Mapping[str, float]) -> None:
+        """Replace the sampling ratios, e.g. after a configuration reload.
+
+        Args:
+            sample_ratios: Keep ratio per event name
+        """
+        periods = {
+            event: self._ratio_to_period(ratio)
+            for event, ratio in sample_ratios.items()
+        }
+        with self._lock:
+            self._periods = periods
+            self._counters = {}
+
+    @staticmethod
+    def _ratio_to_period(ratio: float) -> int:
+        """Convert a keep ratio into "keep one in N" (0 means drop all)."""
+        if ratio <= 0.0:
+            return 0
+        return max(1, round(1.0 / ratio))
+
+    def _is_important(self, event_dict: EventDict) -> bool:
+        """Check whether an event must bypass sampling."""
+        if event_dict.get("level") in ALWAYS_KEEP_LEVELS:
+            return True
+
+        status_code = event_dict.get("status_code")
+        if isinstance(status_code, int) and status_code >= 500:
+            return True
+
+        duration = event_dict.get("duration")
+        return (
+            isinstance(duration, (int, float))
+            and duration >= self._slow_request_threshold
+        )
+
+    def _sample(self, event: str) -> bool:
+        """Decide whether a sampled event is kept."""
+        with self._lock:
+            period = self._periods.get(event)
+            if period is None:
+                return True
+            if period == 0:
+                return False
+            count = self._counters.get(event, 0)
+            self._counters[event] = count + 1
+        return count % period == 0
+
+    def _collapse_warning(self, event_dict: EventDict) -> bool:
+        """Decide whether a warning is emitted, annotating repeat counts."""
+        fields = {k: v for k, v in event_dict.items() if k not in VOLATILE_FIELDS}
+        key = tuple(sorted((k, repr(v)) for k, v in fields.items()))
+        now = self._clock()
+
+        with self._lock:
+            state = self._warnings.get(key)
+            if (
+                state is not None
+                and now - state.first_seen < self._warning_summary_interval
+            ):
+                state.count += 1
+                return False
+
+            if state is not None:
+                if state.count:
+                    event_dict["repeated"] = state.count
+                del self._warnings[key]
+            elif len(self._warnings) >= MAX_TRACKED_WARNINGS:
+                _, evicted = self._warnings.popitem(last=False)
+                if evicted.count and len(self._evicted) < MAX_TRACKED_WARNINGS:
+                    self._evicted.append(evicted)
+            self._warnings[key] = _CollapsedWarning(now, fields)
+            return True
+
+    def flush(self, force: bool = False) -> List[EventDict]:
+        """Take the repeat counts of warnings whose interval has passed.
+
+        Warnings that were not seen again after their duplicates were
+        suppressed would otherwise never report the count.
+
+        Args:
+            force: Take every pending count regardless of the interval, e.g.
+                at shutdown
+
+        Returns:
+            The collapsed warnings with their ``repeated`` counts, to be
+            logged again
+        """
+        now = self._clock()
+        with self._lock:
+            summaries = [state.summary() for state in self._evicted]
+            self._evicted.clear()
+            for key, state in list(self._warnings.items()):
+                if force or now - state.first_seen >= self._warning_summary_interval:
+                    del self._warnings[key]
+                    if state.count:
+                        summaries.append(state.summary())
+        return summaries
+
+    def __call__(
+        self, logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> EventDict:
+        """Drop the event if it is sampled out or a collapsed duplicate."""
+        if self._is_important(event_dict):
+            return event_dict
+
+        event = event_dict.get("event")
+        if event in self._periods and not self._sample(event):
+            raise structlog.DropEvent
+
+        if event_dict.get("level") == "warning" and not self._collapse_warning(
+            event_dict
+        ):
+            raise structlog.DropEvent
+
+        return event_dict
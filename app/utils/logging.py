@@ -1,24 +1,205 @@
-import structlog
+import atexit
+import copy
 import logging
-import sys
+import logging.handlers
 import os
-from typing import Union
+import queue
+import sys
+import threading
+from typing import Any, List, Mapping, Optional, Union, cast
+
+import orjson
+import structlog
 from structlog.stdlib import BoundLogger
-from structlog.types import Processor
+from structlog.types import EventDict, Processor
+
+from app.utils.log_sampling import LogSampler, parse_sample_ratios
+
+# Default capacity of the in-memory log queue between request handlers and the
+# background writer thread.
+DEFAULT_LOG_QUEUE_SIZE = 10000
+
+# Shortest period between flushes of collapsed-warning counts, in seconds
+MIN_SUMMARY_FLUSH_INTERVAL = 1.0
+
+_listener: Optional["_LogListener"] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+_sampler: Optional[LogSampler] = None
+_summary_flusher: Optional["_WarningSummaryFlusher"] = None
+
+
+def _orjson_dumps(obj: Any, **kwargs: Any) -> str:
+    """Serialize a log event dict with orjson.
+
+    Args:
+        obj: Event dictionary to serialize
+        **kwargs: Ignored, accepted for ``JSONRenderer`` compatibility
+
+    Returns:
+        JSON string
+    """
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks the caller.
+
+    Records are enqueued unformatted so JSON rendering happens on the
+    listener thread. When the bounded queue is full the record is dropped
+    and counted instead of stalling the event loop.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Return a shallow copy of the record without formatting it."""
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Enqueue a record, dropping it if the queue is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+class _LogListener(logging.handlers.QueueListener):
+    """Queue listener whose shutdown is bounded in time.
+
+    Stopping waits up to ``stop_timeout`` seconds for room for the stop
+    sentinel and again for the writer to finish. A writer that died or
+    stalled cannot hang the process at exit: queued records are then
+    abandoned to make room for the sentinel.
+    """
+
+    stop_timeout = 5.0
+
+    def enqueue_sentinel(self) -> None:
+        """Enqueue the stop sentinel, discarding records if it does not fit."""
+        sentinel = self._sentinel  # type: ignore[attr-defined]
+        log_queue = cast("queue.Queue[Any]", self.queue)
+        try:
+            log_queue.put(sentinel, timeout=self.stop_timeout)
+            return
+        except queue.Full:
+            pass
+        while True:
+            try:
+                log_queue.put_nowait(sentinel)
+                return
+            except queue.Full:
+                try:
+                    log_queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def stop(self) -> None:
+        """Stop the writer, waiting at most ``stop_timeout`` for it."""
+        self.enqueue_sentinel()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=self.stop_timeout)
+            self._thread = None
+
+
+def _log_warning_summaries(summaries: List[EventDict]) -> None:
+    """Log collapsed warnings again with their repeat counts."""
+    for summary in summaries:
+        fields = dict(summary)
+        fields.pop("level", None)
+        name = fields.pop("logger", None)
+        event = fields.pop("event", "repeated_warning")
+        structlog.get_logger(name).warning(event, **fields)
+
+
+class _WarningSummaryFlusher(threading.Thread):
+    """Periodically log the repeat counts of collapsed warnings."""
+
+    def __init__(self, sampler: LogSampler, interval: float) -> None:
+        super().__init__(name="log-warning-summaries", daemon=True)
+        self._sampler = sampler
+        self._interval = interval
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            _log_warning_summaries(self._sampler.flush())
+
+    def stop(self) -> None:
+        """Stop the thread and log every pending count."""
+        self._stopped.set()
+        self.join(timeout=5)
+        _log_warning_summaries(self._sampler.flush(force=True))
+
+
+def get_dropped_log_count() -> int:
+    """Get the number of log records dropped due to queue overflow.
+
+    Returns:
+        Number of dropped records since logging was configured
+    """
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def set_log_sample_ratios(sample_ratios: Mapping[str, float]) -> None:
+    """Replace the log sampling ratios without reconfiguring logging.
+
+    Args:
+        sample_ratios: Keep ratio per event name
+    """
+    if _sampler is not None:
+        _sampler.set_sample_ratios(sample_ratios)
+
+
+def shutdown_logging() -> None:
+    """Stop the background writer, flushing any queued records.
+
+    Repeat counts of collapsed warnings are logged first.
+    """
+    global _listener, _queue_handler, _summary_flusher
+
+    if _summary_flusher is not None:
+        _summary_flusher.stop()
+        _summary_flusher = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    _queue_handler = None
 
 
 def configure_logging(
-    log_level: str = "INFO", environment: str = "production"
+    log_level: str = "INFO",
+    environment: str = "production",
+    queue_size: int = DEFAULT_LOG_QUEUE_SIZE,
+    sample_ratios: Optional[Mapping[str, float]] = None,
+    slow_request_threshold: float = 1.0,
+    warning_summary_interval: float = 60.0,
 ) -> structlog.stdlib.BoundLogger:
     """Configure structlog for the application.
 
+    Log records are handed to a bounded queue and written to stdout by a
+    background listener thread, so a slow stdout never blocks request
+    handling.
+
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR)
         environment: Environment name (production, development)
+        queue_size: Maximum number of records buffered before dropping
+        sample_ratios: Keep ratio per event name for hot-path events
+        slow_request_threshold: Duration in seconds above which events are
+            never sampled out
+        warning_summary_interval: Seconds during which identical warnings
+            are collapsed into a single summary
 
     Returns:
         Configured logger instance
     """
+    global _listener, _queue_handler, _sampler, _summary_flusher
+
     # Set stdlib logging level
     logging.basicConfig(
         format="%(message)s",
@@ -26,18 +207,25 @@ def configure_logging(
         level=getattr(logging, log_level.upper()),
     )
 
+    # Replace any previous writer thread before starting a new one
+    shutdown_logging()
+
     timestamper = structlog.processors.TimeStamper(fmt="iso")
+    sampler = _sampler = LogSampler(
+        sample_ratios=sample_ratios,
+        slow_request_threshold=slow_request_threshold,
+        warning_summary_interval=warning_summary_interval,
+    )
 
+    # Processors applied to both structlog and foreign stdlib records
     shared_processors: list[Processor] = [
         structlog.contextvars.merge_contextvars,
-        structlog.stdlib.filter_by_level,
         structlog.stdlib.add_logger_name,
         structlog.stdlib.add_log_level,
         structlog.stdlib.PositionalArgumentsFormatter(),
         timestamper,
         structlog.processors.StackInfoRenderer(),
         structlog.processors.format_exc_info,
-        structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
     ]
 
     if environment == "development":
@@ -46,18 +234,27 @@ def configure_logging(
             structlog.dev.ConsoleRenderer, structlog.processors.JSONRenderer
         ] = structlog.dev.ConsoleRenderer()
     else:
-        # JSON output for production
-        formatter = structlog.processors.JSONRenderer()
+        # JSON output for production, rendered with orjson
+        formatter = structlog.processors.JSONRenderer(serializer=_orjson_dumps)
 
     structlog.configure(
-        processors=shared_processors,
+        processors=[
+            structlog.stdlib.filter_by_level,
+            # Sampling drops events with DropEvent, which only structlog's
+            # own chain handles; foreign records are formatted on the
+            # listener thread, where it would kill the writer
+            *shared_processors[:3],
+            sampler,
+            *shared_processors[3:],
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
 
     # Configure the formatter for stdlib logging
-    handler = logging.StreamHandler()
+    handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(
         structlog.stdlib.ProcessorFormatter(
             processor=formatter,
@@ -65,8 +262,18 @@ def configure_logging(
         )
     )
 
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _listener = _LogListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    # Collapsed warnings that do not recur still get their count logged
+    _summary_flusher = _WarningSummaryFlusher(
+        sampler, max(warning_summary_interval, MIN_SUMMARY_FLUSH_INTERVAL)
+    )
+    _summary_flusher.start()
+
     root_logger = logging.getLogger()
-    root_logger.handlers = [handler]
+    root_logger.handlers = [_queue_handler]
     root_logger.setLevel(getattr(logging, log_level.upper()))
 
     # Create and return logger
@@ -85,8 +292,24 @@ def get_logger(name: str | None = None) -> BoundLogger:
     return structlog.get_logger(name)  # type: ignore[no-any-return]
 
 
-# Configure logging on module import
-logger = configure_logging(
-    log_level=os.getenv("LOG_LEVEL", "INFO"),
-    environment=os.getenv("ENVIRONMENT", "production"),
-)
+def ensure_logging_configured() -> None:
+    """Configure logging from environment variables unless already configured.
+
+    Importing this module has no side effects; entry points (the production
+    launcher, its workers and the application lifespan) call this instead,
+    so importing the app stays cheap and explicit ``configure_logging``
+    calls are not overridden.
+    """
+    if _listener is not None:
+        return
+    configure_logging(
+        log_level=os.getenv("LOG_LEVEL", "INFO"),
+        environment=os.getenv("ENVIRONMENT", "production"),
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", str(DEFAULT_LOG_QUEUE_SIZE))),
+        sample_ratios=parse_sample_ratios(os.getenv("LOG_SAMPLE_RATIOS", "")),
+        slow_request_threshold=float(os.getenv("LOG_SLOW_REQUEST_THRESHOLD", "1.0")),
+        warning_summary_interval=float(os.getenv("LOG_WARNING_SUMMARY_INTERVAL", "60")),
+    )
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,96 @@
+"""Event loop lag measurement and blocking-callback detection."""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from app.utils.logging import get_logger
+from app.utils.metrics import EVENT_LOOP_LAG
+
+logger = get_logger(__name__)
+
+
+class EventLoopMonitor:
+    """Continuously measure event loop scheduling lag.
+
+    A background task sleeps for ``interval`` seconds and records how late
+    it wakes up in the ``EVENT_LOOP_LAG`` histogram, logging a warning when
+    the lag exceeds ``lag_threshold``. With ``debug`` enabled, a watchdog
+    thread also captures the event loop thread's stack whenever the loop
+    has been blocked for longer than ``block_threshold``, which identifies
+    the offending synchronous call.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.25,
+        lag_threshold: float = 0.1,
+        debug: bool = False,
+        block_threshold: float = 0.1,
+    ) -> None:
+        self.interval = interval
+        self.lag_threshold = lag_threshold
+        self.debug = debug
+        self.block_threshold = block_threshold
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = 0
+
+    def start(self) -> None:
+        """Start monitoring the running event loop."""
+        self._stopped.clear()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = threading.get_ident()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        if self.debug:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="event-loop-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop monitoring."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._heartbeat = time.monotonic()
+            EVENT_LOOP_LAG.observe(lag)
+            if lag >= self.lag_threshold:
+                logger.warning("event_loop_lag", lag=round(lag, 4))
+
+    def _watch(self) -> None:
+        reported = 0.0
+        while not self._stopped.wait(self.block_threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.block_threshold or heartbeat == reported:
+                continue
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            logger.warning(
+                "event_loop_blocked",
+                blocked_for=round(blocked, 4),
+                stack="".join(traceback.format_stack(frame)),
+            )
@@ -0,0 +1,647 @@
+"""Prometheus-compatible metrics with fixed-bucket histograms.
+
+Metric values live in preallocated per-label-set slots that are updated in
+place. Updates happen on the event loop thread and take no locks; a scrape
+only reads the current values.
+
+When several worker processes serve the same port, each worker periodically
+writes a snapshot of its registry to a shared directory and ``/metrics``
+merges the snapshots of all workers.
+"""
+
+import asyncio
+import os
+from bisect import bisect_left
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+import orjson
+
+from app.utils.inflight import registry as inflight_registry
+from app.utils.logging import get_dropped_log_count
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, sized for LLM proxy requests
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+# Finer buckets for per-token and event loop latencies
+FAST_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Format a label set as ``{name="value",...}``."""
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class CounterValue:
+    """Monotonically increasing value for one label set."""
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the counter."""
+        self.value += amount
+
+
+class GaugeValue:
+    """Arbitrary value for one label set."""
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        """Set the gauge."""
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the gauge."""
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrement the gauge."""
+        self.value -= amount
+
+
+class HistogramValue:
+    """Fixed-bucket histogram for one label set."""
+
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record an observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Collection of metrics exposed on ``/metrics``."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, "Metric[Any]"] = {}
+
+    def register(self, metric: "Metric[Any]") -> "Metric[Any]":
+        """Register a metric.
+
+        Raises:
+            ValueError: If a metric with the same name is already registered
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Capture all metric families as JSON-serializable data."""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        return render_snapshot(self.snapshot())
+
+
+def _family_lines(name: str, family: Dict[str, Any]) -> List[str]:
+    """Render one metric family snapshot."""
+    lines = [
+        f"# HELP {name} {family['help']}",
+        f"# TYPE {name} {family['type']}",
+    ]
+    labelnames = family["labelnames"]
+
+    if family["type"] != "histogram":
+        for values, value in family["values"]:
+            labels = _format_labels(labelnames, values)
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return lines
+
+    bucket_names = (*labelnames, "le")
+    bounds = [*(_format_value(b) for b in family["buckets"]), "+Inf"]
+    for values, (counts, total) in family["values"]:
+        cumulative = 0
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            labels = _format_labels(bucket_names, (*values, bound))
+            lines.append(f"{name}_bucket{labels} {_format_value(cumulative)}")
+        labels = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {_format_value(cumulative)}")
+    return lines
+
+
+def render_snapshot(snapshot: Dict[str, Dict[str, Any]]) -> str:
+    """Render a registry snapshot in the Prometheus text exposition format.
+
+    Args:
+        snapshot: Output of :meth:`MetricsRegistry.snapshot` or
+            :func:`merge_snapshots`
+
+    Returns:
+        Exposition text
+    """
+    lines: List[str] = []
+    for name, family in snapshot.items():
+        lines.extend(_family_lines(name, family))
+    return "\n".join(lines) + "\n"
+
+
+def _combine(family: Dict[str, Any], current: Any, value: Any) -> Any:
+    """Combine two values of the same label set from different workers."""
+    if family["type"] == "histogram":
+        counts = [a + b for a, b in zip(current[0], value[0])]
+        return [counts, current[1] + value[1]]
+    if family["type"] == "gauge" and family.get("mode") == "max":
+        return max(current, value)
+    return current + value
+
+
+def merge_snapshots(
+    snapshots: Sequence[Dict[str, Dict[str, Any]]]
+) -> Dict[str, Dict[str, Any]]:
+    """Aggregate registry snapshots from several worker processes.
+
+    Counters and histograms are summed per label set; gauges are summed or
+    maxed according to their multiprocess mode.
+
+    Args:
+        snapshots: Registry snapshots, one per worker
+
+    Returns:
+        Merged snapshot
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    merged_values: Dict[str, Dict[Tuple[str, ...], Any]] = {}
+    for snapshot in snapshots:
+        for name, family in snapshot.items():
+            if name not in merged:
+                merged[name] = {**family, "values": []}
+                merged_values[name] = {}
+            values = merged_values[name]
+            for labels, value in family["values"]:
+                key = tuple(labels)
+                if key in values:
+                    values[key] = _combine(family, values[key], value)
+                else:
+                    values[key] = value
+
+    for name, family in merged.items():
+        family["values"] = [
+            [list(labels), value] for labels, value in merged_values[name].items()
+        ]
+    return merged
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{pid}.json")
+
+
+def write_snapshot(directory: str, registry: Optional[MetricsRegistry] = None) -> None:
+    """Atomically write this process's registry snapshot to ``directory``.
+
+    Args:
+        directory: Shared multiprocess metrics directory
+        registry: Registry to snapshot (defaults to the global registry)
+    """
+    snapshot = (registry or REGISTRY).snapshot()
+    path = _snapshot_path(directory, os.getpid())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(snapshot))
+    os.replace(tmp_path, path)
+
+
+def read_snapshots(
+    directory: str, exclude_pid: Optional[int] = None
+) -> List[Dict[str, Dict[str, Any]]]:
+    """Read all worker snapshots from ``directory``.
+
+    Args:
+        directory: Shared multiprocess metrics directory
+        exclude_pid: Skip the snapshot of this process
+
+    Returns:
+        Registry snapshots; unreadable files are skipped
+    """
+    snapshots = []
+    excluded = f"{exclude_pid}.json"
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json") or filename == excluded:
+            continue
+        try:
+            with open(os.path.join(directory, filename), "rb") as f:
+                snapshots.append(orjson.loads(f.read()))
+        except (OSError, orjson.JSONDecodeError):
+            continue
+    return snapshots
+
+
+def mark_process_dead(directory: str, pid: int) -> None:
+    """Drop gauges from a dead worker's snapshot.
+
+    Counters and histograms are kept so that aggregated totals do not go
+    backwards when a worker is restarted; gauges describe live state and
+    would otherwise stay stale forever.
+
+    Args:
+        directory: Shared multiprocess metrics directory
+        pid: Process ID of the dead worker
+    """
+    path = _snapshot_path(directory, pid)
+    try:
+        with open(path, "rb") as f:
+            snapshot = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return
+    kept = {
+        name: family for name, family in snapshot.items() if family["type"] != "gauge"
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(kept))
+    os.replace(tmp_path, path)
+
+
+def render_multiprocess(
+    directory: str, registry: Optional[MetricsRegistry] = None
+) -> str:
+    """Render the live local registry merged with all other workers.
+
+    Args:
+        directory: Shared multiprocess metrics directory
+        registry: Local registry (defaults to the global registry)
+
+    Returns:
+        Exposition text
+    """
+    local = (registry or REGISTRY).snapshot()
+    others = read_snapshots(directory, exclude_pid=os.getpid())
+    return render_snapshot(merge_snapshots([local, *others]))
+
+
+class SnapshotWriter:
+    """Periodically write this worker's metrics snapshot in the background."""
+
+    def __init__(
+        self,
+        directory: str,
+        interval: float = 5.0,
+        registry: Optional[MetricsRegistry] = None,
+    ) -> None:
+        self.directory = directory
+        self.interval = interval
+        self.registry = registry
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def start(self) -> None:
+        """Write an initial snapshot and start the background task."""
+        os.makedirs(self.directory, exist_ok=True)
+        write_snapshot(self.directory, self.registry)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write a final snapshot."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        write_snapshot(self.directory, self.registry)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            write_snapshot(self.directory, self.registry)
+
+
+REGISTRY = MetricsRegistry()
+
+ChildT = TypeVar("ChildT")
+
+
+class Metric(Generic[ChildT]):
+    """Base class for a named metric family with optional labels."""
+
+    type_name = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+        registry: Optional[MetricsRegistry] = REGISTRY,
+    ) -> None:
+        if function is not None and labelnames:
+            raise ValueError("Function-backed metrics cannot have labels")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._children: Dict[Tuple[str, ...], ChildT] = {}
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self) -> ChildT:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> ChildT:
+        """Get the value slot for a label set, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}, got {values}"
+                )
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _value(self, child: ChildT) -> Any:
+        raise NotImplementedError
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Capture the metric family as JSON-serializable data.
+
+        Returns:
+            Family metadata and ``[label_values, value]`` pairs, where a
+            histogram value is ``[bucket_counts, sum]``
+        """
+        if self.function is not None:
+            values: List[Any] = [[[], self.function()]]
+        else:
+            values = [
+                [list(labels), self._value(child)]
+                for labels, child in list(self._children.items())
+            ]
+        return {
+            "type": self.type_name,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "values": values,
+        }
+
+
+class Counter(Metric[CounterValue]):
+    """Counter metric."""
+
+    type_name = "counter"
+
+    def _new_child(self) -> CounterValue:
+        return CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment an unlabelled counter."""
+        self.labels().inc(amount)
+
+    def _value(self, child: CounterValue) -> float:
+        return child.value
+
+
+class Gauge(Metric[GaugeValue]):
+    """Gauge metric.
+
+    ``multiprocess_mode`` controls how values from several workers are
+    combined: ``sum`` (e.g. in-flight requests) or ``max`` (e.g. ratios).
+    """
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+        registry: Optional[MetricsRegistry] = REGISTRY,
+        multiprocess_mode: str = "sum",
+    ) -> None:
+        if multiprocess_mode not in ("sum", "max"):
+            raise ValueError(f"Unsupported multiprocess mode: {multiprocess_mode}")
+        self.multiprocess_mode = multiprocess_mode
+        super().__init__(name, documentation, labelnames, function, registry)
+
+    def _new_child(self) -> GaugeValue:
+        return GaugeValue()
+
+    def set(self, value: float) -> None:
+        """Set an unlabelled gauge."""
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment an unlabelled gauge."""
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrement an unlabelled gauge."""
+        self.labels().dec(amount)
+
+    def _value(self, child: GaugeValue) -> float:
+        return child.value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Capture the gauge, including how it combines across workers."""
+        family = super().snapshot()
+        family["mode"] = self.multiprocess_mode
+        return family
+
+
+class Histogram(Metric[HistogramValue]):
+    """Histogram metric with fixed, preallocated buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[MetricsRegistry] = REGISTRY,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry=registry)
+
+    def _new_child(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Record an observation on an unlabelled histogram."""
+        self.labels().observe(value)
+
+    def _value(self, child: HistogramValue) -> List[Any]:
+        return [list(child.counts), child.sum]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Capture the histogram, including its bucket bounds."""
+        family = super().snapshot()
+        family["buckets"] = list(self.buckets)
+        return family
+
+
+HTTP_REQUESTS = Counter(
+    "ollama_proxy_http_requests_total",
+    "Total HTTP requests by route, method and status code.",
+    ("route", "method", "status"),
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "ollama_proxy_http_request_duration_seconds",
+    "HTTP request latency by route and model.",
+    ("route", "model"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "ollama_proxy_http_requests_in_flight",
+    "HTTP requests currently being processed, including streams.",
+    function=lambda: float(len(inflight_registry)),
+)
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "ollama_proxy_upstream_request_duration_seconds",
+    "Upstream request latency until the response body closed by backend.",
+    ("backend",),
+)
+UPSTREAM_RESPONSES = Counter(
+    "ollama_proxy_upstream_responses_total",
+    "Upstream responses by backend and status code.",
+    ("backend", "status"),
+)
+UPSTREAM_CONCURRENCY_LIMIT = Gauge(
+    "ollama_proxy_upstream_concurrency_limit",
+    "Adaptive limit on concurrent upstream requests by backend.",
+    ("backend",),
+)
+UPSTREAM_CONCURRENCY_IN_USE = Gauge(
+    "ollama_proxy_upstream_concurrency_in_use",
+    "Upstream requests holding a concurrency slot by backend.",
+    ("backend",),
+)
+CACHE_LOOKUPS = Counter(
+    "ollama_proxy_cache_lookups_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ("cache", "result"),
+)
+EVENT_LOOP_LAG = Histogram(
+    "ollama_proxy_event_loop_lag_seconds",
+    "Delay between scheduled and actual event loop wake-ups.",
+    buckets=FAST_BUCKETS,
+)
+LOG_RECORDS_DROPPED = Counter(
+    "ollama_proxy_log_records_dropped_total",
+    "Log records dropped because the log queue was full.",
+    function=lambda: float(get_dropped_log_count()),
+)
+CONFIG_RELOADS = Counter(
+    "ollama_proxy_config_reloads_total",
+    "Configuration reload attempts by result (success or failure).",
+    ("result",),
+)
+ADMISSION_QUEUE_TIME = Histogram(
+    "ollama_proxy_admission_queue_seconds",
+    "Time requests waited for an admission slot by model.",
+    ("model",),
+)
+ADMISSION_REJECTIONS = Counter(
+    "ollama_proxy_admission_rejections_total",
+    "Requests rejected by admission control by reason.",
+    ("reason",),
+)
+
+
+def _admission_queued() -> float:
+    # Imported lazily: the admission controller itself records metrics
+    from app.utils.admission import admission
+
+    return float(admission.queued)
+
+
+ADMISSION_QUEUED = Gauge(
+    "ollama_proxy_admission_queued_requests",
+    "Requests waiting for an admission slot.",
+    function=_admission_queued,
+)
+SHED_REQUESTS = Counter(
+    "ollama_proxy_shed_requests_total",
+    "Requests rejected by load shedding by priority class.",
+    ("priority",),
+)
+DROPPED_OPTIONS = Counter(
+    "ollama_proxy_dropped_options_total",
+    "Ollama options without an OpenAI equivalent dropped from requests.",
+    ("option",),
+)
+
+
+def _load_pressure() -> float:
+    # Imported lazily: the load shedder itself records metrics
+    from app.utils.load_shedding import shedder
+
+    return shedder.pressure()
+
+
+LOAD_PRESSURE = Gauge(
+    "ollama_proxy_load_pressure_ratio",
+    "Measured p99 latency or queue depth relative to its SLO (worse of the two).",
+    function=_load_pressure,
+    multiprocess_mode="max",
+)
@@ -1,23 +1,188 @@
+import asyncio
 import time
-import uuid
-from typing import Callable
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from starlette.responses import Response, StreamingResponse
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import orjson
 import structlog
 from structlog.contextvars import bind_contextvars, clear_contextvars
 
+from app.config import config_store, current_settings, settings
+from app.utils.admission import admission
+from app.utils.deadline import (
+    TIMEOUT_BODY_FIELD,
+    TIMEOUT_HEADER,
+    Deadline,
+    current_deadline,
+    parse_timeout,
+    route_budget,
+)
+from app.utils.errors import (
+    DeadlineExceededException,
+    ProxyException,
+    RequestCancelledException,
+    ServiceUnavailableException,
+)
+from app.utils.inflight import (
+    STAGE_HANDLER,
+    STAGE_QUEUED,
+    STAGE_STREAMING,
+    STAGE_WRITING,
+    InflightRequest,
+    current_inflight,
+    registry,
+)
+from app.utils.lifecycle import HEALTH_PATH_PREFIX, lifecycle
+from app.utils.load_shedding import classify, shedder
+from app.utils.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, HistogramValue
+from app.utils.request_id import (
+    REQUEST_ID_HEADER,
+    current_request_id,
+    generate_request_id,
+    parse_inbound_request_id,
+)
+from app.utils.timing import (
+    SERVER_TIMING_HEADER,
+    STAGE_VALIDATE,
+    RequestTimer,
+    add_stream_trailer,
+    current_timer,
+    record_stage,
+)
+from app.utils.tracing import (
+    STAGE_PARSE,
+    STAGE_REQUEST,
+    STAGE_RESPONSE_WRITE,
+    TRACEPARENT_HEADER,
+    Span,
+    tracer,
+)
+
 logger = structlog.get_logger(__name__)
 
 
+# Request paths that are forwarded upstream (admission control, body options)
+UPSTREAM_PATH_PREFIXES = ("/api/", "/v1/")
+
+# Media type of Ollama streaming responses
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Scope state key caching the parsed JSON body of an upstream-bound request
+_JSON_BODY_STATE = "json_body"
+
+# Scope state key (``request.state.model``) of the requested model
+_MODEL_STATE = "model"
+
+
+def _route_label(request: Request) -> str:
+    """Get a bounded-cardinality route label for metrics."""
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+def _is_upstream_request(scope: Scope) -> bool:
+    """Whether a request is an upstream-bound POST with a JSON body."""
+    return scope["method"] == "POST" and bool(
+        scope["path"].startswith(UPSTREAM_PATH_PREFIXES)
+    )
+
+
+async def _buffer_body(receive: Receive) -> Tuple[bytes, Receive]:
+    """Read the full request body and return a receive that replays it."""
+    chunks: List[bytes] = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            # Client went away; let the application see the disconnect
+            return b"".join(chunks), receive
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay() -> Message:
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
+
+
+def _parse_model(payload: Any) -> str:
+    """Extract the requested model from a parsed JSON body, if any."""
+    model = payload.get("model") if isinstance(payload, dict) else None
+    return model if isinstance(model, str) else ""
+
+
+async def _read_json_body(scope: Scope, receive: Receive) -> Tuple[Any, Receive]:
+    """Parse the JSON request body once per request.
+
+    The body is buffered and replayed to the application; the parsed value
+    is cached in the scope state for middleware further down the stack,
+    along with the requested model.
+
+    Returns:
+        Parsed body (None if it is not valid JSON) and the receive to use
+    """
+    state = scope.setdefault("state", {})
+    if _JSON_BODY_STATE in state:
+        return state[_JSON_BODY_STATE], receive
+    body, receive = await _buffer_body(receive)
+    start_ns = time.time_ns()
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        payload = None
+    end_ns = time.time_ns()
+    tracer.record_span(STAGE_PARSE, start_ns, end_ns, body_bytes=len(body))
+    record_stage(STAGE_VALIDATE, (end_ns - start_ns) / 1e9)
+    state[_JSON_BODY_STATE] = payload
+    state[_MODEL_STATE] = _parse_model(payload)
+    return payload, receive
+
+
+async def _send_error(
+    exc: ProxyException, scope: Scope, receive: Receive, send: Send
+) -> None:
+    """Send a ProxyException as a JSON error response."""
+    request_id = scope.get("state", {}).get("request_id")
+    response = JSONResponse(
+        status_code=exc.status_code,
+        content=exc.to_error_response(request_id).model_dump(exclude_none=True),
+        headers=exc.headers,
+    )
+    await response(scope, receive, send)
+
+
 class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for request/response logging with request ID injection."""
+    """Middleware for request/response logging with request ID injection.
+
+    The request's root trace span stays open until the response body has
+    been sent, so streamed generations are traced for their full length.
+    """
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """Process request and log details."""
-        # Generate request ID
-        request_id = str(uuid.uuid4())
+        # The request keeps the settings snapshot it started with, even if
+        # the configuration is reloaded while it is in flight
+        settings_token = config_store.pin()
+
+        # Reuse a trusted inbound correlation ID or generate a new one
+        request_id = None
+        if settings.trust_inbound_request_id:
+            request_id = parse_inbound_request_id(request.headers)
+        if request_id is None:
+            request_id = generate_request_id()
         request.state.request_id = request_id
+        token = current_request_id.set(request_id)
+        timer = RequestTimer()
+        request.state.timer = timer
+        timer_token = current_timer.set(timer)
 
         # Clear any existing context and bind new request ID
         clear_contextvars()
@@ -38,11 +203,54 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 
         # Process request
         start_time = time.time()
-        response = await call_next(request)
+        span = tracer.begin_span(
+            STAGE_REQUEST,
+            traceparent=request.headers.get(TRACEPARENT_HEADER),
+            request_id=request_id,
+            http_method=request.method,
+        )
+        try:
+            with tracer.use_span(span):
+                response = await call_next(request)
+        except BaseException:
+            tracer.end_span(span)
+            raise
+        finally:
+            current_request_id.reset(token)
+            current_timer.reset(timer_token)
+            current_settings.reset(settings_token)
         duration = time.time() - start_time
 
+        route = _route_label(request)
+        if span is not None:
+            span.set_attribute("http_route", route)
+            span.set_attribute("http_status_code", response.status_code)
+            span.error = response.status_code >= 500
+        HTTP_REQUESTS.labels(route, request.method, str(response.status_code)).inc()
+        # call_next always wraps the body in a stream, so tell real streams
+        # apart by the missing Content-Length
+        is_streaming = "content-length" not in response.headers
+
+        # The request lasts until its body (possibly a stream) has been sent
+        trailer_timer = None
+        if (
+            is_streaming
+            and settings.server_timing_stream_trailer
+            and response.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE)
+        ):
+            trailer_timer = timer
+        response.body_iterator = self._complete_with_body(
+            response.body_iterator,
+            span,
+            HTTP_REQUEST_DURATION.labels(
+                route, settings.model_label(getattr(request.state, "model", ""))
+            ),
+            start_time,
+            trailer_timer,
+        )
+
         # Handle streaming responses
-        if isinstance(response, StreamingResponse):
+        if is_streaming:
             # For streaming responses, status is logged before streaming completes
             logger.info(
                 "request_completed",
@@ -64,9 +272,362 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             )
 
         # Add request ID to response headers
-        response.headers["X-Request-ID"] = request_id
+        response.headers[REQUEST_ID_HEADER] = request_id
+
+        # Stage timings are complete once a non-streaming response is built
+        if not is_streaming:
+            response.headers[SERVER_TIMING_HEADER] = timer.header_value()
 
         # Clear context after request
         clear_contextvars()
 
         return response  # type: ignore[no-any-return]
+
+    @staticmethod
+    async def _complete_with_body(
+        body: AsyncIterator[bytes],
+        span: Optional[Span],
+        duration: HistogramValue,
+        start_time: float,
+        trailer_timer: Optional[RequestTimer],
+    ) -> AsyncIterator[bytes]:
+        """Pass the response body through, completing the request after it.
+
+        With a ``trailer_timer`` the stage timings are added to the final
+        NDJSON chunk. The request duration is observed and the root span
+        ended once the last chunk was sent or the body failed.
+        """
+        write_start_ns = time.time_ns()
+        try:
+            async for chunk in body:
+                if trailer_timer is not None:
+                    chunk = add_stream_trailer(chunk, trailer_timer)
+                yield chunk
+        except BaseException:
+            if span is not None:
+                span.error = True
+            raise
+        finally:
+            duration.observe(time.time() - start_time)
+            if span is not None:
+                with tracer.use_span(span):
+                    tracer.record_span(
+                        STAGE_RESPONSE_WRITE, write_start_ns, time.time_ns()
+                    )
+                tracer.end_span(span)
+
+
+class InflightMiddleware:
+    """Register in-flight requests and finish cancelled ones cleanly.
+
+    Each request is tracked in the in-flight registry until its response
+    body has been fully sent, including streams. When a request is
+    cancelled through the registry, a stream receives a final Ollama error
+    chunk and a request without a response yet gets a JSON error response.
+    While the process is draining for shutdown, new requests other than
+    health probes are rejected with a 503 and ``Connection: close``.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Process an ASGI request."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = scope.get("state", {}).get("request_id") or generate_request_id()
+        if lifecycle.draining and not scope["path"].startswith(HEALTH_PATH_PREFIX):
+            await self._reject_draining(request_id, scope, receive, send)
+            return
+
+        entry = InflightRequest(
+            request_id=request_id,
+            method=scope["method"],
+            path=scope["path"],
+            task=asyncio.current_task(),
+        )
+        registry.add(entry)
+        token = current_inflight.set(entry)
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                entry.route = getattr(scope.get("route"), "path", "")
+                has_length = any(
+                    name.lower() == b"content-length"
+                    for name, _ in message.get("headers", [])
+                )
+                entry.stage = STAGE_WRITING if has_length else STAGE_STREAMING
+            elif message["type"] == "http.response.body":
+                entry.bytes_sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except asyncio.CancelledError:
+            task = asyncio.current_task()
+            if entry.cancel_reason is None or task is None:
+                raise
+            task.uncancel()
+            await self._finish_cancelled(entry, response_started, scope, receive, send)
+        finally:
+            current_inflight.reset(token)
+            registry.remove(entry)
+
+    @staticmethod
+    async def _reject_draining(
+        request_id: str, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        """Refuse a request that arrived after draining started."""
+        exc = ServiceUnavailableException("Server is shutting down")
+        response = JSONResponse(
+            status_code=exc.status_code,
+            content=exc.to_error_response(request_id).model_dump(exclude_none=True),
+            headers={"Connection": "close"},
+        )
+        await response(scope, receive, send)
+
+    @staticmethod
+    async def _finish_cancelled(
+        entry: InflightRequest,
+        response_started: bool,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        """Send the final message for a cancelled request."""
+        reason = entry.cancel_reason or "Request cancelled"
+        logger.warning(
+            "request_cancelled",
+            request_id=entry.request_id,
+            reason=reason,
+            stage=entry.stage,
+            elapsed=round(entry.elapsed, 3),
+        )
+
+        if not response_started:
+            exc = entry.cancel_exception or RequestCancelledException(reason)
+            response = JSONResponse(
+                status_code=exc.status_code,
+                content=exc.to_error_response(entry.request_id).model_dump(
+                    exclude_none=True
+                ),
+            )
+            await response(scope, receive, send)
+            return
+
+        # Streams end with an Ollama-style error chunk; a fixed-length body
+        # can only be closed early.
+        body = b""
+        if entry.stage == STAGE_STREAMING:
+            body = orjson.dumps({"error": reason}) + b"\n"
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+class DeadlineMiddleware:
+    """Give each request a deadline and cancel it once the deadline passes.
+
+    The budget is the route's (see ``route_timeouts``), shortened by the
+    client's timeout from the :data:`TIMEOUT_HEADER` header or, for
+    upstream-bound requests, the :data:`TIMEOUT_BODY_FIELD` body field. The
+    deadline is available to downstream code through ``current_deadline``;
+    when it passes, the request is cancelled through the in-flight registry
+    and finishes with a ``DEADLINE_EXCEEDED`` error.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Process an ASGI request."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = route_budget(
+            scope["path"], settings.route_timeouts, settings.request_timeout
+        )
+        try:
+            client_timeout, receive = await self._client_timeout(scope, receive)
+        except ProxyException as exc:
+            await _send_error(exc, scope, receive, send)
+            return
+        if client_timeout is not None:
+            budget = min(budget, client_timeout) if budget > 0 else client_timeout
+        if budget <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline(budget)
+        token = current_deadline.set(deadline)
+        entry = current_inflight.get()
+        timer = None
+        if entry is not None:
+            timer = asyncio.get_running_loop().call_later(
+                budget, self._expire, entry, budget
+            )
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            current_deadline.reset(token)
+
+    @staticmethod
+    async def _client_timeout(
+        scope: Scope, receive: Receive
+    ) -> Tuple[Optional[float], Receive]:
+        """Read the client's timeout from the header or the request body."""
+        header = TIMEOUT_HEADER.lower().encode("latin-1")
+        for name, value in scope.get("headers", []):
+            if name == header:
+                return parse_timeout(value.decode("latin-1"), TIMEOUT_HEADER), receive
+        if not _is_upstream_request(scope):
+            return None, receive
+        payload, receive = await _read_json_body(scope, receive)
+        if not isinstance(payload, dict):
+            return None, receive
+        timeout = parse_timeout(payload.get(TIMEOUT_BODY_FIELD), TIMEOUT_BODY_FIELD)
+        return timeout, receive
+
+    @staticmethod
+    def _expire(entry: InflightRequest, budget: float) -> None:
+        """Cancel a request whose deadline has passed."""
+        logger.warning(
+            "request_deadline_exceeded",
+            request_id=entry.request_id,
+            budget=budget,
+            stage=entry.stage,
+        )
+        registry.cancel_entry(
+            entry,
+            "Request deadline exceeded",
+            DeadlineExceededException(
+                "Request deadline exceeded", details={"budget_s": budget}
+            ),
+        )
+
+
+class LoadSheddingMiddleware:
+    """Shed low-priority upstream-bound requests when the SLOs are at risk.
+
+    Each upstream-bound request is assigned a priority class (see
+    :func:`~app.utils.load_shedding.classify`) and checked against the
+    shedder before it is queued for admission; shed requests get a 503
+    with ``Retry-After``. The time until response headers of the requests
+    let through feeds the shedder's p99 latency.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Process an ASGI request."""
+        if scope["type"] != "http" or not _is_upstream_request(scope):
+            await self.app(scope, receive, send)
+            return
+
+        priority = self._priority(scope)
+        entry = current_inflight.get()
+        if entry is not None:
+            entry.priority = priority
+        try:
+            await shedder.admit(priority, defer=settings.shed_defer_timeout)
+        except ProxyException as exc:
+            logger.warning("request_shed", priority=priority)
+            await _send_error(exc, scope, receive, send)
+            return
+
+        started = time.monotonic()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                shedder.observe(time.monotonic() - started)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _priority(scope: Scope) -> str:
+        """Select the priority class from the API key, path and header."""
+        header = settings.priority_header.lower().encode("latin-1")
+        requested = api_key = None
+        for name, value in scope.get("headers", []):
+            if name == header:
+                requested = value.decode("latin-1").strip().lower()
+            elif name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    api_key = token.strip()
+        return classify(
+            scope["path"],
+            requested=requested,
+            api_key=api_key,
+            api_key_classes=settings.priority_api_keys,
+            route_classes=settings.priority_routes,
+        )
+
+
+class AdmissionMiddleware:
+    """Hold upstream-bound requests until admission control grants a slot.
+
+    POST requests under :data:`UPSTREAM_PATH_PREFIXES` are queued per
+    tenant (from the configured tenant header, falling back to the client
+    address) and per requested model, read from the JSON body. The queue
+    wait is bounded by ``admission_max_queue_wait`` and by the request's
+    deadline. Requests that cannot be admitted get a 429 or 504 error
+    response.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Process an ASGI request."""
+        if scope["type"] != "http" or not _is_upstream_request(scope):
+            await self.app(scope, receive, send)
+            return
+
+        payload, receive = await _read_json_body(scope, receive)
+        model = _parse_model(payload)
+        tenant = self._tenant(scope)
+        deadline = time.monotonic() + settings.admission_max_queue_wait
+        request_deadline = current_deadline.get()
+        if request_deadline is not None:
+            deadline = min(deadline, request_deadline.expires_at)
+
+        entry = current_inflight.get()
+        if entry is not None:
+            entry.model = entry.model or model
+            entry.stage = STAGE_QUEUED
+        admitted = False
+        try:
+            async with admission.slot(tenant, model, deadline):
+                admitted = True
+                if entry is not None:
+                    entry.stage = STAGE_HANDLER
+                await self.app(scope, receive, send)
+        except ProxyException as exc:
+            if admitted:
+                raise
+            logger.warning(
+                "request_not_admitted",
+                tenant=tenant,
+                model=model,
+                error_code=exc.error_code,
+            )
+            await _send_error(exc, scope, receive, send)
+
+    @staticmethod
+    def _tenant(scope: Scope) -> str:
+        """Identify the tenant a request is queued under."""
+        header = settings.admission_tenant_header.lower().encode("latin-1")
+        for name, value in scope.get("headers", []):
+            if name == header and value:
+                return str(value.decode("latin-1"))
+        client = scope.get("client")
+        return str(client[0]) if client else "anonymous"
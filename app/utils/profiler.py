@@ -0,0 +1,102 @@
+"""On-demand statistical sampling profiler producing collapsed stacks."""
+
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional
+
+# Deepest stack recorded per sample
+MAX_STACK_DEPTH = 256
+
+
+def _frame_label(frame: FrameType) -> str:
+    """Label a frame as ``module:function``."""
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_name}"
+
+
+def collapse_stack(frame: Optional[FrameType], thread_name: str) -> str:
+    """Collapse a stack into ``thread;outer;...;inner`` form.
+
+    Args:
+        frame: Innermost frame of the stack
+        thread_name: Name of the sampled thread, used as the root frame
+
+    Returns:
+        Semicolon-separated stack, outermost frame first
+    """
+    labels: List[str] = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    labels.reverse()
+    return ";".join(labels)
+
+
+class SamplingProfiler:
+    """Sample the stacks of all other threads at a fixed rate.
+
+    Nothing runs until :meth:`run` is called, so the profiler has no cost
+    while idle. ``run`` blocks the calling thread and should be executed
+    off the event loop (e.g. with ``asyncio.to_thread``) so that the loop
+    itself is sampled.
+    """
+
+    def __init__(self, rate_hz: int = 100) -> None:
+        self.interval = 1.0 / rate_hz
+        self.samples: Counter[str] = Counter()
+
+    def run(self, seconds: float) -> None:
+        """Sample all threads for the given duration.
+
+        Args:
+            seconds: Sampling duration
+        """
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names: Dict[int, str] = {
+                t.ident: t.name for t in threading.enumerate() if t.ident is not None
+            }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                name = names.get(thread_id, f"thread-{thread_id}")
+                self.samples[collapse_stack(frame, name)] += 1
+            time.sleep(self.interval)
+
+    def collapsed(self) -> str:
+        """Render samples in the collapsed-stack format read by flamegraph tools.
+
+        Returns:
+            One ``stack count`` line per distinct stack
+        """
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.samples.most_common()
+        )
+
+
+_profile_lock = threading.Lock()
+
+
+def profile(seconds: float, rate_hz: int) -> Optional[str]:
+    """Run a profiling session unless one is already in progress.
+
+    Args:
+        seconds: Sampling duration
+        rate_hz: Samples per second
+
+    Returns:
+        Collapsed-stack output, or None if another session is running
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        profiler = SamplingProfiler(rate_hz)
+        profiler.run(seconds)
+        return profiler.collapsed()
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,103 @@
+"""Request ID generation and inbound correlation ID handling."""
+
+import itertools
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Mapping, Optional
+
+from app.utils.tracing import TRACEPARENT_HEADER, parse_traceparent
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:\-]{1,128}$")
+
+_COUNTER_BITS = 42
+_COUNTER_MASK = (1 << _COUNTER_BITS) - 1
+_RAND_B_BITS = 62
+_RAND_B_MASK = (1 << _RAND_B_BITS) - 1
+
+current_request_id: ContextVar[Optional[str]] = ContextVar(
+    "current_request_id", default=None
+)
+
+
+class RequestIdGenerator:
+    """Generate sortable, UUIDv7-formatted request IDs without ``os.urandom``.
+
+    Each ID packs a millisecond timestamp, a random per-process prefix
+    (drawn once, and again after ``fork``) and a process-local counter, so
+    IDs are unique across workers, sort by creation time and cost a clock
+    read plus string formatting.
+    """
+
+    def __init__(self) -> None:
+        self._counter = itertools.count()
+        self._prefix = 0
+        self._last_ms = 0
+        self.reseed()
+
+    def reseed(self) -> None:
+        """Draw a new per-process prefix."""
+        self._prefix = int.from_bytes(os.urandom(4), "big")
+
+    def __call__(self) -> str:
+        """Generate a new request ID.
+
+        Returns:
+            Request ID in canonical UUID text form (version 7)
+        """
+        now_ms = max(time.time_ns() // 1_000_000, self._last_ms)
+        self._last_ms = now_ms
+
+        tail = (self._prefix << _COUNTER_BITS) | (next(self._counter) & _COUNTER_MASK)
+        value = (
+            (now_ms << 80)
+            | (0x7 << 76)
+            | ((tail >> _RAND_B_BITS) << 64)
+            | (0x2 << 62)
+            | (tail & _RAND_B_MASK)
+        )
+        h = f"{value:032x}"
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+generate_request_id = RequestIdGenerator()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=generate_request_id.reseed)
+
+
+def parse_inbound_request_id(headers: Mapping[str, str]) -> Optional[str]:
+    """Extract a valid correlation ID from inbound request headers.
+
+    ``X-Request-ID`` takes precedence; otherwise the trace ID of a W3C
+    ``traceparent`` header is used.
+
+    Args:
+        headers: Inbound request headers (case-insensitive mapping)
+
+    Returns:
+        The inbound ID, or None if no valid one was supplied
+    """
+    request_id = headers.get(REQUEST_ID_HEADER)
+    if request_id and _REQUEST_ID_PATTERN.match(request_id):
+        return request_id
+
+    traceparent = headers.get(TRACEPARENT_HEADER)
+    if traceparent:
+        parsed = parse_traceparent(traceparent)
+        if parsed is not None:
+            return parsed[0]
+
+    return None
+
+
+def get_request_id() -> Optional[str]:
+    """Get the ID of the request being handled in the current context.
+
+    Returns:
+        Current request ID, or None outside of a request
+    """
+    return current_request_id.get()
@@ -0,0 +1,83 @@
+"""Pre-serialized responses for high-volume probe and poll endpoints.
+
+Health checks and version polls return the same body over and over. These
+helpers serialize it once (or once per second when it carries a timestamp)
+and hand back raw ``Response`` objects, skipping dict construction,
+``response_model`` validation and JSON encoding on every call.
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Mapping
+
+import orjson
+from fastapi import Response
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+class CoarseClock:
+    """Wall clock with one-second resolution and a cached ISO-8601 form.
+
+    The formatted timestamp is rebuilt only when the second changes, so
+    reading it costs a ``time.time()`` call and a comparison.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._second = -1
+        self._iso = ""
+
+    def iso(self) -> str:
+        """Return the current time, truncated to the second, in ISO format."""
+        second = int(self._clock())
+        if second != self._second:
+            self._iso = datetime.fromtimestamp(second, timezone.utc).isoformat()
+            self._second = second
+        return self._iso
+
+
+coarse_clock = CoarseClock()
+
+
+class StaticJSONResponse:
+    """A JSON body serialized once at construction."""
+
+    def __init__(self, content: Mapping[str, Any]) -> None:
+        self.body = orjson.dumps(content)
+
+    def response(self, status_code: int = 200) -> Response:
+        """Build a response around the cached body."""
+        return Response(self.body, status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+
+class TimestampedJSONResponse:
+    """A JSON body re-serialized at most once per coarse-clock second.
+
+    Args:
+        build: Returns the body content for a given ISO timestamp
+        clock: Coarse clock supplying the timestamps
+    """
+
+    def __init__(
+        self,
+        build: Callable[[str], Mapping[str, Any]],
+        clock: CoarseClock = coarse_clock,
+    ) -> None:
+        self._build = build
+        self._clock = clock
+        self._timestamp = ""
+        self._body = b""
+
+    @property
+    def body(self) -> bytes:
+        """Return the cached body, rebuilding it when the second changes."""
+        timestamp = self._clock.iso()
+        if timestamp != self._timestamp:
+            self._body = orjson.dumps(self._build(timestamp))
+            self._timestamp = timestamp
+        return self._body
+
+    def response(self, status_code: int = 200) -> Response:
+        """Build a response around the cached body."""
+        return Response(self.body, status_code=status_code, media_type=JSON_MEDIA_TYPE)
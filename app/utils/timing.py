@@ -0,0 +1,126 @@
+"""Per-request stage timing exposed through ``Server-Timing``."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+import orjson
+
+from app.config import settings
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+# Stage names reported in Server-Timing
+STAGE_VALIDATE = "validate"
+STAGE_UPSTREAM_QUEUE = "upstream_queue"
+STAGE_UPSTREAM_TTFB = "upstream_ttfb"
+STAGE_UPSTREAM_BODY = "upstream_body"
+
+current_timer: ContextVar[Optional["RequestTimer"]] = ContextVar(
+    "current_timer", default=None
+)
+
+
+class RequestTimer:
+    """Accumulate the time spent in each pipeline stage of a request."""
+
+    __slots__ = ("start", "stages")
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Add time to a stage.
+
+        Args:
+            stage: Stage name
+            seconds: Elapsed time in seconds
+        """
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """Time a block of code as part of a stage.
+
+        Args:
+            stage: Stage name
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.perf_counter() - self.start
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage durations in milliseconds, including the total."""
+        timings = {
+            name: round(seconds * 1000, 3) for name, seconds in self.stages.items()
+        }
+        timings["total"] = round(self.elapsed() * 1000, 3)
+        return timings
+
+    def header_value(self) -> str:
+        """Format the stage durations as a ``Server-Timing`` header value."""
+        return ", ".join(
+            f"{name};dur={duration:.3f}" for name, duration in self.as_dict().items()
+        )
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Add time to a stage of the request in the current context, if any.
+
+    Args:
+        stage: Stage name
+        seconds: Elapsed time in seconds
+    """
+    timer = current_timer.get()
+    if timer is not None:
+        timer.add(stage, seconds)
+
+
+def server_timing_trailer(timer: Optional[RequestTimer] = None) -> Dict[str, Any]:
+    """Fields to merge into the final NDJSON chunk of a streamed response.
+
+    Args:
+        timer: Timer of the request (default: the one in the current context)
+
+    Returns:
+        ``{"server_timing": {...}}`` when stream trailers are enabled and a
+        request timer is active, otherwise an empty dict
+    """
+    timer = timer or current_timer.get()
+    if timer is None or not settings.server_timing_stream_trailer:
+        return {}
+    return {"server_timing": timer.as_dict()}
+
+
+def add_stream_trailer(chunk: bytes, timer: RequestTimer) -> bytes:
+    """Merge the :func:`server_timing_trailer` into a final NDJSON chunk.
+
+    The final chunk of an Ollama stream ends with the ``"done": true``
+    line; other chunks are returned unchanged.
+
+    Args:
+        chunk: Chunk of an NDJSON response body
+        timer: Timer of the request
+
+    Returns:
+        The chunk, with the trailer fields added to a final line
+    """
+    if b'"done":true' not in chunk and b'"done": true' not in chunk:
+        return chunk
+    head, separator, last = chunk.rstrip(b"\n").rpartition(b"\n")
+    try:
+        payload = orjson.loads(last)
+    except orjson.JSONDecodeError:
+        return chunk
+    if not isinstance(payload, dict) or payload.get("done") is not True:
+        return chunk
+    payload.update(server_timing_trailer(timer))
+    return head + separator + orjson.dumps(payload) + b"\n"
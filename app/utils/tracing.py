@@ -0,0 +1,529 @@
+"""Lightweight OpenTelemetry-style tracing for the proxy pipeline.
+
+Spans are created with :meth:`Tracer.start_span` and linked through a
+context variable. Finished spans are buffered per local root span (one per
+request, even when concurrent requests continue the same inbound trace)
+until the root ends, then a head-plus-tail sampling decision is made: traces
+are kept
+if they were head-sampled, were slow, or contain an error. Kept traces are
+handed to a background thread that runs the configured exporter, so export
+never blocks the event loop.
+"""
+
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+)
+
+import orjson
+
+from app.utils.logging import get_logger
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = get_logger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+
+# Pipeline stage span names
+STAGE_REQUEST = "http.request"
+STAGE_PARSE = "proxy.parse"
+STAGE_UPSTREAM_QUEUE = "upstream.queue_wait"
+STAGE_UPSTREAM_TTFB = "upstream.ttfb"
+STAGE_RESPONSE_WRITE = "proxy.response_write"
+
+# Bound on spans buffered for a single trace awaiting the sampling decision
+MAX_SPANS_PER_TRACE = 256
+
+# Bound on local roots awaiting the sampling decision; the oldest is
+# dropped when a root is never ended (e.g. a body that was never sent)
+MAX_PENDING_TRACES = 10_000
+
+_TRACEPARENT_PATTERN = re.compile(
+    r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$"
+)
+
+
+@dataclass
+class Span:
+    """A timed operation within a trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: bool = False
+    sampled: bool = False
+    is_local_root: bool = False
+    root_id: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        """Span duration in seconds (0 while the span is open)."""
+        if self.end_ns is None:
+            return 0.0
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach an attribute to the span."""
+        self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        """Format the W3C ``traceparent`` header for this span."""
+        flags = "01" if self.sampled else "00"
+        return f"00-{self.trace_id}-{self.span_id}-{flags}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the span to a JSON-serializable dict."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def parse_traceparent(header: str) -> Optional[Tuple[str, str, bool]]:
+    """Parse a W3C ``traceparent`` header.
+
+    Args:
+        header: Header value
+
+    Returns:
+        ``(trace_id, parent_span_id, sampled)`` or None if invalid
+    """
+    match = _TRACEPARENT_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 0x01)
+
+
+class SpanExporter(Protocol):
+    """Destination for finished traces."""
+
+    def export(self, spans: List[Span]) -> None:
+        """Export a batch of finished spans."""
+
+    def shutdown(self) -> None:
+        """Release exporter resources."""
+
+
+class ConsoleSpanExporter:
+    """Write spans as JSON lines to a stream (stdout by default)."""
+
+    def __init__(self, stream: Optional[IO[str]] = None) -> None:
+        self._stream = stream
+
+    def export(self, spans: List[Span]) -> None:
+        """Write each span on its own line."""
+        stream = self._stream or sys.stdout
+        for span in spans:
+            stream.write(orjson.dumps(span.to_dict(), default=str).decode() + "\n")
+        stream.flush()
+
+    def shutdown(self) -> None:
+        """Nothing to release."""
+
+
+class FileSpanExporter:
+    """Append spans as JSON lines to a local file."""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+
+    def export(self, spans: List[Span]) -> None:
+        """Append each span on its own line."""
+        with open(self._path, "ab") as f:
+            for span in spans:
+                f.write(orjson.dumps(span.to_dict(), default=str) + b"\n")
+
+    def shutdown(self) -> None:
+        """Nothing to release."""
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Encode an attribute as an OTLP/JSON ``KeyValue``."""
+    if isinstance(value, bool):
+        encoded: Dict[str, Any] = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+class OTLPSpanExporter:
+    """Send spans to an OTLP/HTTP collector using the JSON encoding.
+
+    httpx is imported only when this exporter is created, keeping it off
+    the cold-start import path when tracing is disabled.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str,
+        timeout: float = 5.0,
+        client: Optional["httpx.Client"] = None,
+    ) -> None:
+        import httpx
+
+        self._url = endpoint.rstrip("/") + "/v1/traces"
+        self._service_name = service_name
+        self._client = client or httpx.Client(timeout=timeout)
+
+    def _encode(self, spans: List[Span]) -> Dict[str, Any]:
+        """Build the OTLP ``ExportTraceServiceRequest`` payload."""
+        otlp_spans = []
+        for span in spans:
+            otlp_span: Dict[str, Any] = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 2 if span.is_local_root else 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                "attributes": [
+                    _otlp_attribute(k, v) for k, v in span.attributes.items()
+                ],
+                "status": {"code": 2 if span.error else 1},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            _otlp_attribute("service.name", self._service_name)
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": "app"}, "spans": otlp_spans}],
+                }
+            ]
+        }
+
+    def export(self, spans: List[Span]) -> None:
+        """POST the spans to the collector."""
+        import httpx
+
+        try:
+            response = self._client.post(
+                self._url,
+                content=orjson.dumps(self._encode(spans)),
+                headers={"Content-Type": "application/json"},
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning("trace_export_failed", url=self._url, error=str(e))
+
+    def shutdown(self) -> None:
+        """Close the HTTP client."""
+        self._client.close()
+
+
+class BatchExportProcessor:
+    """Run an exporter on a background thread fed by a bounded queue."""
+
+    def __init__(self, exporter: SpanExporter, max_queue_size: int = 2048) -> None:
+        self._exporter = exporter
+        self._queue: "queue.Queue[Optional[List[Span]]]" = queue.Queue(
+            maxsize=max_queue_size
+        )
+        self.dropped = 0
+        self._thread = threading.Thread(
+            target=self._run, name="trace-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, spans: List[Span]) -> None:
+        """Queue a finished trace for export, dropping it if the queue is full."""
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                break
+            try:
+                self._exporter.export(spans)
+            except Exception:
+                # Exporter failures must not stop the export thread
+                logger.exception("trace_exporter_error")
+
+    def shutdown(self) -> None:
+        """Flush queued traces and stop the export thread."""
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._exporter.shutdown()
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Create spans and apply head and tail sampling to finished traces."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sample_ratio = 0.0
+        self.slow_threshold = 1.0
+        self._processor: Optional[BatchExportProcessor] = None
+        # Finished spans by local root span ID
+        self._pending: Dict[str, List[Span]] = {}
+
+    def configure(
+        self,
+        exporter: Optional[SpanExporter],
+        sample_ratio: float = 0.01,
+        slow_threshold: float = 1.0,
+    ) -> None:
+        """Enable tracing with the given exporter (None disables tracing).
+
+        Args:
+            exporter: Span exporter, or None to disable tracing
+            sample_ratio: Fraction of traces kept regardless of latency
+            slow_threshold: Root span duration in seconds above which a
+                trace is always kept
+        """
+        self.shutdown()
+        self.sample_ratio = sample_ratio
+        self.slow_threshold = slow_threshold
+        if exporter is not None:
+            self._processor = BatchExportProcessor(exporter)
+        self.enabled = exporter is not None
+
+    def shutdown(self) -> None:
+        """Flush pending exports and disable tracing."""
+        self.enabled = False
+        self._pending.clear()
+        if self._processor is not None:
+            self._processor.shutdown()
+            self._processor = None
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        """Get the active span in the current context."""
+        return _current_span.get()
+
+    def _new_span(
+        self, name: str, traceparent: Optional[str], attributes: Dict[str, Any]
+    ) -> Span:
+        parent = _current_span.get()
+        span_id = f"{random.getrandbits(64):016x}"
+        if parent is not None:
+            return Span(
+                name=name,
+                trace_id=parent.trace_id,
+                span_id=span_id,
+                parent_id=parent.span_id,
+                attributes=attributes,
+                sampled=parent.sampled,
+                root_id=parent.root_id,
+            )
+
+        inbound = parse_traceparent(traceparent) if traceparent else None
+        if inbound is not None:
+            trace_id, parent_id, sampled = inbound
+        else:
+            trace_id = f"{random.getrandbits(128):032x}"
+            parent_id, sampled = None, False
+        return Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=span_id,
+            parent_id=parent_id,
+            attributes=attributes,
+            sampled=sampled or random.random() < self.sample_ratio,
+            is_local_root=True,
+            root_id=span_id,
+        )
+
+    def begin_span(
+        self, name: str, traceparent: Optional[str] = None, **attributes: Any
+    ) -> Optional[Span]:
+        """Create a span as a child of the current span without activating it.
+
+        Without a current span a new local root is created, continuing the
+        inbound ``traceparent`` if one is given. The span must be finished
+        with :meth:`end_span`; use :meth:`start_span` for spans that end
+        with a block.
+
+        Args:
+            name: Span name (see the ``STAGE_*`` constants)
+            traceparent: Inbound W3C ``traceparent`` for root spans
+            **attributes: Initial span attributes
+
+        Returns:
+            The new span, or None when tracing is disabled
+        """
+        if not self.enabled:
+            return None
+        span = self._new_span(name, traceparent, attributes)
+        if span.is_local_root:
+            if len(self._pending) >= MAX_PENDING_TRACES:
+                del self._pending[next(iter(self._pending))]
+            self._pending[span.span_id] = []
+        return span
+
+    @staticmethod
+    @contextmanager
+    def use_span(span: Optional[Span]) -> Generator[Optional[Span], None, None]:
+        """Make ``span`` the current span for the block.
+
+        An exception escaping the block marks the span as failed; the span
+        is not ended.
+
+        Args:
+            span: Span to activate (None is a no-op)
+        """
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException:
+            span.error = True
+            raise
+        finally:
+            _current_span.reset(token)
+
+    def end_span(self, span: Optional[Span], end_ns: Optional[int] = None) -> None:
+        """End a span created with :meth:`begin_span`.
+
+        Ending a local root makes the sampling decision for its trace; spans
+        of the request ended after that are discarded.
+
+        Args:
+            span: Span to end (None is a no-op)
+            end_ns: End time in nanoseconds since the epoch (default now)
+        """
+        if span is not None:
+            self._finish(span, end_ns)
+
+    @contextmanager
+    def start_span(
+        self, name: str, traceparent: Optional[str] = None, **attributes: Any
+    ) -> Iterator[Optional[Span]]:
+        """Start a span as a child of the current span, ending with the block.
+
+        Yields None when tracing is disabled. See :meth:`begin_span`.
+
+        Args:
+            name: Span name (see the ``STAGE_*`` constants)
+            traceparent: Inbound W3C ``traceparent`` for root spans
+            **attributes: Initial span attributes
+        """
+        span = self.begin_span(name, traceparent, **attributes)
+        try:
+            with self.use_span(span):
+                yield span
+        finally:
+            self.end_span(span)
+
+    def record_span(
+        self, name: str, start_ns: int, end_ns: int, **attributes: Any
+    ) -> None:
+        """Record an already finished child span of the current span.
+
+        Args:
+            name: Span name
+            start_ns: Start time in nanoseconds since the epoch
+            end_ns: End time in nanoseconds since the epoch
+            **attributes: Span attributes
+        """
+        parent = _current_span.get()
+        if not self.enabled or parent is None:
+            return
+        span = self._new_span(name, None, attributes)
+        span.start_ns = start_ns
+        self._finish(span, end_ns)
+
+    def _finish(self, span: Span, end_ns: Optional[int] = None) -> None:
+        span.end_ns = end_ns if end_ns is not None else time.time_ns()
+        if not span.is_local_root:
+            # Spans outliving their root (or tracer reconfiguration) are dropped
+            pending = self._pending.get(span.root_id or "")
+            if pending is not None and len(pending) < MAX_SPANS_PER_TRACE:
+                pending.append(span)
+            return
+
+        spans = self._pending.pop(span.span_id, None)
+        if spans is None:
+            return
+        spans.append(span)
+        keep = (
+            span.sampled
+            or span.duration >= self.slow_threshold
+            or any(s.error for s in spans)
+        )
+        if keep and self._processor is not None:
+            self._processor.submit(spans)
+
+
+tracer = Tracer()
+
+
+def create_exporter(
+    kind: str, file_path: str, otlp_endpoint: str, service_name: str
+) -> Optional[SpanExporter]:
+    """Create a span exporter from configuration.
+
+    Args:
+        kind: One of ``none``, ``console``, ``file`` or ``otlp``
+        file_path: Output path for the file exporter
+        otlp_endpoint: Base URL of the OTLP/HTTP collector
+        service_name: Service name reported to the collector
+
+    Returns:
+        Exporter instance, or None when tracing is disabled
+
+    Raises:
+        ValueError: If the exporter kind is unknown
+    """
+    if kind == "none":
+        return None
+    if kind == "console":
+        return ConsoleSpanExporter()
+    if kind == "file":
+        return FileSpanExporter(file_path)
+    if kind == "otlp":
+        return OTLPSpanExporter(otlp_endpoint, service_name)
+    raise ValueError(f"Unknown tracing exporter: {kind!r}")
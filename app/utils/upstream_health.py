@@ -0,0 +1,171 @@
+"""Background upstream health probing for readiness checks."""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from app.utils.circuit_breaker import STATE_OPEN, CircuitBreaker
+from app.utils.concurrency_limit import BYPASS_LIMIT_EXTENSION
+from app.utils.logging import get_logger
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class BackendHealth:
+    """Cached result of the latest probe of one backend."""
+
+    breaker: CircuitBreaker
+    healthy: bool = False
+    latency: Optional[float] = None
+    checked_at: Optional[float] = None
+    error: Optional[str] = None
+    probes: int = 0
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        """Serialize for the readiness endpoint."""
+        return {
+            "healthy": self.healthy,
+            "latency_ms": (
+                round(self.latency * 1000, 2) if self.latency is not None else None
+            ),
+            "breaker": self.breaker.state,
+            "checked_ago_s": (
+                round(now - self.checked_at, 3) if self.checked_at is not None else None
+            ),
+            "error": self.error,
+        }
+
+
+class UpstreamProber:
+    """Probe upstream backends in the background and cache the results.
+
+    Readiness requests only read the cached results, so probe traffic to
+    the upstream is bounded by ``interval`` regardless of how often the
+    orchestrator polls. A result older than ``ttl`` counts as unhealthy,
+    which covers a stalled prober. Each backend has a circuit breaker;
+    while it is open the backend is not probed until the reset timeout.
+    """
+
+    def __init__(
+        self,
+        backends: Dict[str, "httpx.AsyncClient"],
+        interval: float = 5.0,
+        timeout: float = 2.0,
+        ttl: float = 15.0,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        path: str = "/models",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.backends = backends
+        self.interval = interval
+        self.timeout = timeout
+        self.ttl = ttl
+        self.path = path
+        self._clock = clock
+        self.health = {
+            name: BackendHealth(
+                CircuitBreaker(failure_threshold, reset_timeout, clock=clock)
+            )
+            for name in backends
+        }
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def start(self) -> None:
+        """Run a first probe round, then keep probing in the background."""
+        await self.probe_all()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop background probing."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.probe_all()
+
+    async def probe_all(self) -> None:
+        """Probe every backend concurrently."""
+        await asyncio.gather(*(self.probe(name) for name in self.backends))
+
+    async def probe(self, name: str) -> None:
+        """Probe one backend and update its cached health.
+
+        Any HTTP response below 500 counts as healthy: authentication
+        errors still prove the backend is reachable and serving.
+
+        Args:
+            name: Backend name
+        """
+        health = self.health[name]
+        if not health.breaker.allow_request():
+            return
+
+        started = self._clock()
+        try:
+            # Probes skip the adaptive limit so they report on the backend,
+            # not on our own queue
+            response = await self.backends[name].get(
+                self.path,
+                timeout=self.timeout,
+                extensions={BYPASS_LIMIT_EXTENSION: True},
+            )
+            await response.aread()
+            error = f"HTTP {response.status_code}" if response.is_server_error else None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        was_healthy = health.healthy
+        health.latency = self._clock() - started
+        health.checked_at = self._clock()
+        health.healthy = error is None
+        health.error = error
+        health.probes += 1
+        if error is None:
+            health.breaker.record_success()
+        else:
+            health.breaker.record_failure()
+        if health.healthy != was_healthy:
+            logger.info(
+                "upstream_health_changed",
+                backend=name,
+                healthy=health.healthy,
+                error=error,
+                breaker=health.breaker.state,
+            )
+
+    def is_healthy(self, name: str) -> bool:
+        """Return whether a backend's cached probe is fresh and successful."""
+        health = self.health[name]
+        return (
+            health.healthy
+            and health.checked_at is not None
+            and self._clock() - health.checked_at <= self.ttl
+            and health.breaker.state != STATE_OPEN
+        )
+
+    def any_healthy(self) -> bool:
+        """Return whether at least one backend is healthy."""
+        return any(self.is_healthy(name) for name in self.backends)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return the cached health of every backend."""
+        now = self._clock()
+        snapshot = {}
+        for name, health in self.health.items():
+            entry = health.to_dict(now)
+            entry["healthy"] = self.is_healthy(name)
+            snapshot[name] = entry
+        return snapshot
@@ -0,0 +1,207 @@
+"""Startup warm-up so the first requests after boot are not slow."""
+
+import inspect
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple, Type
+
+import orjson
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from app.utils.errors import ErrorResponse
+from app.utils.logging import get_logger
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = get_logger(__name__)
+
+
+def _app_models(package: str) -> List[Type[BaseModel]]:
+    """Return all imported pydantic models defined under ``package``."""
+    models = []
+    pending = list(BaseModel.__subclasses__())
+    while pending:
+        model = pending.pop()
+        pending.extend(model.__subclasses__())
+        if model.__module__.startswith(f"{package}."):
+            models.append(model)
+    return models
+
+
+def build_validators(package: str = "app") -> int:
+    """Build the validators and JSON schemas of all application models.
+
+    Models with unresolved forward references or deferred builds get their
+    core schema on first use; this forces it up front.
+
+    Args:
+        package: Package whose models are built
+
+    Returns:
+        Number of models built
+    """
+    models = _app_models(package)
+    for model in models:
+        if not model.__pydantic_complete__:
+            model.model_rebuild()
+        model.model_json_schema()
+    return len(models)
+
+
+def build_openapi(app: FastAPI) -> int:
+    """Generate and cache the OpenAPI document.
+
+    Args:
+        app: Application whose ``openapi()`` result is cached
+
+    Returns:
+        Number of documented paths
+    """
+    return len(app.openapi().get("paths", {}))
+
+
+def exercise_serializers() -> int:
+    """Run a synthetic serialization pass over the response paths.
+
+    Returns:
+        Number of bytes produced
+    """
+    chunk = {
+        "model": "warmup",
+        "created_at": "1970-01-01T00:00:00Z",
+        "message": {"role": "assistant", "content": ""},
+        "done": True,
+    }
+    error = ErrorResponse(
+        error="WarmupError", error_code="WARMUP", message="warm-up", request_id="-"
+    )
+    return len(orjson.dumps(chunk) + b"\n") + len(error.model_dump_json())
+
+
+def exercise_translators() -> int:
+    """Run a synthetic request through every request translator.
+
+    A small chat history, tools catalogue, schema format and options set
+    are translated and serialized, so the translators' lazily built parts
+    (schema compilation, option validators) are ready before the first
+    request. Uncached translation is used so the caches stay empty.
+
+    Returns:
+        Size of the serialized request in bytes
+    """
+    from app.translators.mappings import map_options
+    from app.translators.request import (
+        FormatTranslationCache,
+        ToolsTranslationCache,
+        dumps_with_fragments,
+        translate_format,
+        translate_messages,
+        translate_tools,
+    )
+
+    call = {"function": {"name": "warmup", "arguments": {"step": "tools"}}}
+    messages = translate_messages(
+        [
+            {"role": "system", "content": "warm-up"},
+            {"role": "user", "content": "warm-up", "images": ["iVBORw0KGgo="]},
+            {"role": "assistant", "content": "", "tool_calls": [call]},
+            {"role": "tool", "content": "ok", "tool_name": "warmup"},
+        ]
+    )
+    tools = translate_tools(
+        [
+            {
+                "type": "function",
+                "function": {
+                    "name": "warmup",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {"step": {"type": "string"}},
+                    },
+                },
+            }
+        ],
+        ToolsTranslationCache(max_entries=0),
+    )
+    compiled = translate_format(
+        {
+            "type": "object",
+            "properties": {"answer": {"type": "string"}, "score": {"type": "number"}},
+            "required": ["answer"],
+        },
+        FormatTranslationCache(max_entries=0),
+    )
+    assert compiled is not None
+    validator = compiled.validator()
+    validator.feed('{"answer": "ok", "score": null}')
+    validator.close()
+    compiled.restore({"answer": "ok", "score": None})
+    params = map_options({"temperature": "0.5", "num_predict": "8", "stop": ["\n"]})
+    body = dumps_with_fragments(
+        {
+            "model": "warmup",
+            "messages": messages,
+            "response_format": compiled.response_format,
+            **params,
+        },
+        {"tools": tools},
+    )
+    return len(body)
+
+
+async def run_warmup(
+    app: FastAPI,
+    upstream_client: "httpx.AsyncClient | None" = None,
+    connections: int = 0,
+    timeout: float = 5.0,
+) -> Dict[str, Any]:
+    """Run every warm-up step, logging and tolerating failures.
+
+    Args:
+        app: Application being started
+        upstream_client: Shared upstream client to pre-connect
+        connections: Number of upstream connections to open
+        timeout: Timeout for each upstream connection in seconds
+
+    Returns:
+        Result and duration in milliseconds of each step
+    """
+
+    async def _connect() -> int:
+        from app.clients.upstream import warm_connections
+
+        if upstream_client is None or connections <= 0:
+            return 0
+        return await warm_connections(upstream_client, connections, timeout)
+
+    steps: List[Tuple[str, Callable[[], Any]]] = [
+        ("validators", build_validators),
+        ("openapi", lambda: build_openapi(app)),
+        ("serializers", exercise_serializers),
+        ("translators", exercise_translators),
+        ("upstream_connections", _connect),
+    ]
+
+    results: Dict[str, Any] = {}
+    started = time.perf_counter()
+    for name, step in steps:
+        step_started = time.perf_counter()
+        try:
+            result = step()
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            logger.warning("warmup_step_failed", step=name, error=str(e))
+            result = None
+        results[name] = {
+            "result": result,
+            "duration_ms": round((time.perf_counter() - step_started) * 1000, 2),
+        }
+
+    logger.info(
+        "warmup_complete",
+        duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        steps=results,
+    )
+    return results
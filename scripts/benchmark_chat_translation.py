@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Benchmark the translation of chat histories.
+
+Times translating a chat history of text messages, and one with images,
+against merely computing a content key for every message (a canonical
+JSON dump plus a digest), which is the least a cross-request memo of
+translated messages would have to do per turn. The translation itself
+must stay cheaper than that key for direct translation to be the right
+choice.
+"""
+
+import argparse
+import hashlib
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple
+
+import orjson
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.translators.request import translate_messages  # noqa: E402
+
+DEFAULT_MESSAGES = 100
+DEFAULT_IMAGES = 3
+DEFAULT_IMAGE_KB = 200
+DEFAULT_NUMBER = 500
+
+
+class Result(NamedTuple):
+    """Per-history timing of one strategy, in microseconds."""
+
+    history: str
+    strategy: str
+    per_history_us: float
+
+
+def build_text_history(messages: int = DEFAULT_MESSAGES) -> List[Dict[str, Any]]:
+    """Build a chat history of alternating user and assistant turns."""
+    history: List[Dict[str, Any]] = [
+        {"role": "system", "content": "You are a helpful assistant. " * 20}
+    ]
+    for i in range(messages - 1):
+        role = "user" if i % 2 == 0 else "assistant"
+        history.append({"role": role, "content": f"Message {i}: " + "lorem " * 60})
+    return history
+
+
+def build_image_history(
+    images: int = DEFAULT_IMAGES, image_kb: int = DEFAULT_IMAGE_KB
+) -> List[Dict[str, Any]]:
+    """Build a short chat history whose user turns carry base64 images."""
+    image = "iVBORw0KGgo" + "A" * (image_kb * 1024)
+    history: List[Dict[str, Any]] = []
+    for i in range(images):
+        history.append({"role": "user", "content": f"Image {i}?", "images": [image]})
+        history.append({"role": "assistant", "content": "A picture."})
+    return history
+
+
+def content_keys(history: List[Dict[str, Any]]) -> List[bytes]:
+    """Compute a content digest per message, as a memo lookup would."""
+    return [
+        hashlib.blake2b(
+            orjson.dumps(message, option=orjson.OPT_SORT_KEYS), digest_size=16
+        ).digest()
+        for message in history
+    ]
+
+
+def run(messages: int, images: int, image_kb: int, number: int) -> List[Result]:
+    """Time translation and content keying of both histories.
+
+    Args:
+        messages: Messages in the text history
+        images: Images in the image history
+        image_kb: Size of each image in KiB of base64
+        number: Repetitions per measurement
+
+    Returns:
+        One result per history and strategy
+    """
+
+    def per_history_us(work: Callable[[], Any]) -> float:
+        return timeit.timeit(work, number=number) * 1e6 / number
+
+    histories = {
+        "text": build_text_history(messages),
+        "images": build_image_history(images, image_kb),
+    }
+    results = []
+    for name, history in histories.items():
+        results.append(
+            Result(
+                name, "translate", per_history_us(lambda: translate_messages(history))
+            )
+        )
+        results.append(
+            Result(name, "content key", per_history_us(lambda: content_keys(history)))
+        )
+    return results
+
+
+def main() -> None:
+    """Run the benchmark and print the per-history cost."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark chat history translation against content keying"
+    )
+    parser.add_argument(
+        "--messages",
+        type=int,
+        default=DEFAULT_MESSAGES,
+        help="Messages in the text history",
+    )
+    parser.add_argument(
+        "--images", type=int, default=DEFAULT_IMAGES, help="Images in the image history"
+    )
+    parser.add_argument(
+        "--image-kb",
+        type=int,
+        default=DEFAULT_IMAGE_KB,
+        help="Size of each image in KiB of base64",
+    )
+    parser.add_argument(
+        "--number",
+        type=int,
+        default=DEFAULT_NUMBER,
+        help="Repetitions per measurement",
+    )
+    args = parser.parse_args()
+
+    for result in run(args.messages, args.images, args.image_kb, args.number):
+        print(
+            f"{result.history:>6} history, {result.strategy:>11}: "
+            f"{result.per_history_us:8.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Benchmark the cold-start import time of the application.
+
+Runs ``python -X importtime -c "import app.main"`` in fresh interpreters,
+reports the median total import time and the slowest modules, and exits
+non-zero when the total exceeds the budget or when a module that must stay
+off the startup path (such as httpx or the openai SDK) gets imported.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Sequence
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_TARGET = "app.main"
+DEFAULT_BUDGET_MS = 500.0
+DEFAULT_RUNS = 5
+# Heavy modules that must only be imported lazily
+DEFAULT_FORBIDDEN = ("httpx", "openai", "ollama")
+
+
+class ImportTiming(NamedTuple):
+    """One ``-X importtime`` line, in microseconds."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """Parse ``-X importtime`` output.
+
+    Args:
+        output: stderr of an interpreter run with ``-X importtime``
+
+    Returns:
+        One timing per imported module, in import order
+    """
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        timings.append(
+            ImportTiming(
+                module=fields[2].strip(),
+                self_us=int(fields[0]),
+                cumulative_us=int(fields[1]),
+            )
+        )
+    return timings
+
+
+def measure(target: str) -> List[ImportTiming]:
+    """Import ``target`` in a fresh interpreter and collect its timings.
+
+    Args:
+        target: Module to import
+
+    Returns:
+        Parsed import timings
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def total_ms(timings: Sequence[ImportTiming], target: str) -> float:
+    """Return the cumulative import time of ``target`` in milliseconds."""
+    for timing in timings:
+        if timing.module == target:
+            return timing.cumulative_us / 1000
+    raise ValueError(f"{target} not found in import timings")
+
+
+def forbidden_imports(
+    timings: Sequence[ImportTiming], forbidden: Sequence[str]
+) -> List[str]:
+    """Return the forbidden top-level packages that were imported."""
+    imported = {timing.module.split(".")[0] for timing in timings}
+    return sorted(set(forbidden) & imported)
+
+
+def main() -> None:
+    """Run the benchmark and enforce the budget."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark application import time against a budget"
+    )
+    parser.add_argument("--target", default=DEFAULT_TARGET, help="Module to import")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help="Maximum median import time in milliseconds",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=DEFAULT_RUNS, help="Number of cold imports"
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="Number of slowest modules to show"
+    )
+    parser.add_argument(
+        "--forbid",
+        nargs="*",
+        default=list(DEFAULT_FORBIDDEN),
+        help="Packages that must not be imported at startup",
+    )
+    args = parser.parse_args()
+
+    runs = [measure(args.target) for _ in range(args.runs)]
+    totals = [total_ms(timings, args.target) for timings in runs]
+    median = statistics.median(totals)
+
+    # Report self time per module from the median run
+    median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    slowest: Dict[str, int] = {t.module: t.self_us for t in median_run}
+    print(f"import {args.target}: median {median:.1f} ms over {args.runs} runs")
+    print(f"budget: {args.budget_ms:.1f} ms")
+    print("slowest modules (self time):")
+    for module, self_us in sorted(slowest.items(), key=lambda x: -x[1])[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {module}")
+
+    failed = False
+    leaked = forbidden_imports(median_run, args.forbid)
+    if leaked:
+        print(f"FAIL: imported at startup: {', '.join(leaked)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: import time {median:.1f} ms exceeds {args.budget_ms:.1f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
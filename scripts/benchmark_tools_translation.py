@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Benchmark the translation of a ``tools`` catalogue into a request body.
+
+Builds a realistic agent tool catalogue (50 functions by default, with
+nested object, array and enum parameters) and times building the upstream
+request body per request, once translating and serializing the tools from
+scratch and once with the serialized catalogue taken from the cache and
+spliced into the body.
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple
+
+import orjson
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.translators.request import (  # noqa: E402
+    ToolsTranslationCache,
+    dumps_with_fragments,
+    translate_tool,
+)
+
+DEFAULT_FUNCTIONS = 50
+DEFAULT_NUMBER = 2000
+
+
+class Result(NamedTuple):
+    """Per-request timing of one strategy, in microseconds."""
+
+    name: str
+    per_request_us: float
+
+
+def build_catalogue(functions: int = DEFAULT_FUNCTIONS) -> List[Dict[str, Any]]:
+    """Build a tool catalogue as agents send it in Ollama format.
+
+    Args:
+        functions: Number of functions in the catalogue
+
+    Returns:
+        Ollama ``tools`` list
+    """
+    tools = []
+    for i in range(functions):
+        tools.append(
+            {
+                "type": "function",
+                "function": {
+                    "name": f"tool_{i}_action",
+                    "description": (
+                        f"Perform action {i} against the workspace. Use it when "
+                        "the user asks for it explicitly and report the result."
+                    ),
+                    "parameters": {
+                        "type": "object",
+                        "required": ["target", "mode"],
+                        "properties": {
+                            "target": {
+                                "type": "string",
+                                "description": "Path or identifier to act on",
+                            },
+                            "mode": {
+                                "type": "string",
+                                "enum": ["read", "write", "append", "delete"],
+                                "description": "How to act on the target",
+                            },
+                            "limit": {
+                                "type": "integer",
+                                "description": "Maximum number of items",
+                            },
+                            "tags": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Labels to attach",
+                            },
+                            "options": {
+                                "type": "object",
+                                "description": "Extra settings",
+                                "properties": {
+                                    "recursive": {"type": "boolean"},
+                                    "timeout": {"type": "number"},
+                                },
+                            },
+                        },
+                    },
+                },
+            }
+        )
+    return tools
+
+
+def _request() -> Dict[str, Any]:
+    return {
+        "model": "llama3.1",
+        "messages": [{"role": "user", "content": "Tidy up the workspace"}],
+        "stream": True,
+    }
+
+
+def uncached_body(tools: List[Dict[str, Any]]) -> bytes:
+    """Build the body translating and serializing the tools every time."""
+    payload = _request()
+    payload["tools"] = [translate_tool(tool, i) for i, tool in enumerate(tools)]
+    return orjson.dumps(payload)
+
+
+def cached_body(
+    tools: List[Dict[str, Any]], cache: ToolsTranslationCache
+) -> Callable[[], bytes]:
+    """Return a body builder that splices the cached serialized tools."""
+
+    def build() -> bytes:
+        return dumps_with_fragments(_request(), {"tools": cache.translate(tools)})
+
+    return build
+
+
+def run(functions: int, number: int) -> List[Result]:
+    """Time both strategies.
+
+    Args:
+        functions: Number of functions in the catalogue
+        number: Request bodies built per strategy
+
+    Returns:
+        One result per strategy
+    """
+
+    def per_request_us(build: Callable[[], bytes]) -> float:
+        return timeit.timeit(build, number=number) * 1e6 / number
+
+    tools = build_catalogue(functions)
+    cached = cached_body(tools, ToolsTranslationCache())
+    if orjson.loads(cached()) != orjson.loads(uncached_body(tools)):
+        raise AssertionError("cached and uncached bodies differ")
+
+    return [
+        Result("uncached", per_request_us(lambda: uncached_body(tools))),
+        Result("cached", per_request_us(cached)),
+    ]
+
+
+def main() -> None:
+    """Run the benchmark and print the per-request cost."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark cached translation of tool catalogues"
+    )
+    parser.add_argument(
+        "--functions",
+        type=int,
+        default=DEFAULT_FUNCTIONS,
+        help="Number of functions in the catalogue",
+    )
+    parser.add_argument(
+        "--number",
+        type=int,
+        default=DEFAULT_NUMBER,
+        help="Request bodies built per strategy",
+    )
+    args = parser.parse_args()
+
+    results = run(args.functions, args.number)
+    size = len(orjson.dumps(build_catalogue(args.functions)))
+    print(f"tools catalogue: {args.functions} functions, {size / 1024:.1f} KiB")
+    for result in results:
+        print(f"  {result.name:>8}: {result.per_request_us:8.1f} us per request")
+    print(f"speedup: {results[0].per_request_us / results[1].per_request_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -287,6 +287,37 @@ def override_settings(monkeypatch):
     return _override
 
 
+class FakeClock:
+    """Manually advanced clock; set or advance ``now``."""
+
+    def __init__(self, now: float = 100.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_clock() -> FakeClock:
+    """A clock that only moves when the test advances it."""
+    return FakeClock()
+
+
+@pytest.fixture
+def configure_settings(monkeypatch):
+    """Swap in a settings snapshot with some fields changed.
+
+    The previous snapshot is restored after the test.
+    """
+    from app.config import config_store
+
+    def _configure(**changes):
+        snapshot = config_store.current.model_copy(update=changes)
+        monkeypatch.setattr(config_store, "_current", snapshot)
+
+    return _configure
+
+
 @pytest.fixture
 def temp_test_data(tmp_path: Path) -> Dict[str, Path]:
     """Create temporary test data files."""
@@ -7,6 +7,9 @@ from httpx import ASGITransport
 
 from app.main import app
 from app.config import settings
+from app.utils.lifecycle import lifecycle
+from app.utils.concurrency_limit import AIMDLimiter
+from app.utils.upstream_health import UpstreamProber
 
 
 @pytest.mark.integration
@@ -74,3 +77,87 @@ class TestHealthEndpoint:
                 assert response.status_code == 200
                 data = response.json()
                 assert data["status"] == "healthy"
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+class TestProbeEndpoints:
+    """Integration tests for the liveness and readiness endpoints."""
+
+    @pytest.fixture(autouse=True)
+    def ready_state(self, monkeypatch):
+        """Start from a ready process with a healthy upstream prober."""
+        monkeypatch.setattr(lifecycle, "ready", True)
+        monkeypatch.setattr(lifecycle, "draining", False)
+        client = httpx.AsyncClient(
+            base_url="http://upstream/v1",
+            transport=httpx.MockTransport(lambda r: httpx.Response(200)),
+        )
+        prober = UpstreamProber({"upstream": client})
+        monkeypatch.setattr(app.state, "upstream_prober", prober, raising=False)
+        yield prober
+
+    async def _get(self, path: str) -> httpx.Response:
+        transport = ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.get(path)
+
+    async def test_liveness(self) -> None:
+        """Test liveness is a constant 200."""
+        response = await self._get("/health/live")
+        assert response.status_code == 200
+        assert response.json() == {"status": "alive"}
+
+    async def test_ready_with_healthy_upstream(self, ready_state) -> None:
+        """Test readiness reports per-backend health from the cache."""
+        await ready_state.probe_all()
+        response = await self._get("/health/ready")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert data["backends"]["upstream"]["healthy"] is True
+        assert data["backends"]["upstream"]["breaker"] == "closed"
+        assert data["backends"]["upstream"]["latency_ms"] is not None
+
+    async def test_ready_reports_concurrency_limit(
+        self, ready_state, monkeypatch
+    ) -> None:
+        """Test readiness includes each backend's adaptive concurrency limit."""
+        limiter = AIMDLimiter("upstream", initial_limit=8)
+        monkeypatch.setattr(
+            app.state, "upstream_limiters", {"upstream": limiter}, raising=False
+        )
+        await ready_state.probe_all()
+        response = await self._get("/health/ready")
+
+        concurrency = response.json()["backends"]["upstream"]["concurrency"]
+        assert concurrency == {"limit": 8, "in_flight": 0, "waiting": 0}
+
+    async def test_ready_reports_load(self, ready_state) -> None:
+        """Test readiness reports load pressure and shed priority classes."""
+        await ready_state.probe_all()
+        response = await self._get("/health/ready")
+
+        load = response.json()["load"]
+        assert set(load) == {"pressure", "p99_latency_s", "queued", "shedding"}
+        assert load["shedding"] == []
+
+    async def test_ready_does_not_probe_upstream(self, ready_state) -> None:
+        """Test readiness requests never call the upstream themselves."""
+        for _ in range(3):
+            response = await self._get("/health/ready")
+            assert response.status_code == 503
+        assert ready_state.health["upstream"].probes == 0
+
+    async def test_not_ready_but_live_while_draining(self, ready_state) -> None:
+        """Test draining fails readiness while liveness keeps passing."""
+        await ready_state.probe_all()
+        lifecycle.draining = True
+
+        assert (await self._get("/health/live")).status_code == 200
+        response = await self._get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["draining"] is True
@@ -0,0 +1,305 @@
+"""Unit tests for admission control."""
+
+import asyncio
+import time
+from typing import List
+
+import httpx
+import pytest
+from fastapi import Request
+from httpx import ASGITransport
+
+from app.main import app
+from app.utils.admission import AdmissionController
+from app.utils.errors import DeadlineExceededException, OverloadedException
+from app.utils.metrics import ADMISSION_QUEUE_TIME
+
+
+async def _hold(
+    controller: AdmissionController,
+    tenant: str,
+    model: str,
+    release: asyncio.Event,
+    order: List[str],
+) -> None:
+    async with controller.slot(tenant, model):
+        order.append(tenant)
+        await release.wait()
+
+
+@pytest.mark.unit
+class TestAdmissionController:
+    """Test concurrency caps and fair queueing."""
+
+    async def test_global_cap_queues_excess_requests(self):
+        """Requests beyond the global cap wait for a slot."""
+        controller = AdmissionController(max_concurrency=2)
+        release = asyncio.Event()
+        order: List[str] = []
+        tasks = [
+            asyncio.create_task(_hold(controller, "t", "m", release, order))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+
+        assert controller.active == 2
+        assert controller.queued == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert controller.active == 0
+        assert controller.queued == 0
+        assert len(order) == 3
+
+    async def test_per_model_cap(self):
+        """A model at its cap does not block requests for other models."""
+        controller = AdmissionController(max_concurrency=10, model_limits={"big": 1})
+        release = asyncio.Event()
+        order: List[str] = []
+        tasks = [
+            asyncio.create_task(_hold(controller, "a", "big", release, order)),
+            asyncio.create_task(_hold(controller, "b", "big", release, order)),
+            asyncio.create_task(_hold(controller, "c", "small", release, order)),
+        ]
+        await asyncio.sleep(0)
+
+        assert order == ["a", "c"]
+        assert controller.queued == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == ["a", "c", "b"]
+
+    async def test_batch_tenant_does_not_starve_interactive(self):
+        """Tenant queues are served round-robin, not in arrival order."""
+        controller = AdmissionController(max_concurrency=1)
+        blocker = asyncio.Event()
+        order: List[str] = []
+        first = asyncio.create_task(_hold(controller, "batch", "m", blocker, order))
+        await asyncio.sleep(0)
+
+        done = asyncio.Event()
+        done.set()
+        tasks = [
+            asyncio.create_task(_hold(controller, "batch", "m", done, order))
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(_hold(controller, "chat", "m", done, order)))
+        await asyncio.sleep(0)
+
+        blocker.set()
+        await asyncio.gather(first, *tasks)
+        # The interactive request is admitted right after one batch request
+        assert order[:3] == ["batch", "batch", "chat"]
+
+    async def test_tenant_weights(self):
+        """A tenant with weight 2 is admitted twice per round."""
+        controller = AdmissionController(max_concurrency=1, tenant_weights={"heavy": 2})
+        blocker = asyncio.Event()
+        order: List[str] = []
+        first = asyncio.create_task(_hold(controller, "x", "m", blocker, order))
+        await asyncio.sleep(0)
+        order.clear()
+
+        done = asyncio.Event()
+        done.set()
+        tasks = []
+        for tenant in ["heavy"] * 4 + ["light"] * 2:
+            tasks.append(
+                asyncio.create_task(_hold(controller, tenant, "m", done, order))
+            )
+        await asyncio.sleep(0)
+
+        blocker.set()
+        await asyncio.gather(first, *tasks)
+        assert order == ["heavy", "heavy", "light", "heavy", "heavy", "light"]
+
+    async def test_queue_full_rejects(self):
+        """A request is rejected when the queue is at its limit."""
+        controller = AdmissionController(max_concurrency=1, max_queue_size=1)
+        release = asyncio.Event()
+        order: List[str] = []
+        tasks = [
+            asyncio.create_task(_hold(controller, "t", "m", release, order))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+
+        with pytest.raises(OverloadedException):
+            async with controller.slot("t", "m"):
+                pass
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_rejects_when_expected_wait_exceeds_deadline(self):
+        """A request that would wait past its deadline is rejected up front."""
+        controller = AdmissionController(max_concurrency=1)
+        controller.avg_service_time = 10.0
+        release = asyncio.Event()
+        task = asyncio.create_task(_hold(controller, "t", "m", release, []))
+        await asyncio.sleep(0)
+
+        with pytest.raises(DeadlineExceededException):
+            async with controller.slot("t", "m", deadline=time.monotonic() + 1.0):
+                pass
+        assert controller.queued == 0
+
+        release.set()
+        await task
+
+    async def test_deadline_timeout_removes_waiter(self):
+        """A queued request that is not admitted in time gives up its place."""
+        controller = AdmissionController(max_concurrency=1)
+        release = asyncio.Event()
+        task = asyncio.create_task(_hold(controller, "t", "m", release, []))
+        await asyncio.sleep(0)
+
+        with pytest.raises(DeadlineExceededException):
+            async with controller.slot("t", "m", deadline=time.monotonic() + 0.01):
+                pass
+        assert controller.queued == 0
+
+        release.set()
+        await task
+        assert controller.active == 0
+
+    async def test_cancelled_waiter_is_removed(self):
+        """Cancelling a queued request frees its queue position."""
+        controller = AdmissionController(max_concurrency=1)
+        release = asyncio.Event()
+        order: List[str] = []
+        holder = asyncio.create_task(_hold(controller, "a", "m", release, order))
+        waiter = asyncio.create_task(_hold(controller, "b", "m", release, order))
+        await asyncio.sleep(0)
+        assert controller.queued == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller.queued == 0
+
+        release.set()
+        await holder
+        assert controller.active == 0
+        assert order == ["a"]
+
+    async def test_configure_raising_limit_admits_waiters(self):
+        """Raising the cap at runtime admits queued requests immediately."""
+        controller = AdmissionController(max_concurrency=1)
+        release = asyncio.Event()
+        order: List[str] = []
+        tasks = [
+            asyncio.create_task(_hold(controller, "t", "m", release, order))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        assert controller.active == 1
+
+        controller.configure(max_concurrency=3)
+        await asyncio.sleep(0)
+        assert controller.active == 3
+        assert controller.queued == 0
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_queue_time_labels_bounded(self, configure_settings):
+        """Queue times of unconfigured models share the "other" label."""
+        configure_settings(admission_model_limits={"known": 4})
+        controller = AdmissionController()
+        other = ADMISSION_QUEUE_TIME.labels("other")
+        before = sum(other.counts)
+        for i in range(5):
+            async with controller.slot("t", f"model-{i}"):
+                pass
+        async with controller.slot("t", "known"):
+            pass
+
+        assert sum(other.counts) == before + 5
+        assert sum(ADMISSION_QUEUE_TIME.labels("known").counts) >= 1
+        assert not any(
+            values[0].startswith("model-") for values in ADMISSION_QUEUE_TIME._children
+        )
+
+
+@pytest.fixture
+def admission_route():
+    """Add an upstream-style route released by an event."""
+    release = asyncio.Event()
+
+    @app.post("/api/test-admission")
+    async def admitted(request: Request) -> dict:
+        body = await request.json()
+        await release.wait()
+        return {"model": body.get("model")}
+
+    yield release
+    app.router.routes = [
+        r
+        for r in app.router.routes
+        if getattr(r, "path", None) != "/api/test-admission"
+    ]
+
+
+@pytest.mark.unit
+class TestAdmissionMiddleware:
+    """Test admission control on upstream-bound requests."""
+
+    async def test_request_passes_through_with_body(self, admission_route, monkeypatch):
+        """An admitted request reaches the handler with its body intact."""
+        monkeypatch.setattr("app.utils.middleware.admission", AdmissionController())
+        admission_route.set()
+        transport = ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            response = await client.post(
+                "/api/test-admission", json={"model": "llama3"}
+            )
+
+        assert response.status_code == 200
+        assert response.json() == {"model": "llama3"}
+
+    async def test_queue_full_returns_429(self, admission_route, monkeypatch):
+        """A request that cannot be queued gets an OVERLOADED error."""
+        controller = AdmissionController(max_concurrency=1, max_queue_size=0)
+        monkeypatch.setattr("app.utils.middleware.admission", controller)
+        transport = ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            first = asyncio.create_task(
+                client.post("/api/test-admission", json={"model": "llama3"})
+            )
+            while controller.active == 0:
+                await asyncio.sleep(0.001)
+            rejected = await client.post(
+                "/api/test-admission", json={"model": "llama3"}
+            )
+            admission_route.set()
+            accepted = await first
+
+        assert rejected.status_code == 429
+        assert rejected.json()["error_code"] == "OVERLOADED"
+        assert accepted.status_code == 200
+
+    async def test_tenant_from_header(self, configure_settings):
+        """The configured tenant header identifies the tenant."""
+        from app.utils.middleware import AdmissionMiddleware
+
+        configure_settings(admission_tenant_header="X-Team")
+        scope = {"headers": [(b"x-team", b"search")], "client": ("10.0.0.1", 1)}
+        assert AdmissionMiddleware._tenant(scope) == "search"
+        assert AdmissionMiddleware._tenant({"headers": []}) == "anonymous"
+        assert AdmissionMiddleware._tenant({"client": ("10.0.0.1", 1)}) == ("10.0.0.1")
+
+    def test_parse_model(self):
+        """The model is read from parsed JSON bodies and defaults to empty."""
+        from app.utils.middleware import _parse_model
+
+        assert _parse_model({"model": "llama3"}) == "llama3"
+        assert _parse_model(None) == ""
+        assert _parse_model([1, 2]) == ""
+        assert _parse_model({"model": 3}) == ""
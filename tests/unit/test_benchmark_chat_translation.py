@@ -0,0 +1,33 @@
+"""Unit tests for the chat translation benchmark script."""
+
+import pytest
+
+from scripts.benchmark_chat_translation import (
+    build_image_history,
+    build_text_history,
+    content_keys,
+    run,
+)
+
+
+@pytest.mark.unit
+class TestChatTranslationBenchmark:
+    """Tests for the benchmark histories and runner."""
+
+    def test_histories(self) -> None:
+        """Test the histories have the requested shape."""
+        assert len(build_text_history(10)) == 10
+        history = build_image_history(images=2, image_kb=1)
+        assert sum(len(m.get("images", ())) for m in history) == 2
+        assert len(content_keys(history)) == len(history)
+
+    def test_run(self) -> None:
+        """Test both strategies are timed for both histories."""
+        results = run(messages=4, images=1, image_kb=1, number=3)
+        assert [(r.history, r.strategy) for r in results] == [
+            ("text", "translate"),
+            ("text", "content key"),
+            ("images", "translate"),
+            ("images", "content key"),
+        ]
+        assert all(r.per_history_us > 0 for r in results)
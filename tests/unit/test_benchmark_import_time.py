@@ -0,0 +1,54 @@
+"""Unit tests for the import-time benchmark script."""
+
+import pytest
+
+from scripts.benchmark_import_time import (
+    DEFAULT_FORBIDDEN,
+    DEFAULT_TARGET,
+    forbidden_imports,
+    measure,
+    parse_importtime,
+    total_ms,
+)
+
+SAMPLE_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      2500 |       2500 |     httpx._client
+import time:       300 |       2800 |   httpx
+import time:      1000 |       3920 | app.main
+"""
+
+
+@pytest.mark.unit
+class TestImportTimeBenchmark:
+    """Tests for parsing and checking import timings."""
+
+    def test_parse_importtime(self) -> None:
+        """Test header lines are skipped and fields are parsed."""
+        timings = parse_importtime(SAMPLE_OUTPUT)
+
+        assert [t.module for t in timings] == [
+            "_io",
+            "httpx._client",
+            "httpx",
+            "app.main",
+        ]
+        assert timings[-1].self_us == 1000
+        assert total_ms(timings, "app.main") == pytest.approx(3.92)
+
+    def test_total_ms_missing_target(self) -> None:
+        """Test a target that was never imported is reported."""
+        with pytest.raises(ValueError):
+            total_ms(parse_importtime(SAMPLE_OUTPUT), "app.other")
+
+    def test_forbidden_imports(self) -> None:
+        """Test forbidden packages are matched by top-level name."""
+        timings = parse_importtime(SAMPLE_OUTPUT)
+        assert forbidden_imports(timings, ["httpx", "openai"]) == ["httpx"]
+
+    def test_app_import_keeps_heavy_modules_lazy(self) -> None:
+        """Test importing the app does not pull in lazily loaded packages."""
+        timings = measure(DEFAULT_TARGET)
+
+        assert forbidden_imports(timings, DEFAULT_FORBIDDEN) == []
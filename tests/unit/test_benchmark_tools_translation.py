@@ -0,0 +1,26 @@
+"""Unit tests for the tools translation benchmark script."""
+
+import pytest
+
+from scripts.benchmark_tools_translation import (
+    DEFAULT_FUNCTIONS,
+    build_catalogue,
+    run,
+)
+
+
+@pytest.mark.unit
+class TestToolsTranslationBenchmark:
+    """Tests for the benchmark catalogue and runner."""
+
+    def test_catalogue(self) -> None:
+        """Test the default catalogue has distinct named functions."""
+        tools = build_catalogue()
+        names = {tool["function"]["name"] for tool in tools}
+        assert len(names) == DEFAULT_FUNCTIONS
+
+    def test_run(self) -> None:
+        """Test both strategies are timed and produce the same body."""
+        results = run(functions=3, number=5)
+        assert [r.name for r in results] == ["uncached", "cached"]
+        assert all(r.per_request_us > 0 for r in results)
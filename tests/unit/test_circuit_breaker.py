@@ -0,0 +1,49 @@
+"""Unit tests for the circuit breaker."""
+
+import pytest
+
+from app.utils.circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+)
+
+
+@pytest.mark.unit
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker state transitions."""
+
+    def test_opens_after_consecutive_failures(self, fake_clock) -> None:
+        """Test the breaker opens only once the threshold is reached."""
+        breaker = CircuitBreaker(failure_threshold=2, clock=fake_clock)
+        breaker.record_failure()
+        assert breaker.state == STATE_CLOSED
+        breaker.record_failure()
+        assert breaker.state == STATE_OPEN
+        assert not breaker.allow_request()
+
+    def test_success_resets_failure_count(self, fake_clock) -> None:
+        """Test failures must be consecutive."""
+        breaker = CircuitBreaker(failure_threshold=2, clock=fake_clock)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == STATE_CLOSED
+
+    def test_half_open_after_reset_timeout(self, fake_clock) -> None:
+        """Test a trial is allowed after the timeout and decides the state."""
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=fake_clock
+        )
+        breaker.record_failure()
+
+        fake_clock.now += 10
+        assert breaker.state == STATE_HALF_OPEN
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == STATE_OPEN
+
+        fake_clock.now += 10
+        breaker.record_success()
+        assert breaker.state == STATE_CLOSED
@@ -0,0 +1,263 @@
+"""Unit tests for the adaptive upstream concurrency limit."""
+
+import asyncio
+import random
+
+import httpx
+import pytest
+
+from app.clients.upstream import create_upstream_client
+from app.utils.concurrency_limit import (
+    BYPASS_LIMIT_EXTENSION,
+    LATENCY_WINDOW,
+    RECENT_LATENCY_WINDOW,
+    AIMDLimiter,
+    is_drop,
+)
+from app.utils.metrics import REGISTRY
+
+
+@pytest.mark.unit
+class TestAIMDLimiter:
+    """Test limit adjustments."""
+
+    def test_is_drop(self):
+        """429 and 5xx responses signal overload."""
+        assert is_drop(429)
+        assert is_drop(503)
+        assert not is_drop(200)
+        assert not is_drop(404)
+
+    async def test_grows_additively_while_saturated(self):
+        """Each window of successful requests raises the limit by about one."""
+        limiter = AIMDLimiter("grow", initial_limit=4, latency_tolerance=0)
+        started = [await limiter.acquire() for _ in range(4)]
+        # Steady load: every finished request is replaced by a new one
+        for _ in range(20):
+            limiter.release(started.pop(0), 0.1, dropped=False)
+            started.append(await limiter.acquire())
+
+        assert 7 <= limiter.limit <= 8
+
+    async def test_does_not_grow_when_underused(self):
+        """Successes far below the limit do not raise it."""
+        limiter = AIMDLimiter("idle", initial_limit=10, latency_tolerance=0)
+        for _ in range(20):
+            limiter.release(await limiter.acquire(), 0.1, dropped=False)
+
+        assert limiter.limit == 10
+
+    async def test_backs_off_once_per_window(self, fake_clock):
+        """A burst of drops from one window decreases the limit once."""
+        limiter = AIMDLimiter("backoff", initial_limit=20, clock=fake_clock)
+        started = [await limiter.acquire() for _ in range(10)]
+        fake_clock.now += 1
+        for value in started:
+            limiter.release(value, None, dropped=True)
+
+        assert limiter.limit == 18
+
+        fake_clock.now += 1
+        limiter.release(await limiter.acquire(), None, dropped=True)
+        assert limiter.limit == 16
+
+    async def test_respects_bounds(self, fake_clock):
+        """The limit stays between its minimum and maximum."""
+        limiter = AIMDLimiter(
+            "bounds", initial_limit=2, min_limit=2, max_limit=3, clock=fake_clock
+        )
+        for _ in range(5):
+            fake_clock.now += 1
+            limiter.release(await limiter.acquire(), None, dropped=True)
+        assert limiter.limit == 2
+
+        for _ in range(50):
+            started = [await limiter.acquire() for _ in range(limiter.limit)]
+            for value in started:
+                limiter.release(value, 0.1, dropped=False)
+        assert limiter.limit == 3
+
+    async def test_sustained_slowdown_counts_as_drop(self, fake_clock):
+        """Time to first byte staying far above the baseline backs off."""
+        limiter = AIMDLimiter(
+            "slow", initial_limit=10, latency_tolerance=2.0, clock=fake_clock
+        )
+        for _ in range(RECENT_LATENCY_WINDOW):
+            limiter.release(await limiter.acquire(), 0.1, dropped=False)
+        assert limiter.baseline == 0.1
+
+        # A few slow responses are not a signal on their own
+        for _ in range(3):
+            fake_clock.now += 1
+            limiter.release(await limiter.acquire(), 0.5, dropped=False)
+        assert limiter.limit == 10
+
+        for _ in range(RECENT_LATENCY_WINDOW):
+            fake_clock.now += 1
+            limiter.release(await limiter.acquire(), 0.5, dropped=False)
+        assert limiter.limit < 10
+
+    async def test_mixed_prompt_lengths_do_not_collapse(self, fake_clock):
+        """Short and long requests interleaved keep the limit growing."""
+        limiter = AIMDLimiter(
+            "mixed", initial_limit=8, latency_tolerance=2.0, clock=fake_clock
+        )
+        rng = random.Random(7)
+        started = [await limiter.acquire() for _ in range(8)]
+        for _ in range(1000):
+            fake_clock.now += 0.01
+            # Long prompts take up to thirty times longer to first byte
+            latency = rng.choice([0.1, 0.1, 0.5, 3.0])
+            limiter.release(started.pop(0), latency, dropped=False)
+            while limiter.in_flight < limiter.limit:
+                started.append(await limiter.acquire())
+
+        assert limiter.limit > 8
+        assert limiter.baseline == 0.1
+
+    async def test_baseline_follows_backend(self):
+        """The baseline rises and falls with the backend's latency."""
+        limiter = AIMDLimiter("follow", latency_tolerance=0)
+        for _ in range(LATENCY_WINDOW):
+            limiter.release(await limiter.acquire(), 1.0, dropped=False)
+        assert limiter.baseline == 1.0
+        for _ in range(LATENCY_WINDOW):
+            limiter.release(await limiter.acquire(), 0.2, dropped=False)
+        assert limiter.baseline == 0.2
+
+    async def test_waits_at_limit(self):
+        """Requests beyond the limit wait for a release."""
+        limiter = AIMDLimiter("wait", initial_limit=1, latency_tolerance=0)
+        started = await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert limiter.to_dict() == {"limit": 1, "in_flight": 1, "waiting": 1}
+
+        limiter.release(started, 0.1, dropped=False)
+        limiter.release(await waiter, 0.1, dropped=False)
+        assert limiter.in_flight == 0
+
+    async def test_cancelled_waiter_is_removed(self):
+        """Cancelling a waiting request does not leak a slot."""
+        limiter = AIMDLimiter("cancel", initial_limit=1, latency_tolerance=0)
+        started = await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release(started, 0.1, dropped=False)
+
+        assert limiter.in_flight == 0
+        assert limiter.to_dict()["waiting"] == 0
+
+    async def test_limit_exported_as_metric(self):
+        """The current limit is exposed per backend."""
+        AIMDLimiter("metric-backend", initial_limit=12)
+
+        assert (
+            'ollama_proxy_upstream_concurrency_limit{backend="metric-backend"} 12'
+            in REGISTRY.render()
+        )
+
+
+@pytest.mark.unit
+class TestLimitedTransport:
+    """Test the limiter wired into the upstream client."""
+
+    async def test_slot_held_until_body_closed(self):
+        """A streamed response keeps its slot until the body is closed."""
+        limiter = AIMDLimiter("stream", initial_limit=4)
+
+        def streamed(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, stream=httpx.ByteStream(b"ok"))
+
+        client = create_upstream_client(
+            "http://upstream/v1",
+            limiter=limiter,
+            transport=httpx.MockTransport(streamed),
+        )
+        async with client:
+            async with client.stream("POST", "/chat/completions") as response:
+                assert limiter.in_flight == 1
+                await response.aread()
+            assert limiter.in_flight == 0
+
+    async def test_rate_limited_response_backs_off(self):
+        """A 429 from the upstream lowers the limit."""
+        limiter = AIMDLimiter("ratelimited", initial_limit=10)
+        client = create_upstream_client(
+            "http://upstream/v1",
+            limiter=limiter,
+            transport=httpx.MockTransport(lambda r: httpx.Response(429)),
+        )
+        async with client:
+            response = await client.post("/chat/completions")
+
+        assert response.status_code == 429
+        assert limiter.limit == 9
+        assert limiter.in_flight == 0
+
+    async def test_transport_error_backs_off(self):
+        """A failed request releases its slot and lowers the limit."""
+
+        def fail(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused", request=request)
+
+        limiter = AIMDLimiter("failing", initial_limit=10)
+        client = create_upstream_client(
+            "http://upstream/v1", limiter=limiter, transport=httpx.MockTransport(fail)
+        )
+        async with client:
+            with pytest.raises(httpx.ConnectError):
+                await client.post("/chat/completions")
+
+        assert limiter.limit == 9
+        assert limiter.in_flight == 0
+
+    async def test_cancelled_request_keeps_limit(self):
+        """Cancelling a request frees its slot without backing off."""
+        sent = asyncio.Event()
+
+        class HangingTransport(httpx.AsyncBaseTransport):
+            async def handle_async_request(
+                self, request: httpx.Request
+            ) -> httpx.Response:
+                sent.set()
+                await asyncio.Event().wait()
+                raise AssertionError("unreachable")
+
+        limiter = AIMDLimiter("cancelled", initial_limit=10)
+        client = create_upstream_client(
+            "http://upstream/v1", limiter=limiter, transport=HangingTransport()
+        )
+        async with client:
+            request = asyncio.create_task(client.post("/chat/completions"))
+            await sent.wait()
+            assert limiter.in_flight == 1
+            request.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await request
+
+        assert limiter.limit == 10
+        assert limiter.in_flight == 0
+
+    async def test_bypass_extension_skips_limit(self):
+        """Probe requests neither wait for nor feed the limiter."""
+        limiter = AIMDLimiter("bypass", initial_limit=1)
+        client = create_upstream_client(
+            "http://upstream/v1",
+            limiter=limiter,
+            transport=httpx.MockTransport(lambda r: httpx.Response(503)),
+        )
+        started = await limiter.acquire()
+        async with client:
+            response = await client.get(
+                "/models", extensions={BYPASS_LIMIT_EXTENSION: True}
+            )
+
+        assert response.status_code == 503
+        assert limiter.limit == 1
+        limiter.release(started, 0.1, dropped=False)
@@ -0,0 +1,241 @@
+"""Unit tests for hot-reloadable configuration."""
+
+import asyncio
+import json
+import os
+import signal
+from pathlib import Path
+
+import httpx
+import pytest
+from httpx import ASGITransport
+from pydantic import ValidationError
+
+from app.config import (
+    ConfigStore,
+    Settings,
+    config_store,
+    current_settings,
+    settings,
+)
+from app.main import app
+from app.utils import config_reload
+from app.utils.config_reload import ConfigWatcher, changed_fields
+from app.utils.metrics import CONFIG_RELOADS
+
+
+@pytest.fixture
+def config_file(tmp_path: Path, monkeypatch) -> Path:
+    """Point APP_CONFIG_FILE at a JSON file in a temporary directory."""
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"admin_token": "first"}))
+    monkeypatch.setenv("APP_CONFIG_FILE", str(path))
+    monkeypatch.delenv("APP_ADMIN_TOKEN", raising=False)
+    return path
+
+
+@pytest.fixture
+def restore_settings(monkeypatch):
+    """Restore the global settings snapshot after the test."""
+    monkeypatch.setattr(config_store, "_current", config_store.current)
+
+
+@pytest.mark.unit
+class TestConfigStore:
+    """Tests for settings snapshots and the config file source."""
+
+    def test_config_file_source(self, config_file: Path) -> None:
+        """Test settings are read from the JSON config file."""
+        assert Settings().admin_token == "first"
+
+    def test_environment_overrides_config_file(self, config_file, monkeypatch) -> None:
+        """Test environment variables take priority over the file."""
+        monkeypatch.setenv("APP_ADMIN_TOKEN", "from-env")
+        assert Settings().admin_token == "from-env"
+
+    def test_toml_config_file(self, tmp_path: Path, monkeypatch) -> None:
+        """Test TOML config files are supported."""
+        path = tmp_path / "config.toml"
+        path.write_text("port = 12345\n")
+        monkeypatch.setenv("APP_CONFIG_FILE", str(path))
+        monkeypatch.delenv("APP_PORT", raising=False)
+        assert Settings().port == 12345
+
+    def test_reload_swaps_snapshot_and_notifies(self, config_file: Path) -> None:
+        """Test a reload replaces the snapshot and calls listeners."""
+        store = ConfigStore(Settings())
+        old = store.current
+        calls = []
+        store.subscribe(lambda o, n: calls.append((o, n)))
+
+        config_file.write_text(json.dumps({"admin_token": "second"}))
+        new = store.reload()
+
+        assert store.current is new
+        assert old.admin_token == "first"
+        assert new.admin_token == "second"
+        assert calls == [(old, new)]
+
+    def test_failing_listener_isolated(self, config_file: Path) -> None:
+        """Test a failing listener neither undoes the swap nor stops others."""
+        store = ConfigStore(Settings())
+        calls = []
+
+        def broken(old: Settings, new: Settings) -> None:
+            raise RuntimeError("boom")
+
+        store.subscribe(broken)
+        store.subscribe(lambda o, n: calls.append(n))
+
+        config_file.write_text(json.dumps({"admin_token": "second"}))
+        new = store.reload()
+
+        assert store.current is new
+        assert calls == [new]
+
+    def test_invalid_reload_keeps_snapshot(self, config_file: Path) -> None:
+        """Test invalid settings are rejected and the old snapshot kept."""
+        store = ConfigStore(Settings())
+        old = store.current
+
+        config_file.write_text(json.dumps({"log_sample_ratios": "event=2"}))
+        with pytest.raises(ValidationError):
+            store.reload()
+        assert store.current is old
+
+    def test_pinned_snapshot_survives_reload(self, config_file, restore_settings):
+        """Test a pinned snapshot is used until it is released."""
+        config_store.reload()
+        token = config_store.pin()
+        try:
+            config_file.write_text(json.dumps({"admin_token": "second"}))
+            config_store.reload()
+            assert settings.admin_token == "first"
+        finally:
+            current_settings.reset(token)
+        assert settings.admin_token == "second"
+
+    def test_changed_fields_masks_secrets(self) -> None:
+        """Test changed secrets are reported without their value."""
+        old = Settings(admin_token="a", port=1)
+        new = Settings(admin_token="b", port=2)
+        assert changed_fields(old, new) == {"admin_token": "***", "port": 2}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestConfigWatcher:
+    """Tests for reload triggers."""
+
+    async def test_file_change_triggers_reload(
+        self, config_file: Path, restore_settings
+    ) -> None:
+        """Test editing the config file reloads the settings."""
+        config_store.reload()
+        watcher = ConfigWatcher(config_file=str(config_file), interval=0.01)
+        watcher.start()
+        try:
+            config_file.write_text(json.dumps({"admin_token": "edited!"}))
+            os.utime(config_file, ns=(1, 1))
+            for _ in range(200):
+                if settings.admin_token == "edited!":
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await watcher.stop()
+        assert settings.admin_token == "edited!"
+
+    async def test_sighup_triggers_reload(
+        self, config_file: Path, restore_settings
+    ) -> None:
+        """Test SIGHUP reloads the settings."""
+        watcher = ConfigWatcher()
+        watcher.start()
+        try:
+            config_file.write_text(json.dumps({"admin_token": "hup"}))
+            os.kill(os.getpid(), signal.SIGHUP)
+            for _ in range(200):
+                if settings.admin_token == "hup":
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await watcher.stop()
+        assert settings.admin_token == "hup"
+
+    async def test_failed_reload_counted(self, config_file, restore_settings) -> None:
+        """Test failed reloads are logged, counted and harmless."""
+        before = CONFIG_RELOADS.labels("failure").value
+        current = config_store.current
+        config_file.write_text("{not json")
+
+        assert ConfigWatcher().reload("test") is False
+        assert CONFIG_RELOADS.labels("failure").value == before + 1
+        assert config_store.current is current
+
+    async def test_reload_updates_log_sampling(
+        self, config_file, restore_settings, monkeypatch
+    ) -> None:
+        """Test new log sampling ratios are applied on reload."""
+        applied = []
+        monkeypatch.setattr(config_reload, "set_log_sample_ratios", applied.append)
+        watcher = ConfigWatcher()
+        watcher.start()
+        try:
+            config_file.write_text(json.dumps({"log_sample_ratios": "a=0.5"}))
+            assert watcher.reload("test") is True
+        finally:
+            await watcher.stop()
+        # Startup applies the environment defaults
+        assert applied == [{}, {"a": 0.5}]
+
+    async def test_unset_log_sampling_restores_environment_ratios(
+        self, config_file, restore_settings, monkeypatch
+    ) -> None:
+        """Test removing the ratios from the config reverts to LOG_SAMPLE_RATIOS."""
+        applied = []
+        monkeypatch.setattr(config_reload, "set_log_sample_ratios", applied.append)
+        monkeypatch.setenv("LOG_SAMPLE_RATIOS", "b=0.25")
+        config_file.write_text(json.dumps({"log_sample_ratios": "a=0.5"}))
+        config_store.reload()
+        watcher = ConfigWatcher()
+        watcher.start()
+        try:
+            config_file.write_text(json.dumps({}))
+            assert watcher.reload("test") is True
+        finally:
+            await watcher.stop()
+        assert applied == [{"a": 0.5}, {"b": 0.25}]
+
+    async def test_request_keeps_settings_snapshot(
+        self, config_file, restore_settings
+    ) -> None:
+        """Test an in-flight request does not see a concurrent reload."""
+        config_store.reload()
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        @app.get("/test-settings-snapshot")
+        async def read_settings() -> dict:
+            started.set()
+            await release.wait()
+            return {"admin_token": settings.admin_token}
+
+        try:
+            async with httpx.AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                request = asyncio.create_task(client.get("/test-settings-snapshot"))
+                await started.wait()
+                config_file.write_text(json.dumps({"admin_token": "second"}))
+                config_store.reload()
+                release.set()
+                response = await request
+        finally:
+            app.router.routes = [
+                r
+                for r in app.router.routes
+                if getattr(r, "path", None) != "/test-settings-snapshot"
+            ]
+
+        assert response.json() == {"admin_token": "first"}
+        assert settings.admin_token == "second"
@@ -0,0 +1,215 @@
+"""Unit tests for the conversation context store."""
+
+import orjson
+import pytest
+
+from app.utils.context_store import (
+    CONTEXT_TOKEN_MARKER,
+    ConversationStore,
+    decode_context_token,
+    encode_context_token,
+    parse_keep_alive,
+)
+
+
+def _turn(prompt: str, reply: str) -> list:
+    return [
+        {"role": "user", "content": prompt},
+        {"role": "assistant", "content": reply},
+    ]
+
+
+@pytest.mark.unit
+class TestContextToken:
+    """Test context token encoding."""
+
+    def test_round_trip(self):
+        """A key survives encoding as an integer array."""
+        key = bytes(range(16))
+        token = encode_context_token(key)
+
+        assert token[0] == CONTEXT_TOKEN_MARKER
+        assert len(token) == 5
+        assert all(0 <= word < 2**32 for word in token)
+        assert decode_context_token(token) == key
+
+    @pytest.mark.parametrize(
+        "context",
+        [None, [], [1, 2, 3], [CONTEXT_TOKEN_MARKER, 1, 2, 3], [0, 1, 2, 3, 4]],
+    )
+    def test_foreign_contexts_ignored(self, context):
+        """Arrays that are not proxy tokens decode to None."""
+        assert decode_context_token(context) is None
+
+    def test_out_of_range_word(self):
+        """A token with an out-of-range word is rejected."""
+        assert decode_context_token([CONTEXT_TOKEN_MARKER, -1, 0, 0, 0]) is None
+
+
+@pytest.mark.unit
+class TestParseKeepAlive:
+    """Test Ollama keep_alive parsing."""
+
+    @pytest.mark.parametrize(
+        "value,expected",
+        [
+            (None, None),
+            (30, 30.0),
+            (0, 0.0),
+            ("45", 45.0),
+            ("10s", 10.0),
+            ("5m", 300.0),
+            ("1h30m", 5400.0),
+            ("500ms", 0.5),
+            (-1, float("inf")),
+            ("-1m", float("inf")),
+            ("soon", None),
+            ("5x", None),
+            (True, None),
+        ],
+    )
+    def test_parse(self, value, expected):
+        """Numbers are seconds and strings are Go durations."""
+        assert parse_keep_alive(value) == expected
+
+
+@pytest.mark.unit
+class TestConversationStore:
+    """Test storing and resuming conversations."""
+
+    def test_resume_conversation(self):
+        """Each turn's token resumes the full history."""
+        store = ConversationStore()
+        first = store.save("llama3", _turn("hi", "hello"))
+        second = store.save("llama3", _turn("how are you?", "fine"), parent=first)
+
+        assert store.get(first, "llama3") == _turn("hi", "hello")
+        assert store.get(second, "llama3") == _turn("hi", "hello") + _turn(
+            "how are you?", "fine"
+        )
+
+    def test_branches_share_prefix(self):
+        """Continuing an older token branches the conversation."""
+        store = ConversationStore()
+        root = store.save("m", _turn("a", "b"))
+        left = store.save("m", _turn("c", "d"), parent=root)
+        right = store.save("m", _turn("e", "f"), parent=root)
+
+        assert store.get(left, "m")[-1]["content"] == "d"
+        assert store.get(right, "m")[-1]["content"] == "f"
+        assert len(store.get(right, "m")) == 4
+
+    def test_unknown_or_foreign_context(self):
+        """Unknown tokens and genuine Ollama contexts miss."""
+        store = ConversationStore()
+        assert store.get(None, "m") is None
+        assert store.get([1, 2, 3], "m") is None
+        assert store.get(encode_context_token(bytes(16)), "m") is None
+
+    def test_model_mismatch(self):
+        """A context does not carry over to another model."""
+        store = ConversationStore()
+        token = store.save("llama3", _turn("hi", "hello"))
+
+        assert store.get(token, "mistral") is None
+        assert store.get(token, "llama3") is not None
+
+    def test_ttl_expiry_and_refresh(self, fake_clock):
+        """Entries expire after their TTL unless used."""
+        store = ConversationStore(ttl=10.0, clock=fake_clock)
+        token = store.save("m", _turn("a", "b"))
+
+        fake_clock.now += 8
+        assert store.get(token, "m") is not None
+        fake_clock.now += 8
+        assert store.get(token, "m") is not None
+        fake_clock.now += 11
+        assert store.get(token, "m") is None
+        assert len(store) == 0
+
+    def test_keep_alive_sets_ttl(self, fake_clock):
+        """keep_alive is a TTL hint bounded by the maximum TTL."""
+        store = ConversationStore(ttl=10.0, max_ttl=100.0, clock=fake_clock)
+        short = store.save("m", _turn("a", "b"), keep_alive="2s")
+        forever = store.save("m", _turn("c", "d"), keep_alive=-1)
+
+        fake_clock.now += 5
+        assert store.get(short, "m") is None
+        fake_clock.now += 90
+        assert store.get(forever, "m") is not None
+        fake_clock.now += 101
+        assert store.get(forever, "m") is None
+
+    def test_keep_alive_zero_stores_nothing(self):
+        """keep_alive 0 returns no token."""
+        store = ConversationStore()
+        assert store.save("m", _turn("a", "b"), keep_alive=0) is None
+        assert len(store) == 0
+
+    def test_lru_eviction(self):
+        """The least recently used context is evicted at capacity."""
+        store = ConversationStore(max_entries=2)
+        first = store.save("m", _turn("1", "1"))
+        second = store.save("m", _turn("2", "2"))
+        store.get(first, "m")
+        third = store.save("m", _turn("3", "3"))
+
+        assert len(store) == 2
+        assert store.get(second, "m") is None
+        assert store.get(first, "m") is not None
+        assert store.get(third, "m") is not None
+
+    def test_evicted_parent_history_kept_by_child(self):
+        """A child token still resolves its history after its parent is evicted."""
+        store = ConversationStore(max_entries=1)
+        parent = store.save("m", _turn("a", "b"))
+        child = store.save("m", _turn("c", "d"), parent=parent)
+
+        assert store.get(parent, "m") is None
+        assert store.get(child, "m") == _turn("a", "b") + _turn("c", "d")
+
+    def test_configure_shrinks(self):
+        """Lowering the capacity evicts immediately."""
+        store = ConversationStore()
+        for i in range(5):
+            store.save("m", _turn(str(i), str(i)))
+        store.configure(max_entries=2, ttl=300.0, max_ttl=3600.0)
+
+        assert len(store) == 2
+
+    def test_byte_budget_evicts_lru(self):
+        """Histories beyond the byte budget are evicted oldest first."""
+        turn_size = len(orjson.dumps(_turn("1", "1")))
+        store = ConversationStore(max_bytes=2 * turn_size)
+        first = store.save("m", _turn("1", "1"))
+        second = store.save("m", _turn("2", "2"))
+        assert store.size == 2 * turn_size
+
+        third = store.save("m", _turn("3", "3"))
+        assert store.get(first, "m") is None
+        assert store.get(second, "m") is not None
+        assert store.get(third, "m") is not None
+        assert store.size == 2 * turn_size
+
+    def test_shared_prefix_counted_once(self):
+        """A turn kept alive by its children is counted until all are gone."""
+        turn_size = len(orjson.dumps(_turn("a", "b")))
+        store = ConversationStore(max_entries=2)
+        parent = store.save("m", _turn("a", "b"))
+        store.save("m", _turn("c", "d"), parent=parent)
+        store.save("m", _turn("e", "f"), parent=parent)
+
+        # The parent's entry is evicted but both children still use its turn
+        assert store.get(parent, "m") is None
+        assert store.size == 3 * turn_size
+
+        store.configure(max_entries=0, ttl=300.0, max_ttl=3600.0)
+        assert len(store) == 0
+        assert store.size == 0
+
+    def test_oversized_turn_not_stored(self):
+        """A turn larger than the whole budget gets no token."""
+        store = ConversationStore(max_bytes=10)
+        assert store.save("m", _turn("long prompt", "long reply")) is None
+        assert len(store) == 0
+        assert store.size == 0
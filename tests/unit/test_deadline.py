@@ -0,0 +1,233 @@
+"""Unit tests for request deadlines and timeout budgets."""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport
+
+from app.clients.upstream import apply_deadline
+from app.main import app
+from app.utils.admission import AdmissionController
+from app.utils.deadline import (
+    Deadline,
+    current_deadline,
+    get_deadline,
+    parse_timeout,
+    remaining_budget,
+    route_budget,
+)
+from app.utils.errors import DeadlineExceededException, ValidationException
+
+
+@pytest.mark.unit
+class TestDeadline:
+    """Test deadline bookkeeping and parsing."""
+
+    def test_remaining_and_expiry(self, fake_clock):
+        """The deadline counts down from its budget."""
+        deadline = Deadline(5.0, clock=fake_clock)
+        assert deadline.remaining() == 5.0
+        deadline.check()
+
+        fake_clock.now += 6
+        assert deadline.expired
+        with pytest.raises(DeadlineExceededException):
+            deadline.check()
+
+    def test_remaining_budget(self, fake_clock):
+        """The remaining budget caps a default timeout."""
+        assert remaining_budget() is None
+        assert remaining_budget(10.0) == 10.0
+        token = current_deadline.set(Deadline(3.0, clock=fake_clock))
+        try:
+            assert remaining_budget(10.0) == 3.0
+            assert remaining_budget(1.0) == 1.0
+            fake_clock.now += 5
+            assert remaining_budget() == 0.0
+        finally:
+            current_deadline.reset(token)
+
+    @pytest.mark.parametrize(
+        "value,expected", [(None, None), ("2.5", 2.5), (30, 30.0), ("10", 10.0)]
+    )
+    def test_parse_timeout(self, value, expected):
+        """Valid timeouts parse to seconds."""
+        assert parse_timeout(value, "timeout") == expected
+
+    @pytest.mark.parametrize("value", ["abc", "0", "-1", "inf", "nan", True, [1]])
+    def test_parse_timeout_rejects_invalid(self, value):
+        """Invalid timeouts are validation errors."""
+        with pytest.raises(ValidationException):
+            parse_timeout(value, "timeout")
+
+    def test_route_budget_longest_prefix(self):
+        """The longest matching prefix sets the budget."""
+        budgets = {"/api/": 120.0, "/api/embed": 10.0}
+        assert route_budget("/api/embed", budgets, 600.0) == 10.0
+        assert route_budget("/api/chat", budgets, 600.0) == 120.0
+        assert route_budget("/v1/models", budgets, 600.0) == 600.0
+
+
+@pytest.mark.unit
+class TestApplyDeadline:
+    """Test propagation of the remaining budget into upstream timeouts."""
+
+    async def test_caps_timeouts(self, fake_clock):
+        """Upstream timeouts never exceed the remaining budget."""
+        request = httpx.Request("POST", "http://upstream/v1/chat/completions")
+        request.extensions["timeout"] = httpx.Timeout(60.0, connect=1.0).as_dict()
+        token = current_deadline.set(Deadline(5.0, clock=fake_clock))
+        try:
+            await apply_deadline(request)
+        finally:
+            current_deadline.reset(token)
+
+        assert request.extensions["timeout"] == {
+            "connect": 1.0,
+            "read": 5.0,
+            "write": 5.0,
+            "pool": 5.0,
+        }
+
+    async def test_no_deadline_leaves_timeouts(self):
+        """Requests outside a deadline keep their timeouts."""
+        request = httpx.Request("GET", "http://upstream/v1/models")
+        request.extensions["timeout"] = httpx.Timeout(60.0).as_dict()
+        await apply_deadline(request)
+
+        assert request.extensions["timeout"]["read"] == 60.0
+
+    async def test_exhausted_budget_raises(self, fake_clock):
+        """No upstream call is made once the budget is spent."""
+        deadline = Deadline(1.0, clock=fake_clock)
+        fake_clock.now += 2
+        token = current_deadline.set(deadline)
+        try:
+            with pytest.raises(DeadlineExceededException):
+                await apply_deadline(httpx.Request("GET", "http://upstream/v1"))
+        finally:
+            current_deadline.reset(token)
+
+
+@pytest.fixture
+def slow_routes():
+    """Add routes that run until released; removed after the test."""
+    release = asyncio.Event()
+    seen = {}
+
+    @app.get("/test-deadline-slow")
+    async def slow() -> dict:
+        deadline = get_deadline()
+        seen["budget"] = deadline.budget if deadline else None
+        await release.wait()
+        return {"done": True}
+
+    async def body():
+        yield b'{"response":"Hel","done":false}\n'
+        await release.wait()
+        yield b'{"response":"lo","done":true}\n'
+
+    @app.get("/test-deadline-stream")
+    async def stream() -> StreamingResponse:
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    @app.post("/api/test-deadline")
+    async def upstream(request: Request) -> dict:
+        deadline = get_deadline()
+        return {"budget": deadline.budget if deadline else None}
+
+    yield seen
+    release.set()
+    paths = {"/test-deadline-slow", "/test-deadline-stream", "/api/test-deadline"}
+    app.router.routes = [
+        r for r in app.router.routes if getattr(r, "path", None) not in paths
+    ]
+
+
+async def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.unit
+class TestDeadlineMiddleware:
+    """Test deadline assignment and enforcement."""
+
+    async def test_route_budget_applies(self, slow_routes, configure_settings):
+        """Requests get the budget of their route by default."""
+        configure_settings(route_timeouts={"/test-deadline": 0.05})
+        async with await _client() as client:
+            response = await client.get("/test-deadline-slow")
+
+        assert response.status_code == 504
+        assert response.json()["error_code"] == "DEADLINE_EXCEEDED"
+        assert slow_routes["budget"] == 0.05
+
+    async def test_header_shortens_budget(self, slow_routes):
+        """The client's timeout header shortens the route budget."""
+        async with await _client() as client:
+            response = await client.get(
+                "/test-deadline-slow", headers={"X-Request-Timeout": "0.05"}
+            )
+
+        assert response.status_code == 504
+        assert slow_routes["budget"] == 0.05
+
+    async def test_header_cannot_extend_budget(self, slow_routes, configure_settings):
+        """A client timeout longer than the route budget is capped."""
+        configure_settings(request_timeout=0.05)
+        async with await _client() as client:
+            response = await client.get(
+                "/test-deadline-slow", headers={"X-Request-Timeout": "60"}
+            )
+
+        assert response.status_code == 504
+        assert slow_routes["budget"] == 0.05
+
+    async def test_invalid_header_rejected(self, slow_routes):
+        """A malformed timeout header is a validation error."""
+        async with await _client() as client:
+            response = await client.get(
+                "/test-deadline-slow", headers={"X-Request-Timeout": "soon"}
+            )
+
+        assert response.status_code == 400
+        assert response.json()["error_code"] == "VALIDATION_ERROR"
+
+    async def test_body_option(self, slow_routes):
+        """Upstream-bound requests may set the timeout in the body."""
+        async with await _client() as client:
+            response = await client.post(
+                "/api/test-deadline", json={"model": "m", "request_timeout": 7}
+            )
+
+        assert response.status_code == 200
+        assert response.json() == {"budget": 7.0}
+
+    async def test_stream_ends_with_error_chunk(self, slow_routes):
+        """A stream that outlives its deadline ends with an error chunk."""
+        async with await _client() as client:
+            response = await client.get(
+                "/test-deadline-stream", headers={"X-Request-Timeout": "0.05"}
+            )
+
+        lines = response.text.strip().split("\n")
+        assert lines[0] == '{"response":"Hel","done":false}'
+        assert lines[-1] == '{"error":"Request deadline exceeded"}'
+
+    async def test_deadline_bounds_admission_wait(self, slow_routes, monkeypatch):
+        """A request whose deadline passes while queued is rejected."""
+        controller = AdmissionController(max_concurrency=0)
+        monkeypatch.setattr("app.utils.middleware.admission", controller)
+        async with await _client() as client:
+            response = await client.post(
+                "/api/test-deadline",
+                json={"model": "m"},
+                headers={"X-Request-Timeout": "0.05"},
+            )
+
+        assert response.status_code == 504
+        assert response.json()["error_code"] == "DEADLINE_EXCEEDED"
+        assert controller.queued == 0
@@ -13,6 +13,15 @@ from app.utils.errors import (
     UpstreamException,
     ConfigurationException,
     NotImplementedException,
+    ForbiddenException,
+    ConflictException,
+    NotFoundException,
+    RequestCancelledException,
+    ServiceUnavailableException,
+    OverloadedException,
+    DeadlineExceededException,
+    LoadShedException,
+    StructuredOutputException,
     proxy_exception_handler,
     validation_error_handler,
     generic_exception_handler,
@@ -101,6 +110,70 @@ class TestExceptionClasses:
         assert exc.status_code == 501
         assert exc.error_code == "NOT_IMPLEMENTED"
 
+    def test_forbidden_exception(self):
+        """Test ForbiddenException attributes."""
+        exc = ForbiddenException("Invalid admin token")
+
+        assert exc.status_code == 403
+        assert exc.error_code == "FORBIDDEN"
+
+    def test_conflict_exception(self):
+        """Test ConflictException attributes."""
+        exc = ConflictException("Already running")
+
+        assert exc.status_code == 409
+        assert exc.error_code == "CONFLICT"
+
+    def test_not_found_exception(self):
+        """Test NotFoundException attributes."""
+        exc = NotFoundException("Request not found")
+
+        assert exc.status_code == 404
+        assert exc.error_code == "NOT_FOUND"
+
+    def test_request_cancelled_exception(self):
+        """Test RequestCancelledException attributes."""
+        exc = RequestCancelledException("Request cancelled")
+
+        assert exc.status_code == 503
+        assert exc.error_code == "REQUEST_CANCELLED"
+
+    def test_service_unavailable_exception(self):
+        """Test ServiceUnavailableException attributes."""
+        exc = ServiceUnavailableException("Server is shutting down")
+
+        assert exc.status_code == 503
+        assert exc.error_code == "SERVICE_UNAVAILABLE"
+
+    def test_overloaded_exception(self):
+        """Test OverloadedException attributes."""
+        exc = OverloadedException("Too many queued requests")
+
+        assert exc.status_code == 429
+        assert exc.error_code == "OVERLOADED"
+
+    def test_deadline_exceeded_exception(self):
+        """Test DeadlineExceededException attributes."""
+        exc = DeadlineExceededException("Deadline exceeded")
+
+        assert exc.status_code == 504
+        assert exc.error_code == "DEADLINE_EXCEEDED"
+
+    def test_load_shed_exception(self):
+        """Test LoadShedException attributes and Retry-After header."""
+        exc = LoadShedException("Server is overloaded", retry_after=7)
+
+        assert exc.status_code == 503
+        assert exc.error_code == "LOAD_SHED"
+        assert exc.headers == {"Retry-After": "7"}
+
+    def test_structured_output_exception(self):
+        """Test StructuredOutputException attributes."""
+        exc = StructuredOutputException("Output does not match the schema")
+
+        assert exc.status_code == 502
+        assert exc.error_code == "STRUCTURED_OUTPUT_MISMATCH"
+
     def test_to_error_response(self):
         """Test converting exception to error response."""
         exc = ValidationException("Invalid input", details={"field": "missing"})
@@ -146,6 +219,16 @@ class TestExceptionHandlers:
         assert content["details"] == {"field": "value"}
         assert content["request_id"] == "test-request-id"
 
+    @pytest.mark.asyncio
+    async def test_proxy_exception_handler_headers(self, mock_request):
+        """Test proxy exception handler passes exception headers through."""
+        exc = LoadShedException("Server is overloaded", retry_after=3)
+
+        response = await proxy_exception_handler(mock_request, exc)
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "3"
+
     @pytest.mark.asyncio
     async def test_proxy_exception_handler_no_request_id(self, mock_request):
         """Test proxy exception handler without request ID."""
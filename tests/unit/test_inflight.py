@@ -0,0 +1,292 @@
+"""Unit tests for in-flight request tracking and cancellation."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport
+
+from app.clients.upstream import create_http_client
+from app.main import app
+from app.utils.inflight import (
+    STAGE_STREAMING,
+    STAGE_UPSTREAM,
+    InflightRegistry,
+    InflightRequest,
+    current_inflight,
+    get_current_inflight,
+    registry,
+)
+
+
+@pytest.fixture
+def client_factory():
+    """Create ASGI test clients."""
+
+    def _make() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        )
+
+    return _make
+
+
+@pytest.fixture
+def temporary_routes():
+    """Remove test routes added to the app after the test."""
+    paths = []
+    yield paths
+    app.router.routes = [
+        route
+        for route in app.router.routes
+        if getattr(route, "path", None) not in paths
+    ]
+
+
+async def _wait_for(predicate, timeout: float = 2.0) -> None:
+    """Poll until the predicate is true."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met"
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.unit
+class TestInflightRegistry:
+    """Tests for InflightRegistry."""
+
+    def test_add_get_remove(self) -> None:
+        """Test entries are stored by request ID and removed by identity."""
+        reg = InflightRegistry()
+        entry = InflightRequest(request_id="a", method="GET", path="/x")
+        reg.add(entry)
+        assert reg.get("a") is entry
+        assert len(reg) == 1
+        reg.remove(entry)
+        reg.remove(entry)
+        assert len(reg) == 0
+        assert reg.get("a") is None
+
+    def test_duplicate_request_ids(self) -> None:
+        """Test requests sharing an inbound ID are tracked separately."""
+        reg = InflightRegistry()
+        first = InflightRequest(request_id="dup", method="GET", path="/", started=1)
+        second = InflightRequest(request_id="dup", method="GET", path="/", started=2)
+        reg.add(first)
+        reg.add(second)
+        assert len(reg) == 2
+        assert reg.snapshot() == [first, second]
+
+        reg.remove(first)
+        assert len(reg) == 1
+        assert reg.get("dup") is second
+
+    def test_cancel_all_with_id(self) -> None:
+        """Test cancelling an ID cancels every request carrying it."""
+        loop = asyncio.new_event_loop()
+        try:
+            reg = InflightRegistry()
+            entries = [
+                InflightRequest(
+                    request_id="dup",
+                    method="GET",
+                    path="/",
+                    task=loop.create_task(asyncio.sleep(1)),
+                )
+                for _ in range(2)
+            ]
+            for entry in entries:
+                reg.add(entry)
+            assert reg.cancel("dup", "stopped") is True
+            assert all(entry.task.cancelling() for entry in entries)
+            assert reg.cancel_all("stopped") == 2
+        finally:
+            for entry in entries:
+                entry.task.cancel()
+            loop.run_until_complete(asyncio.sleep(0))
+            loop.close()
+
+    def test_snapshot_oldest_first(self) -> None:
+        """Test snapshots are ordered by start time."""
+        reg = InflightRegistry()
+        reg.add(InflightRequest(request_id="new", method="GET", path="/", started=2))
+        reg.add(InflightRequest(request_id="old", method="GET", path="/", started=1))
+        assert [e.request_id for e in reg.snapshot()] == ["old", "new"]
+
+    def test_cancel_unknown(self) -> None:
+        """Test cancelling an unknown request reports failure."""
+        assert InflightRegistry().cancel("missing", "reason") is False
+
+    def test_to_dict(self) -> None:
+        """Test the summary fields."""
+        entry = InflightRequest(request_id="a", method="POST", path="/api/chat")
+        entry.model = "gpt-4"
+        entry.backend = "api.openai.com"
+        data = entry.to_dict()
+        assert data["model"] == "gpt-4"
+        assert data["backend"] == "api.openai.com"
+        assert data["cancelling"] is False
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestInflightMiddleware:
+    """Tests for request tracking through the middleware stack."""
+
+    async def test_requests_unregistered_after_response(self, client_factory) -> None:
+        """Test completed requests leave the registry."""
+        async with client_factory() as client:
+            response = await client.get("/health")
+        assert response.status_code == 200
+        assert registry.get(response.headers["X-Request-ID"]) is None
+
+    async def test_cancel_stream_sends_error_chunk(
+        self, client_factory, temporary_routes
+    ) -> None:
+        """Test a cancelled stream ends with an Ollama error chunk."""
+        never = asyncio.Event()
+
+        async def body():
+            entry = get_current_inflight()
+            entry.model = "gpt-test"
+            yield b'{"response":"Hel","done":false}\n'
+            await never.wait()
+
+        @app.get("/test-inflight-stream")
+        async def stream() -> StreamingResponse:
+            return StreamingResponse(body(), media_type="application/x-ndjson")
+
+        temporary_routes.append("/test-inflight-stream")
+
+        async with client_factory() as client:
+            request = asyncio.create_task(client.get("/test-inflight-stream"))
+            await _wait_for(
+                lambda: any(
+                    e.path == "/test-inflight-stream" and e.stage == STAGE_STREAMING
+                    for e in registry.snapshot()
+                )
+            )
+            entry = next(
+                e for e in registry.snapshot() if e.path == "/test-inflight-stream"
+            )
+            assert entry.model == "gpt-test"
+            assert entry.bytes_sent > 0
+            assert registry.cancel(entry.request_id, "stopped") is True
+            response = await asyncio.wait_for(request, timeout=2)
+
+        lines = response.text.splitlines()
+        assert json.loads(lines[0])["response"] == "Hel"
+        assert json.loads(lines[-1]) == {"error": "stopped"}
+        assert registry.get(entry.request_id) is None
+
+    async def test_cancel_before_response(
+        self, client_factory, temporary_routes
+    ) -> None:
+        """Test a request cancelled before responding gets a 503 error."""
+        never = asyncio.Event()
+
+        @app.get("/test-inflight-wait")
+        async def wait() -> dict:
+            await never.wait()
+            return {}
+
+        temporary_routes.append("/test-inflight-wait")
+
+        async with client_factory() as client:
+            request = asyncio.create_task(client.get("/test-inflight-wait"))
+            await _wait_for(
+                lambda: any(
+                    e.path == "/test-inflight-wait" for e in registry.snapshot()
+                )
+            )
+            entry = next(
+                e for e in registry.snapshot() if e.path == "/test-inflight-wait"
+            )
+            registry.cancel(entry.request_id, "stopped")
+            response = await asyncio.wait_for(request, timeout=2)
+
+        assert response.status_code == 503
+        assert response.json()["error_code"] == "REQUEST_CANCELLED"
+
+    async def test_duplicate_inbound_ids_tracked_separately(
+        self, client_factory, temporary_routes, configure_settings
+    ) -> None:
+        """Test a finished request does not unregister another with its ID."""
+        configure_settings(trust_inbound_request_id=True)
+        release = asyncio.Event()
+
+        @app.get("/test-inflight-dup")
+        async def wait() -> dict:
+            await release.wait()
+            return {}
+
+        temporary_routes.append("/test-inflight-dup")
+
+        headers = {"X-Request-ID": "shared-id"}
+        async with client_factory() as client:
+            slow = asyncio.create_task(
+                client.get("/test-inflight-dup", headers=headers)
+            )
+            await _wait_for(lambda: registry.get("shared-id") is not None)
+            response = await client.get("/health", headers=headers)
+            assert response.headers["X-Request-ID"] == "shared-id"
+            assert registry.get("shared-id") is not None
+            release.set()
+            await asyncio.wait_for(slow, timeout=2)
+        assert registry.get("shared-id") is None
+
+    async def test_upstream_backend_reported(self) -> None:
+        """Test the upstream client reports the backend and stage."""
+        entry = InflightRequest(request_id="a", method="POST", path="/api/chat")
+        token = current_inflight.set(entry)
+        try:
+            async with create_http_client(
+                transport=httpx.MockTransport(lambda request: httpx.Response(200))
+            ) as client:
+                await client.get("http://api.example.com/v1/models")
+        finally:
+            current_inflight.reset(token)
+        assert entry.backend == "api.example.com"
+        assert entry.stage == STAGE_UPSTREAM
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestDebugRequestsEndpoint:
+    """Tests for /debug/requests."""
+
+    async def test_list_includes_current_request(
+        self, client_factory, configure_settings
+    ) -> None:
+        """Test the listing request sees itself in flight."""
+        configure_settings(admin_token="secret")
+        async with client_factory() as client:
+            response = await client.get(
+                "/debug/requests", headers={"X-Admin-Token": "secret"}
+            )
+        data = response.json()
+        assert response.status_code == 200
+        assert data["count"] >= 1
+        ids = [r["request_id"] for r in data["requests"]]
+        assert response.headers["X-Request-ID"] in ids
+
+    async def test_delete_unknown_request(
+        self, client_factory, configure_settings
+    ) -> None:
+        """Test cancelling an unknown request returns 404."""
+        configure_settings(admin_token="secret")
+        async with client_factory() as client:
+            response = await client.delete(
+                "/debug/requests/missing", headers={"X-Admin-Token": "secret"}
+            )
+        assert response.status_code == 404
+        assert response.json()["error_code"] == "NOT_FOUND"
+
+    async def test_requires_admin(self, client_factory, configure_settings) -> None:
+        """Test listing requires the admin token."""
+        configure_settings(admin_token="secret")
+        async with client_factory() as client:
+            response = await client.get("/debug/requests")
+        assert response.status_code == 403
@@ -0,0 +1,113 @@
+"""Unit tests for readiness and graceful draining."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport
+
+from app.main import app
+from app.utils.inflight import STAGE_STREAMING, registry
+from app.utils.lifecycle import DRAIN_CANCEL_REASON, Lifecycle, lifecycle
+
+
+@pytest.fixture(autouse=True)
+def reset_lifecycle():
+    """Restore the global lifecycle state after each test."""
+    ready, draining = lifecycle.ready, lifecycle.draining
+    yield
+    lifecycle.ready, lifecycle.draining = ready, draining
+
+
+@pytest.fixture
+def stream_route():
+    """Add a streaming route released by an event; removed after the test."""
+    release = asyncio.Event()
+
+    async def body():
+        yield b'{"response":"Hel","done":false}\n'
+        await release.wait()
+        yield b'{"response":"lo","done":true}\n'
+
+    @app.get("/test-drain-stream")
+    async def stream() -> StreamingResponse:
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    yield release
+    app.router.routes = [
+        r for r in app.router.routes if getattr(r, "path", None) != "/test-drain-stream"
+    ]
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+async def _wait_streaming() -> None:
+    """Wait until the test stream has started sending its body."""
+    for _ in range(400):
+        if any(
+            e.path == "/test-drain-stream" and e.stage == STAGE_STREAMING
+            for e in registry.snapshot()
+        ):
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("stream did not start")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestLifecycle:
+    """Tests for Lifecycle.drain and request rejection while draining."""
+
+    async def test_mark_ready_and_drain_idle(self) -> None:
+        """Test draining an idle process flips readiness immediately."""
+        state = Lifecycle()
+        state.mark_ready()
+        assert state.ready and not state.draining
+
+        assert await state.drain(timeout=5) == 0
+        assert state.draining and not state.ready
+        # A second drain is a no-op
+        assert await state.drain(timeout=5) == 0
+
+    async def test_drain_lets_streams_finish(self, stream_route) -> None:
+        """Test streams that finish within the timeout are not cancelled."""
+        async with _client() as client:
+            request = asyncio.create_task(client.get("/test-drain-stream"))
+            await _wait_streaming()
+            drain = asyncio.create_task(lifecycle.drain(timeout=5))
+            await asyncio.sleep(0.05)
+            assert not drain.done()
+
+            stream_route.set()
+            assert await asyncio.wait_for(drain, timeout=2) == 0
+            response = await request
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[-1] == {"response": "lo", "done": True}
+
+    async def test_drain_cancels_streams_after_timeout(self, stream_route) -> None:
+        """Test streams still running at the timeout get a final error chunk."""
+        async with _client() as client:
+            request = asyncio.create_task(client.get("/test-drain-stream"))
+            await _wait_streaming()
+            assert await lifecycle.drain(timeout=0.05) == 1
+            response = await asyncio.wait_for(request, timeout=2)
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[-1] == {"error": DRAIN_CANCEL_REASON}
+
+    async def test_new_requests_rejected_while_draining(self) -> None:
+        """Test requests arriving during the drain get a 503."""
+        lifecycle.draining = True
+        async with _client() as client:
+            response = await client.get("/metrics")
+            probe = await client.get("/health/live")
+
+        assert probe.status_code == 200
+        assert response.status_code == 503
+        assert response.headers["connection"] == "close"
+        assert response.json()["error_code"] == "SERVICE_UNAVAILABLE"
@@ -0,0 +1,223 @@
+"""Unit tests for SLO-driven load shedding."""
+
+import httpx
+import pytest
+from fastapi import Request
+from httpx import ASGITransport
+from pydantic import ValidationError
+
+from app.config import Settings
+from app.main import app
+from app.utils.errors import LoadShedException
+from app.utils.load_shedding import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    LoadShedder,
+    classify,
+    validate_priority_classes,
+)
+
+
+@pytest.mark.unit
+class TestClassify:
+    """Test priority class selection."""
+
+    def test_defaults_to_interactive(self):
+        """Requests without a mapping are interactive."""
+        assert classify("/api/chat") == PRIORITY_INTERACTIVE
+
+    def test_route_and_api_key(self):
+        """API keys take precedence over route prefixes."""
+        routes = {"/api/embed": PRIORITY_BACKGROUND}
+        keys = {"sk-batch": PRIORITY_BATCH}
+        assert classify("/api/embed", route_classes=routes) == PRIORITY_BACKGROUND
+        assert (
+            classify(
+                "/api/embed",
+                api_key="sk-batch",
+                api_key_classes=keys,
+                route_classes=routes,
+            )
+            == PRIORITY_BATCH
+        )
+
+    def test_header_can_only_demote(self):
+        """A requested class is honoured only if it is less important."""
+        routes = {"/api/generate": PRIORITY_BATCH}
+        assert classify("/api/chat", requested=PRIORITY_BATCH) == PRIORITY_BATCH
+        assert (
+            classify(
+                "/api/generate", requested=PRIORITY_INTERACTIVE, route_classes=routes
+            )
+            == PRIORITY_BATCH
+        )
+        assert classify("/api/chat", requested="urgent") == PRIORITY_INTERACTIVE
+
+    def test_validate_priority_classes(self):
+        """Unknown class names are rejected, including in settings."""
+        validate_priority_classes([PRIORITY_BATCH, PRIORITY_BACKGROUND])
+        with pytest.raises(ValueError):
+            validate_priority_classes(["urgent"])
+        with pytest.raises(ValidationError):
+            Settings(shed_thresholds={"urgent": 1.0})
+        with pytest.raises(ValidationError):
+            Settings(priority_routes={"/api/": "urgent"})
+
+
+@pytest.mark.unit
+class TestLoadShedder:
+    """Test pressure measurement and shedding decisions."""
+
+    def test_p99_over_window(self, fake_clock):
+        """The p99 covers only samples inside the window."""
+        shedder = LoadShedder(window=10.0, clock=fake_clock)
+        assert shedder.p99() is None
+
+        for _ in range(99):
+            shedder.observe(0.1)
+        shedder.observe(5.0)
+        fake_clock.now += 1
+        assert shedder.p99() == 0.1
+
+        shedder.observe(5.0)
+        fake_clock.now += 1
+        assert shedder.p99() == 5.0
+
+        fake_clock.now += 20
+        assert shedder.p99() is None
+
+    def test_pressure_from_latency_and_queue(self, fake_clock):
+        """Pressure is the worse of the latency and queue ratios."""
+        depth = {"value": 0}
+        shedder = LoadShedder(
+            slo_p99_latency=2.0,
+            slo_queue_depth=10,
+            queue_depth=lambda: depth["value"],
+            clock=fake_clock,
+        )
+        assert shedder.pressure() == 0.0
+
+        shedder.observe(3.0)
+        fake_clock.now += 1
+        assert shedder.pressure() == 1.5
+
+        depth["value"] = 20
+        assert shedder.pressure() == 2.0
+
+    def test_lowest_class_shed_first(self):
+        """Classes are shed as the pressure passes their thresholds."""
+        depth = {"value": 0}
+        shedder = LoadShedder(
+            slo_p99_latency=0,
+            slo_queue_depth=10,
+            thresholds={PRIORITY_BATCH: 1.5, PRIORITY_BACKGROUND: 1.0},
+            queue_depth=lambda: depth["value"],
+        )
+        depth["value"] = 5
+        assert shedder.shedding() == []
+
+        depth["value"] = 10
+        assert shedder.shedding() == [PRIORITY_BACKGROUND]
+
+        depth["value"] = 100
+        assert shedder.shedding() == [PRIORITY_BATCH, PRIORITY_BACKGROUND]
+        assert not shedder.should_shed(PRIORITY_INTERACTIVE)
+
+    async def test_admit_rejects_with_retry_after(self):
+        """A shed request is rejected with a Retry-After header."""
+        shedder = LoadShedder(
+            slo_queue_depth=1,
+            thresholds={PRIORITY_BACKGROUND: 1.0},
+            retry_after=2.5,
+            queue_depth=lambda: 5,
+        )
+        await shedder.admit(PRIORITY_INTERACTIVE)
+        with pytest.raises(LoadShedException) as exc_info:
+            await shedder.admit(PRIORITY_BACKGROUND)
+
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers == {"Retry-After": "3"}
+
+    async def test_deferred_request_admitted_when_pressure_drops(self, monkeypatch):
+        """A deferred request goes through if the overload clears in time."""
+        depth = {"value": 5}
+        shedder = LoadShedder(
+            slo_queue_depth=1,
+            thresholds={PRIORITY_BACKGROUND: 1.0},
+            queue_depth=lambda: depth["value"],
+        )
+
+        async def sleep(delay: float) -> None:
+            depth["value"] = 0
+
+        monkeypatch.setattr("app.utils.load_shedding.asyncio.sleep", sleep)
+        await shedder.admit(PRIORITY_BACKGROUND, defer=5.0)
+
+    def test_snapshot(self):
+        """The snapshot reports pressure, p99, queue depth and shed classes."""
+        shedder = LoadShedder(
+            slo_queue_depth=4,
+            thresholds={PRIORITY_BACKGROUND: 1.0},
+            queue_depth=lambda: 4,
+        )
+        assert shedder.snapshot() == {
+            "pressure": 1.0,
+            "p99_latency_s": None,
+            "queued": 4,
+            "shedding": [PRIORITY_BACKGROUND],
+        }
+
+
+@pytest.fixture
+def embed_route():
+    """Add an upstream-style route; removed after the test."""
+
+    @app.post("/api/test-shed")
+    async def shed(request: Request) -> dict:
+        return {"ok": True}
+
+    yield
+    app.router.routes = [
+        r for r in app.router.routes if getattr(r, "path", None) != "/api/test-shed"
+    ]
+
+
+@pytest.mark.unit
+class TestLoadSheddingMiddleware:
+    """Test shedding of upstream-bound requests."""
+
+    async def _post(self, headers: dict) -> httpx.Response:
+        transport = ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.post(
+                "/api/test-shed", json={"model": "m"}, headers=headers
+            )
+
+    async def test_sheds_background_keeps_interactive(self, embed_route, monkeypatch):
+        """Under overload background requests get a 503, interactive pass."""
+        overloaded = LoadShedder(
+            slo_queue_depth=1,
+            thresholds={PRIORITY_BACKGROUND: 1.0},
+            queue_depth=lambda: 10,
+        )
+        monkeypatch.setattr("app.utils.middleware.shedder", overloaded)
+
+        shed = await self._post({"X-Priority": "background"})
+        assert shed.status_code == 503
+        assert shed.json()["error_code"] == "LOAD_SHED"
+        assert shed.headers["Retry-After"] == "5"
+
+        served = await self._post({})
+        assert served.status_code == 200
+
+    async def test_records_latency(self, embed_route, monkeypatch, fake_clock):
+        """Requests let through feed the p99 latency."""
+        idle = LoadShedder(clock=fake_clock)
+        monkeypatch.setattr("app.utils.middleware.shedder", idle)
+
+        await self._post({})
+        fake_clock.now += 1
+        assert idle.p99() is not None
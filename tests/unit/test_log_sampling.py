@@ -0,0 +1,179 @@
+"""Unit tests for log sampling and warning collapsing."""
+
+import threading
+
+import pytest
+import structlog
+
+from app.utils.log_sampling import LogSampler, parse_sample_ratios
+
+
+def _run(sampler: LogSampler, **event_dict):
+    """Run the sampler and return the event dict, or None if dropped."""
+    try:
+        return sampler(None, event_dict.get("level", "info"), event_dict)
+    except structlog.DropEvent:
+        return None
+
+
+@pytest.mark.unit
+class TestParseSampleRatios:
+    """Tests for parsing sampling specifications."""
+
+    def test_parse_valid_spec(self) -> None:
+        """Test parsing event=ratio pairs."""
+        ratios = parse_sample_ratios("request_started=0.1, health_check_requested=0")
+        assert ratios == {"request_started": 0.1, "health_check_requested": 0.0}
+
+    def test_parse_empty_spec(self) -> None:
+        """Test an empty specification disables sampling."""
+        assert parse_sample_ratios("") == {}
+
+    @pytest.mark.parametrize("spec", ["request_started", "=0.5", "x=2", "x=abc"])
+    def test_parse_invalid_spec(self, spec: str) -> None:
+        """Test malformed entries are rejected."""
+        with pytest.raises(ValueError):
+            parse_sample_ratios(spec)
+
+
+@pytest.mark.unit
+class TestLogSampler:
+    """Tests for the LogSampler processor."""
+
+    def test_unlisted_events_pass_through(self) -> None:
+        """Test events without a ratio are never sampled."""
+        sampler = LogSampler(sample_ratios={"request_started": 0.0})
+        assert _run(sampler, event="request_completed", level="info") is not None
+
+    def test_ratio_keeps_one_in_n(self) -> None:
+        """Test a ratio of 0.25 keeps every fourth event."""
+        sampler = LogSampler(sample_ratios={"request_started": 0.25})
+        kept = [_run(sampler, event="request_started", level="info") for _ in range(8)]
+        assert sum(1 for event in kept if event is not None) == 2
+
+    def test_zero_ratio_drops_all(self) -> None:
+        """Test a ratio of zero drops every event."""
+        sampler = LogSampler(sample_ratios={"health_check_requested": 0.0})
+        assert _run(sampler, event="health_check_requested", level="debug") is None
+
+    def test_errors_always_kept(self) -> None:
+        """Test error-level events bypass sampling."""
+        sampler = LogSampler(sample_ratios={"request_started": 0.0})
+        assert _run(sampler, event="request_started", level="error") is not None
+
+    def test_server_errors_always_kept(self) -> None:
+        """Test 5xx responses bypass sampling."""
+        sampler = LogSampler(sample_ratios={"request_completed": 0.0})
+        kept = _run(sampler, event="request_completed", level="info", status_code=502)
+        assert kept is not None
+
+    def test_slow_requests_always_kept(self) -> None:
+        """Test requests above the slow threshold bypass sampling."""
+        sampler = LogSampler(
+            sample_ratios={"request_completed": 0.0}, slow_request_threshold=0.5
+        )
+        assert (
+            _run(sampler, event="request_completed", level="info", duration=0.7)
+            is not None
+        )
+        assert (
+            _run(sampler, event="request_completed", level="info", duration=0.1) is None
+        )
+
+    def test_identical_warnings_collapsed(self) -> None:
+        """Test duplicate warnings are counted and summarized."""
+        now = [0.0]
+        sampler = LogSampler(warning_summary_interval=10.0, clock=lambda: now[0])
+
+        first = _run(sampler, event="upstream_slow", level="warning", backend="a")
+        assert first is not None
+        assert "repeated" not in first
+
+        for _ in range(3):
+            now[0] += 1.0
+            assert (
+                _run(sampler, event="upstream_slow", level="warning", backend="a")
+                is None
+            )
+
+        now[0] += 10.0
+        summary = _run(sampler, event="upstream_slow", level="warning", backend="a")
+        assert summary is not None
+        assert summary["repeated"] == 3
+
+    def test_different_warnings_not_collapsed(self) -> None:
+        """Test warnings with different fields are emitted independently."""
+        sampler = LogSampler()
+        assert _run(sampler, event="upstream_slow", level="warning", backend="a")
+        assert _run(sampler, event="upstream_slow", level="warning", backend="b")
+
+    def test_request_id_ignored_for_collapsing(self) -> None:
+        """Test warnings differing only by request ID are collapsed."""
+        sampler = LogSampler()
+        assert _run(sampler, event="slow", level="warning", request_id="1")
+        assert _run(sampler, event="slow", level="warning", request_id="2") is None
+
+    def test_flush_reports_counts_of_quiet_warnings(self) -> None:
+        """Test counts of warnings that do not recur are flushed."""
+        now = [0.0]
+        sampler = LogSampler(warning_summary_interval=10.0, clock=lambda: now[0])
+        for _ in range(3):
+            _run(sampler, event="upstream_slow", level="warning", backend="a")
+        _run(sampler, event="disk_full", level="warning")
+
+        assert sampler.flush() == []
+        now[0] += 10.0
+        assert sampler.flush() == [
+            {
+                "event": "upstream_slow",
+                "level": "warning",
+                "backend": "a",
+                "repeated": 2,
+            }
+        ]
+        # The next occurrence starts a new interval
+        first = _run(sampler, event="upstream_slow", level="warning", backend="a")
+        assert "repeated" not in first
+
+    def test_flush_forced_at_shutdown(self) -> None:
+        """Test a forced flush takes pending counts before the interval."""
+        sampler = LogSampler(warning_summary_interval=60.0)
+        _run(sampler, event="slow", level="warning")
+        _run(sampler, event="slow", level="warning")
+        assert sampler.flush(force=True) == [
+            {"event": "slow", "level": "warning", "repeated": 1}
+        ]
+        assert sampler.flush(force=True) == []
+
+    def test_oldest_warning_evicted(self, monkeypatch) -> None:
+        """Test the oldest tracked warning is evicted, keeping the others."""
+        import app.utils.log_sampling as log_sampling
+
+        monkeypatch.setattr(log_sampling, "MAX_TRACKED_WARNINGS", 2)
+        sampler = LogSampler()
+        _run(sampler, event="a", level="warning")
+        _run(sampler, event="a", level="warning")
+        _run(sampler, event="b", level="warning")
+        _run(sampler, event="c", level="warning")
+
+        # "b" is still collapsed; the evicted "a" reports its count
+        assert _run(sampler, event="b", level="warning") is None
+        assert sampler.flush() == [{"event": "a", "level": "warning", "repeated": 1}]
+
+    def test_concurrent_sampling(self) -> None:
+        """Test counters stay exact when events are logged from many threads."""
+        sampler = LogSampler(sample_ratios={"request_started": 0.5})
+
+        def log_many() -> None:
+            for _ in range(1000):
+                _run(sampler, event="request_started", level="info")
+                _run(sampler, event="slow", level="warning")
+
+        threads = [threading.Thread(target=log_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sampler._counters["request_started"] == 8000
+        assert sampler.flush(force=True)[0]["repeated"] == 7999
@@ -3,13 +3,23 @@
 import json
 import logging
 import os
+import queue
+import threading
+import time
 from io import StringIO
 from unittest.mock import patch
 
 import pytest
 import structlog
 
-from app.utils.logging import configure_logging, get_logger
+from app.utils.logging import (
+    DroppingQueueHandler,
+    _LogListener,
+    configure_logging,
+    get_dropped_log_count,
+    get_logger,
+    shutdown_logging,
+)
 
 
 class TestLoggingConfiguration:
@@ -197,3 +207,144 @@ class TestLoggingConfiguration:
         test_logger.warning("warning_message")
         output.seek(0)
         assert "warning_message" in output.getvalue()
+
+
+class TestQueuedLogging:
+    """Test the non-blocking queue-based log pipeline."""
+
+    def test_root_logger_uses_queue_handler(self):
+        """Test the root logger writes through the background queue."""
+        import app.utils.logging as logging_module
+
+        logging_module.configure_logging(log_level="INFO", environment="production")
+
+        handlers = logging.getLogger().handlers
+        assert len(handlers) == 1
+        assert isinstance(handlers[0], logging_module.DroppingQueueHandler)
+
+    def test_queue_handler_drops_on_overflow(self):
+        """Test records are dropped and counted when the queue is full."""
+        log_queue = queue.Queue(maxsize=1)
+        handler = DroppingQueueHandler(log_queue)
+        record = logging.LogRecord("test", logging.INFO, "", 0, "msg", None, None)
+
+        handler.emit(record)
+        handler.emit(record)
+        handler.emit(record)
+
+        assert log_queue.qsize() == 1
+        assert handler.dropped == 2
+
+    def test_queue_handler_does_not_format(self):
+        """Test records are enqueued without being rendered by the caller."""
+        log_queue = queue.Queue()
+        handler = DroppingQueueHandler(log_queue)
+        event_dict = {"event": "test_message"}
+        record = logging.LogRecord("test", logging.INFO, "", 0, event_dict, None, None)
+
+        handler.emit(record)
+
+        assert log_queue.get_nowait().msg is event_dict
+
+    def test_stop_with_dead_writer_does_not_hang(self):
+        """Test a full queue nobody drains is abandoned on shutdown."""
+        log_queue = queue.Queue(maxsize=2)
+        listener = _LogListener(log_queue, logging.NullHandler())
+        listener.stop_timeout = 0.05
+        record = logging.LogRecord("test", logging.INFO, "", 0, "msg", None, None)
+        log_queue.put_nowait(record)
+        log_queue.put_nowait(record)
+
+        started = time.monotonic()
+        listener.stop()
+
+        assert time.monotonic() - started < 1
+        assert listener._sentinel in list(log_queue.queue)
+
+    def test_stop_with_stalled_writer_does_not_hang(self):
+        """Test shutdown gives up on a writer blocked on its output."""
+        release = threading.Event()
+
+        class StalledHandler(logging.Handler):
+            def emit(self, record: logging.LogRecord) -> None:
+                release.wait()
+
+        log_queue = queue.Queue(maxsize=1)
+        listener = _LogListener(log_queue, StalledHandler())
+        listener.stop_timeout = 0.05
+        listener.start()
+        try:
+            record = logging.LogRecord("test", logging.INFO, "", 0, "msg", None, None)
+            log_queue.put(record)
+            log_queue.put(record, timeout=1)
+
+            started = time.monotonic()
+            listener.stop()
+            assert time.monotonic() - started < 1
+        finally:
+            release.set()
+
+    def test_dropped_count_resets_on_configure(self):
+        """Test the drop counter starts at zero after configuration."""
+        configure_logging(log_level="INFO", environment="production", queue_size=5)
+        assert get_dropped_log_count() == 0
+
+    def test_orjson_renderer_output(self):
+        """Test production output is rendered to JSON by the writer thread."""
+        output = StringIO()
+        with patch("sys.stdout", output):
+            configure_logging(log_level="INFO", environment="production")
+            get_logger("test").info("queued_message", key="value", count=3)
+            shutdown_logging()
+
+        log_data = json.loads(output.getvalue().strip().splitlines()[-1])
+        assert log_data["event"] == "queued_message"
+        assert log_data["key"] == "value"
+        assert log_data["count"] == 3
+
+        configure_logging(log_level="INFO", environment="production")
+
+    def test_repeated_stdlib_warning_keeps_writer_alive(self):
+        """Test foreign records are not sampled on the writer thread."""
+        import app.utils.logging as logging_module
+
+        output = StringIO()
+        with patch("sys.stdout", output):
+            configure_logging(log_level="INFO", environment="production")
+            listener = logging_module._listener
+            for _ in range(3):
+                logging.getLogger("uvicorn.error").warning("x")
+            get_logger("test").info("after_foreign")
+            for _ in range(100):
+                if listener.queue.empty():
+                    break
+                time.sleep(0.01)
+            time.sleep(0.05)
+            alive = listener._thread.is_alive()
+            shutdown_logging()
+
+        assert alive
+        events = [json.loads(line) for line in output.getvalue().strip().splitlines()]
+        assert [e["event"] for e in events].count("x") == 3
+        assert events[-1]["event"] == "after_foreign"
+
+        configure_logging(log_level="INFO", environment="production")
+
+    def test_shutdown_logs_collapsed_warning_counts(self):
+        """Test pending repeat counts are logged when logging shuts down."""
+        output = StringIO()
+        with patch("sys.stdout", output):
+            configure_logging(log_level="INFO", environment="production")
+            logger = get_logger("test")
+            for _ in range(4):
+                logger.warning("upstream_slow", backend="a")
+            shutdown_logging()
+
+        events = [json.loads(line) for line in output.getvalue().strip().splitlines()]
+        slow = [e for e in events if e["event"] == "upstream_slow"]
+        assert len(slow) == 2
+        assert "repeated" not in slow[0]
+        assert slow[1]["repeated"] == 3
+        assert slow[1]["logger"] == "test"
+
+        configure_logging(log_level="INFO", environment="production")
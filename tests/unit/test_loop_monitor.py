@@ -0,0 +1,70 @@
+"""Unit tests for the event loop monitor."""
+
+import asyncio
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from app.utils import loop_monitor
+from app.utils.loop_monitor import EventLoopMonitor
+from app.utils.metrics import EVENT_LOOP_LAG
+
+
+def _lag_count() -> int:
+    """Number of lag observations recorded so far."""
+    return sum(EVENT_LOOP_LAG.labels().counts)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestEventLoopMonitor:
+    """Tests for EventLoopMonitor."""
+
+    async def test_records_lag_histogram(self) -> None:
+        """Test lag samples are recorded while the loop is idle."""
+        before = _lag_count()
+        monitor = EventLoopMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        assert _lag_count() > before
+
+    async def test_warns_on_lag(self, monkeypatch) -> None:
+        """Test a blocked loop produces a lag warning."""
+        mock_logger = Mock()
+        monkeypatch.setattr(loop_monitor, "logger", mock_logger)
+        monitor = EventLoopMonitor(interval=0.01, lag_threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+
+        events = [call.args[0] for call in mock_logger.warning.call_args_list]
+        assert "event_loop_lag" in events
+
+    async def test_debug_watchdog_captures_stack(self, monkeypatch) -> None:
+        """Test the debug watchdog logs the stack of a blocking call."""
+        mock_logger = Mock()
+        monkeypatch.setattr(loop_monitor, "logger", mock_logger)
+        monitor = EventLoopMonitor(
+            interval=0.01, lag_threshold=10.0, debug=True, block_threshold=0.05
+        )
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.2)
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+        blocked = [
+            call
+            for call in mock_logger.warning.call_args_list
+            if call.args[0] == "event_loop_blocked"
+        ]
+        assert len(blocked) == 1
+        assert "test_debug_watchdog_captures_stack" in blocked[0].kwargs["stack"]
+
+    async def test_stop_without_start(self) -> None:
+        """Test stopping an idle monitor is a no-op."""
+        await EventLoopMonitor().stop()
@@ -0,0 +1,102 @@
+"""Unit tests for the Ollama options to OpenAI parameter mapping."""
+
+import pytest
+
+from app.models.ollama import Options
+from app.translators.mappings import (
+    MAX_STOP_SEQUENCES,
+    PARAMETER_MAP,
+    UNKNOWN_OPTION,
+    UNSUPPORTED_PARAMS,
+    map_options,
+)
+from app.utils.errors import ValidationException
+from app.utils.metrics import DROPPED_OPTIONS
+
+
+def _dropped(name: str) -> float:
+    return DROPPED_OPTIONS.labels(name).value
+
+
+@pytest.mark.unit
+class TestMapOptions:
+    """Test translation of model options."""
+
+    def test_every_option_mapped_or_dropped(self):
+        """Each Ollama option is either mapped or known to be unsupported."""
+        assert set(PARAMETER_MAP) | set(UNSUPPORTED_PARAMS) == set(Options.model_fields)
+        assert {"mirostat", "num_gpu", "tfs_z"} <= set(UNSUPPORTED_PARAMS)
+
+    def test_maps_supported_options(self):
+        """Supported options are renamed and converted."""
+        options = Options(
+            temperature=0.2, top_p=0.9, seed=7, num_predict=128, stop=["\n"]
+        )
+        assert map_options(options) == {
+            "temperature": 0.2,
+            "top_p": 0.9,
+            "seed": 7,
+            "max_tokens": 128,
+            "stop": ["\n"],
+        }
+
+    def test_only_set_options_considered(self):
+        """Defaults and explicit nulls produce no parameters."""
+        assert map_options(Options()) == {}
+        assert map_options(Options(temperature=None)) == {}
+        assert map_options(None) == {}
+
+    @pytest.mark.parametrize("num_predict", [-1, -2, 0])
+    def test_unbounded_num_predict_omitted(self, num_predict):
+        """Ollama's "no limit" values leave max_tokens unset."""
+        assert map_options(Options(num_predict=num_predict)) == {}
+
+    def test_dropped_options_counted(self):
+        """Unsupported and unknown options are counted, not forwarded."""
+        before = _dropped("mirostat"), _dropped("tfs_z"), _dropped(UNKNOWN_OPTION)
+        params = map_options(
+            Options(mirostat=2, tfs_z=0.5, temperature=0.1, custom_knob=1)
+        )
+        assert params == {"temperature": 0.1}
+        after = _dropped("mirostat"), _dropped("tfs_z"), _dropped(UNKNOWN_OPTION)
+        assert after == (before[0] + 1, before[1] + 1, before[2] + 1)
+
+    def test_raw_options(self):
+        """The raw options object of a request maps the same way."""
+        before = _dropped("num_gpu")
+        assert map_options({"num_gpu": 1, "stop": "END", "top_p": 0.5}) == {
+            "stop": "END",
+            "top_p": 0.5,
+        }
+        assert _dropped("num_gpu") == before + 1
+
+    def test_raw_values_coerced(self):
+        """Raw values are coerced to the option's type."""
+        assert map_options({"num_predict": "100", "temperature": "0.5"}) == {
+            "max_tokens": 100,
+            "temperature": 0.5,
+        }
+        assert map_options({"num_predict": "-1"}) == {}
+
+    @pytest.mark.parametrize(
+        "options",
+        [{"num_predict": "many"}, {"temperature": [1]}, {"stop": [1, None]}],
+    )
+    def test_invalid_raw_values_rejected(self, options):
+        """Values of the wrong type are validation errors, not crashes."""
+        with pytest.raises(ValidationException) as exc_info:
+            map_options(options)
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.details["option"] == next(iter(options))
+
+    def test_too_many_stop_sequences_rejected(self):
+        """More stop sequences than OpenAI accepts are rejected."""
+        stops = [str(i) for i in range(MAX_STOP_SEQUENCES)]
+        assert map_options({"stop": stops}) == {"stop": stops}
+        for options in ({"stop": stops + ["x"]}, Options(stop=stops + ["x"])):
+            with pytest.raises(ValidationException) as exc_info:
+                map_options(options)
+            assert exc_info.value.details == {
+                "option": "stop",
+                "count": MAX_STOP_SEQUENCES + 1,
+            }
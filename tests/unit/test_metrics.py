@@ -0,0 +1,294 @@
+"""Unit tests for the metrics registry and /metrics endpoint."""
+
+import asyncio
+import os
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport
+
+from app.clients.upstream import create_http_client
+from app.main import app
+from app.utils.metrics import (
+    HTTP_REQUEST_DURATION,
+    UPSTREAM_REQUEST_DURATION,
+    UPSTREAM_RESPONSES,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    mark_process_dead,
+    merge_snapshots,
+    read_snapshots,
+    render_multiprocess,
+    render_snapshot,
+    write_snapshot,
+)
+
+
+def _worker_registry(requests: int, in_flight: float, ratio: float) -> MetricsRegistry:
+    """Build a registry resembling one worker's metrics."""
+    registry = MetricsRegistry()
+    counter = Counter("req_total", "Requests.", ("route",), registry=registry)
+    counter.labels("/a").inc(requests)
+    Gauge("in_flight", "In flight.", registry=registry).set(in_flight)
+    Gauge("saturation", "Saturation.", registry=registry, multiprocess_mode="max").set(
+        ratio
+    )
+    histogram = Histogram("latency", "Latency.", buckets=(1.0,), registry=registry)
+    histogram.observe(0.5)
+    histogram.observe(2.0)
+    return registry
+
+
+@pytest.mark.unit
+class TestMetricTypes:
+    """Tests for counters, gauges and histograms."""
+
+    def test_counter_with_labels(self) -> None:
+        """Test labelled counters render one sample per label set."""
+        registry = MetricsRegistry()
+        counter = Counter("test_total", "Test counter.", ("route",), registry=registry)
+        counter.labels("/a").inc()
+        counter.labels("/a").inc(2)
+        counter.labels("/b").inc()
+
+        output = registry.render()
+        assert "# TYPE test_total counter" in output
+        assert 'test_total{route="/a"} 3.0' in output
+        assert 'test_total{route="/b"} 1.0' in output
+
+    def test_counter_label_count_checked(self) -> None:
+        """Test using the wrong number of labels is rejected."""
+        counter = Counter("test_total", "Test.", ("a", "b"), registry=None)
+        with pytest.raises(ValueError):
+            counter.labels("only-one")
+
+    def test_function_backed_counter(self) -> None:
+        """Test function-backed metrics read their value at scrape time."""
+        registry = MetricsRegistry()
+        Counter("dropped_total", "Dropped.", function=lambda: 7, registry=registry)
+        assert "dropped_total 7.0" in registry.render()
+
+    def test_gauge(self) -> None:
+        """Test gauge increments and decrements."""
+        registry = MetricsRegistry()
+        gauge = Gauge("in_flight", "In flight.", registry=registry)
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        assert "in_flight 1.0" in registry.render()
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        """Test histogram buckets, sum and count."""
+        registry = MetricsRegistry()
+        histogram = Histogram(
+            "latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry
+        )
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+
+        output = registry.render()
+        assert 'latency_seconds_bucket{le="0.1"} 2.0' in output
+        assert 'latency_seconds_bucket{le="1.0"} 3.0' in output
+        assert 'latency_seconds_bucket{le="+Inf"} 4.0' in output
+        assert "latency_seconds_sum 5.65" in output
+        assert "latency_seconds_count 4.0" in output
+
+    def test_histogram_preallocates_buckets(self) -> None:
+        """Test observations reuse the preallocated bucket slots."""
+        histogram = Histogram("h", "H.", buckets=(1.0,), registry=None)
+        child = histogram.labels()
+        counts = child.counts
+        for _ in range(100):
+            histogram.observe(0.5)
+        assert child.counts is counts
+        assert counts == [100, 0]
+
+    def test_label_values_escaped(self) -> None:
+        """Test label values are escaped in the exposition format."""
+        registry = MetricsRegistry()
+        counter = Counter("esc_total", "Esc.", ("v",), registry=registry)
+        counter.labels('a"b\\c').inc()
+        assert 'esc_total{v="a\\"b\\\\c"} 1.0' in registry.render()
+
+    def test_duplicate_registration_rejected(self) -> None:
+        """Test registering the same name twice fails."""
+        registry = MetricsRegistry()
+        Counter("dup_total", "Dup.", registry=registry)
+        with pytest.raises(ValueError):
+            Counter("dup_total", "Dup.", registry=registry)
+
+
+@pytest.mark.unit
+class TestMultiprocessMetrics:
+    """Tests for aggregating metrics across worker processes."""
+
+    def test_snapshot_round_trips_through_render(self) -> None:
+        """Test rendering a snapshot matches rendering the registry."""
+        registry = _worker_registry(3, 1, 0.5)
+        assert render_snapshot(registry.snapshot()) == registry.render()
+
+    def test_merge_sums_counters_histograms_and_gauges(self) -> None:
+        """Test counters, histograms and sum-mode gauges add up."""
+        merged = merge_snapshots(
+            [
+                _worker_registry(3, 1, 0.5).snapshot(),
+                _worker_registry(4, 2, 0.25).snapshot(),
+            ]
+        )
+        output = render_snapshot(merged)
+        assert 'req_total{route="/a"} 7.0' in output
+        assert "in_flight 3.0" in output
+        assert 'latency_bucket{le="1.0"} 2.0' in output
+        assert 'latency_bucket{le="+Inf"} 4.0' in output
+        assert "latency_sum 5.0" in output
+
+    def test_merge_max_mode_gauge(self) -> None:
+        """Test max-mode gauges report the largest worker value."""
+        merged = merge_snapshots(
+            [
+                _worker_registry(1, 0, 0.5).snapshot(),
+                _worker_registry(1, 0, 0.9).snapshot(),
+            ]
+        )
+        assert "saturation 0.9" in render_snapshot(merged)
+
+    def test_invalid_multiprocess_mode_rejected(self) -> None:
+        """Test unknown gauge aggregation modes are rejected."""
+        with pytest.raises(ValueError):
+            Gauge("g", "Gauge.", registry=None, multiprocess_mode="avg")
+
+    def test_render_multiprocess_merges_other_workers(self, tmp_path: Path) -> None:
+        """Test the local registry is merged with other workers' files."""
+        (tmp_path / "1.json").write_bytes(b"")  # unreadable files are skipped
+        other = _worker_registry(5, 1, 0.1)
+        write_snapshot(str(tmp_path), other)
+        os.replace(tmp_path / f"{os.getpid()}.json", tmp_path / "2.json")
+        # A stale file for this process is replaced by the live registry
+        write_snapshot(str(tmp_path), _worker_registry(100, 0, 0))
+
+        output = render_multiprocess(str(tmp_path), _worker_registry(1, 1, 0.2))
+        assert 'req_total{route="/a"} 6.0' in output
+        assert "in_flight 2.0" in output
+
+    def test_mark_process_dead_keeps_only_cumulative_metrics(
+        self, tmp_path: Path
+    ) -> None:
+        """Test a dead worker's gauges are dropped but its counters kept."""
+        write_snapshot(str(tmp_path), _worker_registry(2, 1, 0.5))
+        mark_process_dead(str(tmp_path), os.getpid())
+
+        (snapshot,) = read_snapshots(str(tmp_path))
+        assert set(snapshot) == {"req_total", "latency"}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestMetricsEndpoint:
+    """Tests for the /metrics endpoint."""
+
+    async def test_metrics_endpoint_records_requests(self) -> None:
+        """Test requests are counted by route template."""
+        transport = ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            await client.get("/health")
+            response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert (
+            'ollama_proxy_http_requests_total{route="/health",method="GET",'
+            'status="200"}' in body
+        )
+        assert "ollama_proxy_http_request_duration_seconds_bucket" in body
+        assert "ollama_proxy_http_requests_in_flight" in body
+        assert "ollama_proxy_log_records_dropped_total" in body
+
+    async def test_stream_duration_observed_at_body_end(
+        self, configure_settings
+    ) -> None:
+        """Test streamed requests are timed to the last chunk, by model."""
+        configure_settings(metrics_models=frozenset({"llama3"}))
+        duration = HTTP_REQUEST_DURATION.labels("/api/test-metrics-stream", "llama3")
+        before = sum(duration.counts)
+
+        async def body():
+            yield b'{"done":false}\n'
+            await asyncio.sleep(0.05)
+            yield b'{"done":true}\n'
+
+        @app.post("/api/test-metrics-stream")
+        async def stream() -> StreamingResponse:
+            return StreamingResponse(body(), media_type="application/x-ndjson")
+
+        try:
+            transport = ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                response = await client.post(
+                    "/api/test-metrics-stream", json={"model": "llama3"}
+                )
+        finally:
+            app.router.routes = [
+                route
+                for route in app.router.routes
+                if getattr(route, "path", None) != "/api/test-metrics-stream"
+            ]
+
+        assert response.status_code == 200
+        assert sum(duration.counts) == before + 1
+        assert duration.sum >= 0.05
+
+    async def test_unconfigured_models_share_one_label(
+        self, configure_settings
+    ) -> None:
+        """Test client-chosen model names cannot create new series."""
+        configure_settings(
+            metrics_models=frozenset({"llama3"}), admission_model_limits={"qwen": 2}
+        )
+        route = "/api/test-metrics-models"
+        models = {"llama3", "qwen", "other"}
+
+        @app.post(route)
+        async def echo() -> dict:
+            return {}
+
+        try:
+            async with httpx.AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                for model in ["llama3", "qwen"] + [f"random-{i}" for i in range(20)]:
+                    await client.post(route, json={"model": model})
+        finally:
+            app.router.routes = [
+                r for r in app.router.routes if getattr(r, "path", None) != route
+            ]
+
+        labels = {
+            values[1]
+            for values in HTTP_REQUEST_DURATION._children
+            if values[0] == route
+        }
+        assert labels == models
+
+    async def test_upstream_responses_recorded(self) -> None:
+        """Test upstream responses are counted and timed until body close."""
+        responses = UPSTREAM_RESPONSES.labels("metrics-upstream", "503")
+        duration = UPSTREAM_REQUEST_DURATION.labels("metrics-upstream")
+        before_responses, before_duration = responses.value, sum(duration.counts)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(503, content=b"busy")
+
+        async with create_http_client(transport=httpx.MockTransport(handler)) as client:
+            async with client.stream("GET", "http://metrics-upstream/v1/x") as stream:
+                assert responses.value == before_responses + 1
+                await stream.aread()
+        assert sum(duration.counts) == before_duration + 1
@@ -0,0 +1,98 @@
+"""Unit tests for the sampling profiler and /debug/profile endpoint."""
+
+import threading
+import time
+
+import httpx
+import pytest
+from httpx import ASGITransport
+
+from app.main import app
+from app.utils import profiler
+from app.utils.profiler import SamplingProfiler, collapse_stack
+
+
+def _busy_wait(stop: threading.Event) -> None:
+    """Spin until stopped."""
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+@pytest.mark.unit
+class TestSamplingProfiler:
+    """Tests for SamplingProfiler."""
+
+    def test_collapse_stack_root_first(self) -> None:
+        """Test stacks are rendered outermost frame first."""
+        import sys
+
+        stack = collapse_stack(sys._getframe(), "MainThread")
+        frames = stack.split(";")
+        assert frames[0] == "MainThread"
+        assert frames[-1].endswith(":test_collapse_stack_root_first")
+
+    def test_samples_other_threads(self) -> None:
+        """Test stacks of other threads are sampled."""
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_wait, args=(stop,), name="busy")
+        worker.start()
+        try:
+            sampler = SamplingProfiler(rate_hz=200)
+            sampler.run(0.05)
+        finally:
+            stop.set()
+            worker.join()
+
+        output = sampler.collapsed()
+        busy_lines = [line for line in output.splitlines() if line.startswith("busy;")]
+        assert busy_lines
+        assert any("_busy_wait" in line for line in busy_lines)
+        stack, count = busy_lines[0].rsplit(" ", 1)
+        assert int(count) >= 1
+
+    def test_concurrent_sessions_rejected(self) -> None:
+        """Test only one profiling session runs at a time."""
+        assert profiler._profile_lock.acquire(blocking=False)
+        try:
+            assert profiler.profile(0.01, 100) is None
+        finally:
+            profiler._profile_lock.release()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestProfileEndpoint:
+    """Tests for the admin-only profile endpoint."""
+
+    async def _get(self, path: str, **headers: str) -> httpx.Response:
+        transport = ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.get(path, headers=headers)
+
+    async def test_disabled_without_admin_token(self, configure_settings) -> None:
+        """Test the endpoint is forbidden when no admin token is configured."""
+        configure_settings(admin_token=None)
+        response = await self._get("/debug/profile?seconds=0.01")
+        assert response.status_code == 403
+        assert response.json()["error_code"] == "FORBIDDEN"
+
+    async def test_wrong_token_rejected(self, configure_settings) -> None:
+        """Test an invalid admin token is rejected."""
+        configure_settings(admin_token="secret")
+        response = await self._get("/debug/profile?seconds=0.01", x_admin_token="x")
+        assert response.status_code == 403
+
+    async def test_profile_returns_collapsed_stacks(self, configure_settings) -> None:
+        """Test an authorized request returns collapsed stacks."""
+        configure_settings(admin_token="secret")
+        response = await self._get(
+            "/debug/profile?seconds=0.05&rate=200", authorization="Bearer secret"
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        for line in response.text.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert stack
+            assert int(count) > 0
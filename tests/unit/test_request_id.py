@@ -0,0 +1,115 @@
+"""Unit tests for request ID generation and correlation headers."""
+
+import uuid
+
+import httpx
+import pytest
+from httpx import ASGITransport
+
+from app.clients.upstream import create_http_client
+from app.main import app
+from app.utils.request_id import (
+    RequestIdGenerator,
+    current_request_id,
+    parse_inbound_request_id,
+)
+
+
+@pytest.mark.unit
+class TestRequestIdGenerator:
+    """Tests for RequestIdGenerator."""
+
+    def test_ids_are_uuid7(self) -> None:
+        """Test generated IDs are valid version 7 UUIDs."""
+        request_id = RequestIdGenerator()()
+        parsed = uuid.UUID(request_id)
+        assert parsed.version == 7
+        assert parsed.variant == uuid.RFC_4122
+        assert str(parsed) == request_id
+
+    def test_ids_are_unique_and_sorted(self) -> None:
+        """Test IDs from one generator are unique and monotonically sorted."""
+        generator = RequestIdGenerator()
+        ids = [generator() for _ in range(1000)]
+        assert len(set(ids)) == len(ids)
+        assert ids == sorted(ids)
+
+    def test_reseed_changes_prefix(self) -> None:
+        """Test reseeding draws a new per-process prefix."""
+        generator = RequestIdGenerator()
+        prefixes = set()
+        for _ in range(5):
+            generator.reseed()
+            prefixes.add(generator._prefix)
+        assert len(prefixes) > 1
+
+
+@pytest.mark.unit
+class TestParseInboundRequestId:
+    """Tests for parse_inbound_request_id."""
+
+    def test_valid_request_id_header(self) -> None:
+        """Test a well-formed X-Request-ID is accepted."""
+        headers = httpx.Headers({"x-request-id": "lb-1234.abc"})
+        assert parse_inbound_request_id(headers) == "lb-1234.abc"
+
+    @pytest.mark.parametrize("value", ["", "has space", "x" * 129, "bad\nid"])
+    def test_invalid_request_id_header(self, value: str) -> None:
+        """Test malformed X-Request-ID values are rejected."""
+        assert parse_inbound_request_id({"X-Request-ID": value}) is None
+
+    def test_traceparent_trace_id(self) -> None:
+        """Test the trace ID is taken from a valid traceparent."""
+        traceparent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        headers = {"traceparent": traceparent}
+        assert parse_inbound_request_id(headers) == "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    def test_invalid_traceparent(self) -> None:
+        """Test an all-zero trace ID is rejected."""
+        traceparent = f"00-{'0' * 32}-00f067aa0ba902b7-01"
+        assert parse_inbound_request_id({"traceparent": traceparent}) is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestCorrelationPropagation:
+    """Tests for inbound and outbound correlation IDs."""
+
+    async def test_upstream_client_forwards_request_id(self) -> None:
+        """Test the upstream client sends the current request ID."""
+        seen = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen["request_id"] = request.headers.get("X-Request-ID")
+            return httpx.Response(200)
+
+        token = current_request_id.set("req-42")
+        try:
+            async with create_http_client(
+                transport=httpx.MockTransport(handler)
+            ) as client:
+                await client.get("http://upstream/v1/models")
+        finally:
+            current_request_id.reset(token)
+
+        assert seen["request_id"] == "req-42"
+
+    async def test_inbound_id_ignored_when_untrusted(self, configure_settings) -> None:
+        """Test inbound IDs are replaced unless the header is trusted."""
+        configure_settings(trust_inbound_request_id=False)
+        transport = ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            response = await client.get("/health", headers={"X-Request-ID": "lb-1"})
+        assert response.headers["X-Request-ID"] != "lb-1"
+
+    async def test_inbound_id_honored_when_trusted(self, configure_settings) -> None:
+        """Test trusted inbound IDs are reused."""
+        configure_settings(trust_inbound_request_id=True)
+        transport = ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            response = await client.get("/health", headers={"X-Request-ID": "lb-1"})
+        assert response.headers["X-Request-ID"] == "lb-1"
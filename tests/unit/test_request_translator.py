@@ -0,0 +1,330 @@
+"""Unit tests for Ollama to OpenAI request translation."""
+
+import orjson
+import pytest
+
+from app.config import Settings
+from app.translators.request import (
+    JSON_FORMAT,
+    FormatTranslationCache,
+    ToolsTranslationCache,
+    apply_translation_settings,
+    dumps_with_fragments,
+    format_cache,
+    tools_cache,
+    translate_message,
+    translate_messages,
+    translate_format,
+    translate_tool,
+    translate_tools,
+)
+from app.utils.errors import StructuredOutputException, ValidationException
+
+PNG = "iVBORw0KGgoAAAANSUhEUg"
+
+
+def _weather_call(city: str) -> dict:
+    return {"function": {"name": "get_weather", "arguments": {"city": city}}}
+
+
+@pytest.mark.unit
+class TestTranslateMessage:
+    """Test translation of single messages."""
+
+    def test_text_message(self):
+        """Plain messages keep their role and content."""
+        assert translate_message({"role": "user", "content": "Hi"}) == {
+            "role": "user",
+            "content": "Hi",
+        }
+
+    def test_images_become_content_parts(self):
+        """Images are sent as data URLs next to the text."""
+        translated = translate_message(
+            {"role": "user", "content": "What is this?", "images": [PNG, "/9j/4AAQ"]}
+        )
+        assert translated["content"] == [
+            {"type": "text", "text": "What is this?"},
+            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{PNG}"}},
+            {
+                "type": "image_url",
+                "image_url": {"url": "data:image/jpeg;base64,/9j/4AAQ"},
+            },
+        ]
+
+    def test_tool_calls(self):
+        """Tool calls get JSON string arguments and position-derived IDs."""
+        message = {
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [_weather_call("Paris")],
+        }
+        translated = translate_message(message)
+        assert translated["content"] is None
+        (call,) = translated["tool_calls"]
+        assert call["type"] == "function"
+        assert call["function"] == {
+            "name": "get_weather",
+            "arguments": '{"city":"Paris"}',
+        }
+        assert call["id"] == "call_0_0"
+        assert translate_message(message, 5)["tool_calls"][0]["id"] == "call_5_0"
+
+
+@pytest.mark.unit
+class TestTranslateMessages:
+    """Test translation of chat histories."""
+
+    def test_tool_results_linked_to_calls(self):
+        """Tool results get the ID of the call to the same tool."""
+        messages = [
+            {"role": "user", "content": "Weather and time?"},
+            {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [
+                    {"function": {"name": "get_time", "arguments": {}}},
+                    _weather_call("Paris"),
+                ],
+            },
+            {"role": "tool", "content": "Sunny", "tool_name": "get_weather"},
+            {"role": "tool", "content": "12:00", "tool_name": "get_time"},
+        ]
+        translated = translate_messages(messages)
+        time_id, weather_id = (c["id"] for c in translated[1]["tool_calls"])
+        assert translated[2]["tool_call_id"] == weather_id
+        assert translated[3]["tool_call_id"] == time_id
+
+    def test_repeated_tool_calls_get_distinct_ids(self):
+        """Identical tool-call messages in one history get different IDs."""
+        call = {
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [_weather_call("Rome")],
+        }
+        result = {"role": "tool", "content": "Rain", "tool_name": "get_weather"}
+        translated = translate_messages([call, result, dict(call), dict(result)])
+
+        first, second = (
+            translated[0]["tool_calls"][0]["id"],
+            translated[2]["tool_calls"][0]["id"],
+        )
+        assert first != second
+        assert translated[1]["tool_call_id"] == first
+        assert translated[3]["tool_call_id"] == second
+
+    def test_ids_stable_across_turns(self):
+        """A follow-up turn translates the shared history identically."""
+        history = [
+            {"role": "user", "content": "Hi", "images": [PNG]},
+            {"role": "assistant", "content": "", "tool_calls": [_weather_call("Oslo")]},
+        ]
+        follow_up = history + [{"role": "tool", "content": "Snow"}]
+        assert translate_messages(follow_up)[:2] == translate_messages(history)
+
+    def test_apply_settings(self):
+        """The global caches follow the settings."""
+        try:
+            apply_translation_settings(
+                Settings(),
+                Settings(
+                    tools_cache_max_entries=1,
+                    tools_cache_max_bytes=100,
+                    format_cache_max_entries=2,
+                    format_cache_max_bytes=200,
+                ),
+            )
+            assert (tools_cache.max_entries, tools_cache.max_bytes) == (1, 100)
+            assert (format_cache.max_entries, format_cache.max_bytes) == (2, 200)
+        finally:
+            apply_translation_settings(Settings(), Settings())
+
+
+WEATHER_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "get_weather",
+        "description": "Get the weather for a city",
+        "parameters": {
+            "type": "object",
+            "$defs": None,
+            "required": ["city"],
+            "properties": {"city": {"type": "string", "description": "City"}},
+        },
+    },
+}
+
+
+@pytest.mark.unit
+class TestToolsTranslation:
+    """Test translation and caching of tool catalogues."""
+
+    def test_translate_tool(self):
+        """Tools become OpenAI functions; unset schema keys are dropped."""
+        assert translate_tool(WEATHER_TOOL) == {
+            "type": "function",
+            "function": {
+                "name": "get_weather",
+                "description": "Get the weather for a city",
+                "parameters": {
+                    "type": "object",
+                    "required": ["city"],
+                    "properties": {"city": {"type": "string", "description": "City"}},
+                },
+            },
+        }
+        bare = translate_tool({"function": {"name": "now"}})
+        assert bare["function"]["parameters"] == {"type": "object", "properties": {}}
+
+    @pytest.mark.parametrize(
+        "tool",
+        [None, {}, {"function": {}}, {"type": "code", "function": {"name": "x"}}],
+    )
+    def test_invalid_tool_rejected(self, tool):
+        """Tools that are not named functions are validation errors."""
+        with pytest.raises(ValidationException) as exc_info:
+            translate_tools([WEATHER_TOOL, tool], ToolsTranslationCache())
+        assert exc_info.value.details == {"index": 1}
+
+    def test_catalogue_cached_serialized(self):
+        """A repeated catalogue returns the same serialized bytes."""
+        cache = ToolsTranslationCache(max_entries=1)
+        first = cache.translate([WEATHER_TOOL])
+        assert orjson.loads(first) == [translate_tool(WEATHER_TOOL)]
+        assert cache.translate([dict(WEATHER_TOOL)]) is first
+
+        cache.translate([])
+        assert len(cache) == 1
+        assert cache.translate([WEATHER_TOOL]) is not first
+
+    def test_catalogues_bounded_by_bytes(self):
+        """Cached catalogues stay within the byte budget."""
+        entry_size = len(orjson.dumps([WEATHER_TOOL])) + len(
+            translate_tools([WEATHER_TOOL], ToolsTranslationCache())
+        )
+        cache = ToolsTranslationCache(max_bytes=entry_size)
+        cache.translate([WEATHER_TOOL])
+        assert cache.size == entry_size
+
+        other = dict(WEATHER_TOOL)
+        other["function"] = dict(WEATHER_TOOL["function"], name="get_weathex")
+        cache.translate([other])
+        assert len(cache) == 1
+        assert cache.size <= entry_size
+
+        # Catalogues larger than the whole budget are not cached
+        cache.translate([WEATHER_TOOL, WEATHER_TOOL])
+        assert len(cache) == 1
+        cache.configure(max_entries=256, max_bytes=0)
+        assert len(cache) == 0
+        assert cache.size == 0
+
+    def test_dumps_with_fragments(self):
+        """Serialized fields are spliced into the body verbatim."""
+        tools = translate_tools([WEATHER_TOOL], ToolsTranslationCache())
+        body = dumps_with_fragments({"model": "m"}, {"tools": tools})
+        assert orjson.loads(body) == {
+            "model": "m",
+            "tools": [translate_tool(WEATHER_TOOL)],
+        }
+        assert orjson.loads(dumps_with_fragments({}, {"tools": b"[]"})) == {"tools": []}
+        assert dumps_with_fragments({"a": 1}, {}) == b'{"a":1}'
+
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"answer": {"type": "string"}, "score": {"type": "number"}},
+    "required": ["answer"],
+}
+
+
+@pytest.mark.unit
+class TestFormatTranslation:
+    """Test translation of structured-output formats."""
+
+    def test_free_text_and_json(self):
+        """No format means free text; "json" means any JSON object."""
+        assert translate_format(None) is None
+        assert translate_format("") is None
+        assert translate_format("json") is JSON_FORMAT
+        assert JSON_FORMAT.response_format == {"type": "json_object"}
+
+    def test_schema_becomes_strict_json_schema(self):
+        """A schema is sent as a strict json_schema response format."""
+        compiled = translate_format(SCHEMA, FormatTranslationCache())
+        assert compiled.response_format == {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "response",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "answer": {"type": "string"},
+                        "score": {"type": ["number", "null"]},
+                    },
+                    "required": ["answer", "score"],
+                    "additionalProperties": False,
+                },
+            },
+        }
+        assert orjson.loads(compiled.serialized) == compiled.response_format
+
+    def test_schema_converted_once(self):
+        """Equal schemas share one translation regardless of key order."""
+        cache = FormatTranslationCache(max_entries=1)
+        first = cache.translate(SCHEMA)
+        reordered = {key: SCHEMA[key] for key in reversed(list(SCHEMA))}
+        assert cache.translate(reordered) is first
+
+        cache.translate({"type": "object"})
+        assert len(cache) == 1
+        assert cache.translate(SCHEMA) is not first
+
+    def test_schemas_bounded_by_bytes(self):
+        """Cached formats stay within the byte budget."""
+        size = len(translate_format(SCHEMA, FormatTranslationCache()).serialized)
+        cache = FormatTranslationCache(max_bytes=size)
+        first = cache.translate(SCHEMA)
+        assert cache.size == size
+        assert cache.translate(SCHEMA) is first
+
+        large = {
+            "type": "object",
+            "properties": {f"field_{i}": {"type": "string"} for i in range(50)},
+        }
+        assert cache.translate(large) is not None
+        assert len(cache) == 1
+        assert cache.translate(SCHEMA) is first
+
+    def test_restore_strips_optional_nulls(self):
+        """Strict output is restored to the client's schema."""
+        compiled = translate_format(SCHEMA, FormatTranslationCache())
+        assert compiled.restore({"answer": "42", "score": None}) == {"answer": "42"}
+        assert compiled.restore({"answer": "42", "score": 1}) == {
+            "answer": "42",
+            "score": 1,
+        }
+
+        loose = translate_format(
+            {"type": "object", "patternProperties": {}}, FormatTranslationCache()
+        )
+        assert "strict" not in loose.response_format["json_schema"]
+        assert loose.restore({"a": None}) == {"a": None}
+
+    @pytest.mark.parametrize("value", ["yaml", 42, ["json"]])
+    def test_invalid_format_rejected(self, value):
+        """Anything but "json" or a schema is a validation error."""
+        with pytest.raises(ValidationException):
+            translate_format(value, FormatTranslationCache())
+
+    def test_validator(self):
+        """Validators check streamed output against the converted schema."""
+        compiled = translate_format(SCHEMA, FormatTranslationCache())
+        validator = compiled.validator()
+        validator.feed('{"answer": "42", ')
+        validator.feed('"score": null}')
+        validator.close()
+
+        with pytest.raises(StructuredOutputException):
+            compiled.validator().feed('{"answer": 42')
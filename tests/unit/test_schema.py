@@ -0,0 +1,209 @@
+"""Unit tests for structured-output schemas and incremental validation."""
+
+import pytest
+
+from app.translators.schema import (
+    ANY_NODE,
+    IncrementalValidator,
+    compile_schema,
+    schema_name,
+    strip_optional_nulls,
+    to_strict_schema,
+)
+from app.utils.errors import StructuredOutputException
+
+PERSON = {
+    "title": "Person record",
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "age": {"type": "integer"},
+        "role": {"type": "string", "enum": ["admin", "user"]},
+        "tags": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["name", "age"],
+    "additionalProperties": False,
+}
+
+
+def _validate(schema, *chunks):
+    validator = IncrementalValidator(compile_schema(schema))
+    for chunk in chunks:
+        validator.feed(chunk)
+    validator.close()
+
+
+@pytest.mark.unit
+class TestStrictSchema:
+    """Test conversion to OpenAI strict mode."""
+
+    def test_optional_properties_become_nullable(self):
+        """All properties are required and optional ones accept null."""
+        strict, ok = to_strict_schema(PERSON)
+        assert ok
+        assert strict["required"] == ["name", "age", "role", "tags"]
+        assert strict["additionalProperties"] is False
+        assert strict["properties"]["name"] == {"type": "string"}
+        assert strict["properties"]["role"] == {
+            "type": ["string", "null"],
+            "enum": ["admin", "user", None],
+        }
+        assert strict["properties"]["tags"]["type"] == ["array", "null"]
+
+    def test_nested_and_referenced_objects(self):
+        """Objects in definitions and array items are converted too."""
+        schema = {
+            "type": "object",
+            "properties": {"items": {"type": "array", "items": {"$ref": "#/$defs/I"}}},
+            "required": ["items"],
+            "$defs": {
+                "I": {"type": "object", "properties": {"id": {"type": "string"}}}
+            },
+        }
+        strict, ok = to_strict_schema(schema)
+        assert ok
+        item = strict["$defs"]["I"]
+        assert item["additionalProperties"] is False
+        assert item["properties"]["id"] == {"type": ["string", "null"]}
+
+    def test_open_objects_not_strict(self):
+        """Schemas allowing extra properties are passed through non-strict."""
+        schema = {"type": "object", "additionalProperties": True, "title": None}
+        assert to_strict_schema(schema) == (
+            {"type": "object", "additionalProperties": True},
+            False,
+        )
+
+    @pytest.mark.parametrize(
+        "schema",
+        [
+            {"type": "array", "items": {"type": "string"}},
+            {"anyOf": [PERSON, {"type": "string"}]},
+            {"$ref": "#/$defs/P", "$defs": {"P": PERSON}},
+            {**PERSON, "allOf": [{"required": ["role"]}]},
+            {**PERSON, "properties": {"name": {"not": {"const": ""}}}},
+            {**PERSON, "properties": {"name": {"type": "string", "minLength": 1}}},
+        ],
+    )
+    def test_unsupported_schemas_not_strict(self, schema):
+        """Non-object roots and unsupported keywords fall back to non-strict."""
+        converted, ok = to_strict_schema(schema)
+        assert not ok
+        assert converted == schema
+
+    def test_schema_name(self):
+        """Names are derived from the title and sanitized."""
+        assert schema_name(PERSON) == "Person_record"
+        assert schema_name({}) == "response"
+
+
+@pytest.mark.unit
+class TestStripOptionalNulls:
+    """Test removal of the nulls strict mode returns for omitted properties."""
+
+    def test_optional_nulls_removed(self):
+        """Null optional properties are dropped, required ones are kept."""
+        node = compile_schema(PERSON)
+        output = {"name": "Ada", "age": None, "role": None, "tags": None}
+        assert strip_optional_nulls(output, node) == {"name": "Ada", "age": None}
+
+    def test_nested_objects(self):
+        """Objects inside arrays and references are restored too."""
+        schema = {
+            "type": "object",
+            "properties": {"people": {"type": "array", "items": {"$ref": "#/$defs/P"}}},
+            "required": ["people"],
+            "$defs": {"P": PERSON},
+        }
+        output = {"people": [{"name": "Ada", "age": 36, "role": None}]}
+        assert strip_optional_nulls(output, compile_schema(schema)) == {
+            "people": [{"name": "Ada", "age": 36}]
+        }
+
+    def test_nullable_optional_kept(self):
+        """A null the client's schema allows is a real value and kept."""
+        schema = {
+            "type": "object",
+            "properties": {"note": {"type": ["string", "null"]}, "x": {}},
+        }
+        output = {"note": None, "x": None}
+        assert strip_optional_nulls(output, compile_schema(schema)) == output
+
+
+@pytest.mark.unit
+class TestIncrementalValidator:
+    """Test streamed validation against a compiled schema."""
+
+    def test_valid_output_in_chunks(self):
+        """Valid output split at arbitrary points passes."""
+        text = '{"name": "Ada \\"L\\"", "age": 36, "tags": ["a", "b"], "role": "admin"}'
+        for size in (1, 3, 7, len(text)):
+            _validate(PERSON, *[text[i : i + size] for i in range(0, len(text), size)])
+
+    @pytest.mark.parametrize(
+        "text,reason",
+        [
+            ('{"name": 1', "number not allowed here"),
+            ('{"name": "a", "nick"', "unexpected property 'nick'"),
+            ('{"name": "a", "age": 1.5}', "1.5 is not an integer"),
+            ('{"name": "a", "age": 3, "role": "root"}', "is not one of"),
+            ('{"name": "a"}', "missing required properties ['age']"),
+            ('{"name": "a", "age": 3, "tags": [1', "number not allowed here"),
+            ('{"name": "a", "age": 3} x', "unexpected data"),
+        ],
+    )
+    def test_divergence_detected_early(self, text, reason):
+        """Output that leaves the schema fails as soon as it does."""
+        validator = IncrementalValidator(compile_schema(PERSON))
+        with pytest.raises(StructuredOutputException) as exc_info:
+            validator.feed(text)
+        assert reason in exc_info.value.details["reason"]
+
+    def test_error_reports_path(self):
+        """The error details locate the divergence."""
+        validator = IncrementalValidator(compile_schema(PERSON))
+        with pytest.raises(StructuredOutputException) as exc_info:
+            validator.feed('{"name": "a", "age": 3, "tags": ["x", 2')
+        assert exc_info.value.details["path"] == "$.tags[1]"
+        assert exc_info.value.status_code == 502
+
+    def test_incomplete_output(self):
+        """A stream ending mid-value fails on close."""
+        validator = IncrementalValidator(compile_schema(PERSON))
+        validator.feed('{"name": "a", ')
+        assert not validator.complete
+        with pytest.raises(StructuredOutputException):
+            validator.close()
+
+    def test_recursive_reference_and_any_of(self):
+        """Recursive references and anyOf branches are followed."""
+        tree = {
+            "$ref": "#/definitions/node",
+            "definitions": {
+                "node": {
+                    "type": "object",
+                    "properties": {
+                        "value": {"anyOf": [{"type": "integer"}, {"type": "null"}]},
+                        "children": {
+                            "type": "array",
+                            "items": {"$ref": "#/definitions/node"},
+                        },
+                    },
+                    "additionalProperties": False,
+                }
+            },
+        }
+        _validate(tree, '{"value": null, "children": [{"value": 1, "children": []}]}')
+        with pytest.raises(StructuredOutputException):
+            _validate(tree, '{"children": [{"value": "x"}]}')
+
+    def test_any_json(self):
+        """Without a schema only well-formedness is checked."""
+        validator = IncrementalValidator(ANY_NODE)
+        validator.feed('[1, -2.5e3, "x", {"a": [true, false, null]}]')
+        validator.close()
+        with pytest.raises(StructuredOutputException):
+            IncrementalValidator(ANY_NODE).feed("{'a': 1}")
+        with pytest.raises(StructuredOutputException) as exc_info:
+            IncrementalValidator(ANY_NODE).feed("[tru3")
+        assert "invalid literal" in exc_info.value.details["reason"]
@@ -0,0 +1,84 @@
+"""Unit tests for the multi-worker production launcher."""
+
+import socket
+import time
+from typing import Optional
+from unittest.mock import patch
+
+import pytest
+
+from app import server
+from app.server import Supervisor, create_socket, resolve_workers
+
+
+def _exit_immediately(sock: Optional[socket.socket], host: str, port: int) -> None:
+    """Worker target that exits straight away."""
+
+
+def _sleep_forever(sock: Optional[socket.socket], host: str, port: int) -> None:
+    """Worker target that runs until terminated."""
+    time.sleep(60)
+
+
+@pytest.mark.unit
+class TestLauncherHelpers:
+    """Tests for worker count, implementation detection and sockets."""
+
+    def test_resolve_workers_defaults_to_cpu_count(self) -> None:
+        """Test zero workers means one per CPU core."""
+        with patch.object(server.os, "cpu_count", return_value=6):
+            assert resolve_workers(0) == 6
+        assert resolve_workers(3) == 3
+
+    def test_detect_falls_back_without_optional_packages(self) -> None:
+        """Test asyncio and h11 are used when uvloop/httptools are missing."""
+        with patch.object(server, "find_spec", return_value=None):
+            assert server.detect_loop() == "asyncio"
+            assert server.detect_http() == "h11"
+        with patch.object(server, "find_spec", return_value=object()):
+            assert server.detect_loop() == "uvloop"
+            assert server.detect_http() == "httptools"
+
+    def test_reuse_port_sockets_share_a_port(self) -> None:
+        """Test two SO_REUSEPORT sockets can bind the same port."""
+        first = create_socket("127.0.0.1", 0, reuse_port=True)
+        port = first.getsockname()[1]
+        second = create_socket("127.0.0.1", port, reuse_port=True)
+        try:
+            assert second.getsockname()[1] == port
+            assert first.get_inheritable()
+        finally:
+            first.close()
+            second.close()
+
+
+@pytest.mark.unit
+class TestSupervisor:
+    """Tests for the worker supervisor."""
+
+    def test_restarts_dead_workers_with_backoff(self) -> None:
+        """Test exited workers are restarted after the backoff delay."""
+        supervisor = Supervisor(
+            1, "127.0.0.1", 0, reuse_port=True, target=_exit_immediately
+        )
+        supervisor.start()
+        try:
+            deadline = time.monotonic() + 10
+            while supervisor.restarts == 0 and time.monotonic() < deadline:
+                supervisor.poll()
+                time.sleep(0.05)
+            assert supervisor.restarts >= 1
+        finally:
+            supervisor.stop()
+
+    def test_stop_terminates_workers(self) -> None:
+        """Test stop terminates running workers and closes the socket."""
+        supervisor = Supervisor(2, "127.0.0.1", 0, target=_sleep_forever)
+        supervisor.start()
+        processes = list(supervisor.processes)
+        supervisor.stop(timeout=5)
+
+        assert all(p is not None and not p.is_alive() for p in processes)
+        assert supervisor.processes == [None, None]
+        supervisor.poll()  # no restarts once stopping
+        assert supervisor.processes == [None, None]
@@ -0,0 +1,59 @@
+"""Unit tests for pre-serialized static responses."""
+
+import json
+
+import pytest
+
+from app.utils.static_responses import (
+    CoarseClock,
+    StaticJSONResponse,
+    TimestampedJSONResponse,
+)
+
+
+@pytest.mark.unit
+class TestStaticResponses:
+    """Tests for CoarseClock and the cached JSON responses."""
+
+    def test_coarse_clock_truncates_to_seconds(self, fake_clock) -> None:
+        """Test the timestamp only changes when the second changes."""
+        wall = fake_clock
+        wall.now = 0.25
+        clock = CoarseClock(wall)
+        first = clock.iso()
+        assert first == "1970-01-01T00:00:00+00:00"
+
+        wall.now = 0.99
+        assert clock.iso() is first
+        wall.now = 1.0
+        assert clock.iso() == "1970-01-01T00:00:01+00:00"
+
+    def test_static_response_reuses_body(self) -> None:
+        """Test the body is serialized once and shared by all responses."""
+        static = StaticJSONResponse({"status": "alive"})
+        response = static.response()
+
+        assert response.body is static.body
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == {"status": "alive"}
+        assert static.response(503).status_code == 503
+
+    def test_timestamped_response_rebuilt_once_per_second(self, fake_clock) -> None:
+        """Test the builder runs only when the coarse clock ticks."""
+        wall = fake_clock
+        wall.now = 10.0
+        calls = []
+
+        def build(timestamp: str) -> dict:
+            calls.append(timestamp)
+            return {"timestamp": timestamp}
+
+        cached = TimestampedJSONResponse(build, CoarseClock(wall))
+        first = cached.response().body
+        wall.now = 10.5
+        assert cached.response().body is first
+        wall.now = 11.0
+        body = cached.response().body
+
+        assert len(calls) == 2
+        assert json.loads(body) == {"timestamp": "1970-01-01T00:00:11+00:00"}
@@ -0,0 +1,202 @@
+"""Unit tests for per-request stage timing and Server-Timing headers."""
+
+import json
+
+import httpx
+import pytest
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport
+
+from app.clients.upstream import create_http_client, create_upstream_client
+from app.main import app
+from app.utils.concurrency_limit import AIMDLimiter
+from app.utils.timing import (
+    STAGE_UPSTREAM_BODY,
+    STAGE_UPSTREAM_QUEUE,
+    STAGE_UPSTREAM_TTFB,
+    STAGE_VALIDATE,
+    RequestTimer,
+    add_stream_trailer,
+    current_timer,
+    record_stage,
+    server_timing_trailer,
+)
+
+
+@pytest.mark.unit
+class TestRequestTimer:
+    """Tests for RequestTimer."""
+
+    def test_stages_accumulate(self) -> None:
+        """Test repeated stage timings are summed."""
+        timer = RequestTimer()
+        timer.add(STAGE_VALIDATE, 0.001)
+        timer.add(STAGE_VALIDATE, 0.002)
+        assert timer.as_dict()[STAGE_VALIDATE] == 3.0
+
+    def test_stage_context_manager(self) -> None:
+        """Test a timed block is recorded."""
+        timer = RequestTimer()
+        with timer.stage(STAGE_VALIDATE):
+            pass
+        assert STAGE_VALIDATE in timer.stages
+
+    def test_header_value_format(self) -> None:
+        """Test the Server-Timing header value format."""
+        timer = RequestTimer()
+        timer.add("validate", 0.0015)
+        header = timer.header_value()
+        assert header.startswith("validate;dur=1.500, total;dur=")
+
+    def test_record_stage_without_timer(self) -> None:
+        """Test recording outside a request is a no-op."""
+        record_stage(STAGE_VALIDATE, 1.0)
+
+    def test_stream_trailer_opt_in(self, configure_settings) -> None:
+        """Test the stream trailer is only produced when enabled."""
+        token = current_timer.set(RequestTimer())
+        try:
+            configure_settings(server_timing_stream_trailer=False)
+            assert server_timing_trailer() == {}
+            configure_settings(server_timing_stream_trailer=True)
+            assert "total" in server_timing_trailer()["server_timing"]
+        finally:
+            current_timer.reset(token)
+
+    def test_trailer_added_to_final_line(self, configure_settings) -> None:
+        """Test only the final NDJSON line gets the trailer fields."""
+        configure_settings(server_timing_stream_trailer=True)
+        timer = RequestTimer()
+        chunk = b'{"response":"a","done":false}\n'
+        assert add_stream_trailer(chunk, timer) is chunk
+        final = add_stream_trailer(
+            b'{"response":"b","done":false}\n{"response":"","done":true}\n', timer
+        )
+        first, last = final.splitlines()
+        assert json.loads(first) == {"response": "b", "done": False}
+        assert "total" in json.loads(last)["server_timing"]
+        # Text mentioning done is not a final chunk
+        text = b'{"response":"\\"done\\":true","done":false}\n'
+        assert add_stream_trailer(text, timer) == text
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestServerTimingHeader:
+    """Tests for Server-Timing on responses."""
+
+    async def test_non_streaming_response_has_header(self) -> None:
+        """Test standard responses carry Server-Timing."""
+        transport = ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            response = await client.get("/health")
+        assert "total;dur=" in response.headers["Server-Timing"]
+
+    async def test_body_parse_recorded_as_validate(self) -> None:
+        """Test parsing an upstream-bound JSON body is timed."""
+
+        @app.post("/api/test-timing-validate")
+        async def validated() -> dict:
+            return {}
+
+        try:
+            async with httpx.AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                response = await client.post(
+                    "/api/test-timing-validate", json={"model": "m"}
+                )
+        finally:
+            app.router.routes = [
+                r
+                for r in app.router.routes
+                if getattr(r, "path", None) != "/api/test-timing-validate"
+            ]
+        assert f"{STAGE_VALIDATE};dur=" in response.headers["Server-Timing"]
+
+    async def test_streaming_response_has_no_header(self) -> None:
+        """Test streamed responses do not carry Server-Timing."""
+
+        async def body():
+            yield b'{"done":true}\n'
+
+        @app.get("/test-stream-timing")
+        async def stream() -> StreamingResponse:
+            return StreamingResponse(body(), media_type="application/x-ndjson")
+
+        try:
+            transport = ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                response = await client.get("/test-stream-timing")
+            assert response.status_code == 200
+            assert "Server-Timing" not in response.headers
+        finally:
+            app.router.routes = [
+                route
+                for route in app.router.routes
+                if getattr(route, "path", None) != "/test-stream-timing"
+            ]
+
+    async def test_stream_trailer_on_final_chunk(self, configure_settings) -> None:
+        """Test streamed NDJSON responses end with the timing trailer."""
+        configure_settings(server_timing_stream_trailer=True)
+
+        async def body():
+            yield b'{"response":"Hi","done":false}\n'
+            yield b'{"response":"","done":true}\n'
+
+        @app.post("/api/test-stream-trailer")
+        async def stream() -> StreamingResponse:
+            return StreamingResponse(body(), media_type="application/x-ndjson")
+
+        try:
+            transport = ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                response = await client.post("/api/test-stream-trailer", json={})
+        finally:
+            app.router.routes = [
+                route
+                for route in app.router.routes
+                if getattr(route, "path", None) != "/api/test-stream-trailer"
+            ]
+
+        first, last = (json.loads(line) for line in response.text.splitlines())
+        assert "server_timing" not in first
+        assert last["done"] is True
+        assert STAGE_UPSTREAM_QUEUE in last["server_timing"]
+        assert "total" in last["server_timing"]
+
+    async def test_upstream_ttfb_recorded(self) -> None:
+        """Test the upstream client adds TTFB to the request timer."""
+        timer = RequestTimer()
+        token = current_timer.set(timer)
+        try:
+            async with create_http_client(
+                transport=httpx.MockTransport(lambda request: httpx.Response(200))
+            ) as client:
+                await client.get("http://upstream/v1/models")
+        finally:
+            current_timer.reset(token)
+        assert STAGE_UPSTREAM_TTFB in timer.stages
+        assert STAGE_UPSTREAM_BODY in timer.stages
+
+    async def test_upstream_queue_recorded(self) -> None:
+        """Test the wait for an upstream concurrency slot is recorded."""
+        timer = RequestTimer()
+        token = current_timer.set(timer)
+        try:
+            async with create_upstream_client(
+                "http://upstream/v1",
+                limiter=AIMDLimiter("timing-test"),
+                transport=httpx.MockTransport(lambda request: httpx.Response(200)),
+            ) as client:
+                await client.get("/models")
+        finally:
+            current_timer.reset(token)
+        assert STAGE_UPSTREAM_QUEUE in timer.stages
@@ -0,0 +1,357 @@
+"""Unit tests for tracing and trace context propagation."""
+
+import io
+import json
+
+import httpx
+import pytest
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport
+
+from app.clients.upstream import create_http_client
+from app.main import app
+from app.utils.tracing import (
+    STAGE_PARSE,
+    STAGE_REQUEST,
+    STAGE_RESPONSE_WRITE,
+    STAGE_UPSTREAM_QUEUE,
+    STAGE_UPSTREAM_TTFB,
+    ConsoleSpanExporter,
+    FileSpanExporter,
+    OTLPSpanExporter,
+    Tracer,
+    create_exporter,
+    parse_traceparent,
+)
+
+
+class ListExporter:
+    """Exporter collecting traces in memory."""
+
+    def __init__(self) -> None:
+        self.traces = []
+
+    def export(self, spans) -> None:
+        self.traces.append(spans)
+
+    def shutdown(self) -> None:
+        pass
+
+
+@pytest.fixture
+def exporter() -> ListExporter:
+    """Provide an in-memory exporter."""
+    return ListExporter()
+
+
+@pytest.fixture
+def make_tracer(exporter: ListExporter):
+    """Create tracers exporting to the in-memory exporter."""
+    tracers = []
+
+    def _make(sample_ratio: float = 1.0, slow_threshold: float = 60.0) -> Tracer:
+        tracer = Tracer()
+        tracer.configure(
+            exporter, sample_ratio=sample_ratio, slow_threshold=slow_threshold
+        )
+        tracers.append(tracer)
+        return tracer
+
+    yield _make
+    for tracer in tracers:
+        tracer.shutdown()
+
+
+@pytest.mark.unit
+class TestTraceparent:
+    """Tests for W3C traceparent parsing."""
+
+    def test_parse_valid(self) -> None:
+        """Test a valid sampled traceparent is parsed."""
+        header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        assert parse_traceparent(header) == (
+            "4bf92f3577b34da6a3ce929d0e0e4736",
+            "00f067aa0ba902b7",
+            True,
+        )
+
+    @pytest.mark.parametrize(
+        "header",
+        [
+            "garbage",
+            f"00-{'0' * 32}-00f067aa0ba902b7-01",
+            f"00-4bf92f3577b34da6a3ce929d0e0e4736-{'0' * 16}-01",
+            "ff-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+        ],
+    )
+    def test_parse_invalid(self, header: str) -> None:
+        """Test invalid traceparent values are rejected."""
+        assert parse_traceparent(header) is None
+
+
+@pytest.mark.unit
+class TestTracer:
+    """Tests for span creation and sampling."""
+
+    def test_disabled_tracer_yields_none(self) -> None:
+        """Test spans are not created when tracing is disabled."""
+        with Tracer().start_span(STAGE_REQUEST) as span:
+            assert span is None
+
+    def test_child_spans_share_trace(self, make_tracer, exporter) -> None:
+        """Test nested spans form a single exported trace."""
+        tracer = make_tracer()
+        with tracer.start_span(STAGE_REQUEST) as root:
+            with tracer.start_span(STAGE_PARSE) as child:
+                assert child.parent_id == root.span_id
+                assert child.trace_id == root.trace_id
+        tracer.shutdown()
+
+        assert len(exporter.traces) == 1
+        names = [span.name for span in exporter.traces[0]]
+        assert names == [STAGE_PARSE, STAGE_REQUEST]
+
+    def test_inbound_traceparent_continued(self, make_tracer) -> None:
+        """Test root spans continue an inbound trace."""
+        tracer = make_tracer(sample_ratio=0.0)
+        header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        with tracer.start_span(STAGE_REQUEST, traceparent=header) as root:
+            assert root.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+            assert root.parent_id == "00f067aa0ba902b7"
+            assert root.sampled is True
+            assert root.traceparent().startswith("00-4bf92f3577b34da6a3ce929d0e0e4736-")
+
+    def test_unsampled_fast_trace_dropped(self, make_tracer, exporter) -> None:
+        """Test fast, successful traces outside the head sample are dropped."""
+        tracer = make_tracer(sample_ratio=0.0)
+        with tracer.start_span(STAGE_REQUEST):
+            pass
+        tracer.shutdown()
+        assert exporter.traces == []
+
+    def test_slow_trace_always_kept(self, make_tracer, exporter) -> None:
+        """Test tail sampling keeps slow traces."""
+        tracer = make_tracer(sample_ratio=0.0, slow_threshold=0.0)
+        with tracer.start_span(STAGE_REQUEST):
+            pass
+        tracer.shutdown()
+        assert len(exporter.traces) == 1
+
+    def test_error_trace_always_kept(self, make_tracer, exporter) -> None:
+        """Test tail sampling keeps traces containing an error."""
+        tracer = make_tracer(sample_ratio=0.0)
+        with pytest.raises(RuntimeError):
+            with tracer.start_span(STAGE_REQUEST):
+                with tracer.start_span(STAGE_PARSE):
+                    raise RuntimeError("boom")
+        tracer.shutdown()
+        assert len(exporter.traces) == 1
+        assert all(span.error for span in exporter.traces[0])
+
+    def test_record_span_requires_parent(self, make_tracer, exporter) -> None:
+        """Test finished spans are only recorded inside a trace."""
+        tracer = make_tracer()
+        tracer.record_span(STAGE_UPSTREAM_TTFB, 0, 1)
+        tracer.shutdown()
+        assert exporter.traces == []
+
+    def test_span_after_root_end_dropped(self, make_tracer, exporter) -> None:
+        """Test spans recorded after the root ended are not buffered."""
+        tracer = make_tracer()
+        root = tracer.begin_span(STAGE_REQUEST)
+        tracer.end_span(root)
+        with tracer.use_span(root):
+            tracer.record_span(STAGE_UPSTREAM_TTFB, 0, 1)
+        tracer.end_span(root)
+
+        assert tracer._pending == {}
+        tracer.shutdown()
+        assert [[s.name for s in trace] for trace in exporter.traces] == [
+            [STAGE_REQUEST]
+        ]
+
+    def test_same_traceparent_buffered_per_request(self, make_tracer, exporter) -> None:
+        """Test concurrent requests continuing one trace keep separate spans."""
+        tracer = make_tracer()
+        header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        first = tracer.begin_span(STAGE_REQUEST, traceparent=header)
+        second = tracer.begin_span(STAGE_REQUEST, traceparent=header)
+        with tracer.use_span(first):
+            tracer.record_span(STAGE_PARSE, 0, 1)
+        with tracer.use_span(second):
+            tracer.record_span(STAGE_UPSTREAM_TTFB, 0, 1)
+        tracer.end_span(first)
+        tracer.end_span(second)
+        tracer.shutdown()
+
+        assert [[s.name for s in trace] for trace in exporter.traces] == [
+            [STAGE_PARSE, STAGE_REQUEST],
+            [STAGE_UPSTREAM_TTFB, STAGE_REQUEST],
+        ]
+
+    def test_pending_roots_bounded(self, make_tracer, monkeypatch) -> None:
+        """Test roots that are never ended do not accumulate."""
+        import app.utils.tracing as tracing
+
+        monkeypatch.setattr(tracing, "MAX_PENDING_TRACES", 2)
+        tracer = make_tracer()
+        roots = [tracer.begin_span(STAGE_REQUEST) for _ in range(3)]
+        assert list(tracer._pending) == [roots[1].span_id, roots[2].span_id]
+
+
+@pytest.mark.unit
+class TestExporters:
+    """Tests for span exporters."""
+
+    def _trace(self, tracer: Tracer):
+        with tracer.start_span(STAGE_REQUEST, route="/api/chat"):
+            pass
+
+    def test_console_exporter(self) -> None:
+        """Test the console exporter writes JSON lines."""
+        stream = io.StringIO()
+        tracer = Tracer()
+        tracer.configure(ConsoleSpanExporter(stream), sample_ratio=1.0)
+        self._trace(tracer)
+        tracer.shutdown()
+
+        span = json.loads(stream.getvalue().strip())
+        assert span["name"] == STAGE_REQUEST
+        assert span["attributes"]["route"] == "/api/chat"
+
+    def test_file_exporter(self, tmp_path) -> None:
+        """Test the file exporter appends JSON lines."""
+        path = tmp_path / "traces.jsonl"
+        tracer = Tracer()
+        tracer.configure(FileSpanExporter(str(path)), sample_ratio=1.0)
+        self._trace(tracer)
+        self._trace(tracer)
+        tracer.shutdown()
+
+        assert len(path.read_text().splitlines()) == 2
+
+    def test_otlp_exporter_payload(self) -> None:
+        """Test the OTLP exporter posts OTLP/JSON to /v1/traces."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200)
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        tracer = Tracer()
+        tracer.configure(
+            OTLPSpanExporter("http://collector:4318", "proxy", client=client),
+            sample_ratio=1.0,
+        )
+        self._trace(tracer)
+        tracer.shutdown()
+
+        assert requests[0].url.path == "/v1/traces"
+        payload = json.loads(requests[0].content)
+        resource_spans = payload["resourceSpans"][0]
+        assert resource_spans["resource"]["attributes"][0]["value"] == {
+            "stringValue": "proxy"
+        }
+        assert resource_spans["scopeSpans"][0]["spans"][0]["name"] == STAGE_REQUEST
+
+    def test_create_exporter_kinds(self, tmp_path) -> None:
+        """Test exporters are created from configuration."""
+        args = {
+            "file_path": str(tmp_path / "t.jsonl"),
+            "otlp_endpoint": "http://collector:4318",
+            "service_name": "proxy",
+        }
+        assert create_exporter("none", **args) is None
+        assert isinstance(create_exporter("console", **args), ConsoleSpanExporter)
+        assert isinstance(create_exporter("file", **args), FileSpanExporter)
+        assert isinstance(create_exporter("otlp", **args), OTLPSpanExporter)
+        with pytest.raises(ValueError):
+            create_exporter("zipkin", **args)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestUpstreamPropagation:
+    """Tests for trace propagation to upstream requests."""
+
+    async def test_traceparent_forwarded(self, make_tracer, exporter, monkeypatch):
+        """Test upstream requests carry traceparent and record TTFB."""
+        import app.clients.upstream as upstream
+
+        tracer = make_tracer()
+        monkeypatch.setattr(upstream, "tracer", tracer)
+        seen = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen["traceparent"] = request.headers.get("traceparent")
+            return httpx.Response(200)
+
+        with tracer.start_span(STAGE_REQUEST) as root:
+            async with create_http_client(
+                transport=httpx.MockTransport(handler)
+            ) as client:
+                await client.get("http://upstream/v1/models")
+        tracer.shutdown()
+
+        assert seen["traceparent"] == root.traceparent()
+        names = [span.name for span in exporter.traces[0]]
+        assert STAGE_UPSTREAM_TTFB in names
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRequestTrace:
+    """Tests for the request trace recorded by the middleware."""
+
+    @pytest.fixture
+    def global_tracer(self, exporter):
+        """Export traces of the global tracer to the in-memory exporter."""
+        from app.utils.tracing import tracer
+
+        tracer.configure(exporter, sample_ratio=1.0, slow_threshold=60.0)
+        yield tracer
+        tracer.shutdown()
+
+    async def test_root_span_ends_after_stream(self, global_tracer, exporter):
+        """Test the root span covers the streamed body and pipeline stages."""
+        chunks_sent = []
+
+        async def body():
+            for chunk in (b'{"done":false}\n', b'{"done":true}\n'):
+                chunks_sent.append(chunk)
+                yield chunk
+            # Still inside the request trace while streaming
+            assert global_tracer._pending
+
+        @app.post("/api/test-trace-stream")
+        async def stream() -> StreamingResponse:
+            return StreamingResponse(body(), media_type="application/x-ndjson")
+
+        try:
+            transport = ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                response = await client.post("/api/test-trace-stream", json={})
+        finally:
+            app.router.routes = [
+                route
+                for route in app.router.routes
+                if getattr(route, "path", None) != "/api/test-trace-stream"
+            ]
+        global_tracer.shutdown()
+
+        assert response.status_code == 200
+        assert len(chunks_sent) == 2
+        (trace,) = exporter.traces
+        root = trace[-1]
+        assert root.name == STAGE_REQUEST
+        assert root.attributes["http_route"] == "/api/test-trace-stream"
+        names = [span.name for span in trace]
+        assert names[0] == STAGE_PARSE
+        assert STAGE_UPSTREAM_QUEUE in names
+        write = trace[names.index(STAGE_RESPONSE_WRITE)]
+        assert write.parent_id == root.span_id
+        assert root.end_ns >= write.end_ns
+        assert global_tracer._pending == {}
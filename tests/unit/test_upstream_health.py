@@ -0,0 +1,89 @@
+"""Unit tests for background upstream health probing."""
+
+import httpx
+import pytest
+
+from app.utils.circuit_breaker import STATE_OPEN
+from app.utils.upstream_health import UpstreamProber
+
+
+def _client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url="http://upstream/v1", transport=httpx.MockTransport(handler)
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestUpstreamProber:
+    """Tests for UpstreamProber."""
+
+    async def test_reachable_backend_is_healthy(self, fake_clock) -> None:
+        """Test any non-5xx response marks the backend healthy."""
+        prober = UpstreamProber(
+            {"upstream": _client(lambda r: httpx.Response(401))}, clock=fake_clock
+        )
+        await prober.probe_all()
+
+        assert prober.any_healthy()
+        snapshot = prober.snapshot()["upstream"]
+        assert snapshot["healthy"] is True
+        assert snapshot["breaker"] == "closed"
+        assert snapshot["latency_ms"] == 0
+
+    async def test_stale_result_is_unhealthy(self, fake_clock) -> None:
+        """Test a result older than the TTL no longer counts."""
+        prober = UpstreamProber(
+            {"upstream": _client(lambda r: httpx.Response(200))},
+            ttl=10,
+            clock=fake_clock,
+        )
+        await prober.probe_all()
+        fake_clock.now += 11
+
+        assert not prober.is_healthy("upstream")
+
+    async def test_failures_open_breaker_and_skip_probes(self, fake_clock) -> None:
+        """Test repeated failures open the breaker, pausing probes."""
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(503)
+
+        prober = UpstreamProber(
+            {"upstream": _client(handler)},
+            failure_threshold=2,
+            reset_timeout=30,
+            clock=fake_clock,
+        )
+        for _ in range(3):
+            await prober.probe_all()
+
+        assert len(calls) == 2
+        snapshot = prober.snapshot()["upstream"]
+        assert snapshot["breaker"] == STATE_OPEN
+        assert snapshot["error"] == "HTTP 503"
+        assert not prober.any_healthy()
+
+    async def test_connection_error_recorded(self, fake_clock) -> None:
+        """Test transport errors are cached as unhealthy with the error."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused", request=request)
+
+        prober = UpstreamProber({"upstream": _client(handler)}, clock=fake_clock)
+        await prober.probe_all()
+
+        assert prober.snapshot()["upstream"]["error"] == "ConnectError: refused"
+
+    async def test_start_probes_before_returning(self) -> None:
+        """Test start completes a first probe round, then probes in background."""
+        prober = UpstreamProber(
+            {"upstream": _client(lambda r: httpx.Response(200))}, interval=60
+        )
+        await prober.start()
+        try:
+            assert prober.health["upstream"].probes == 1
+        finally:
+            await prober.stop()
@@ -0,0 +1,133 @@
+"""Unit tests for startup warm-up."""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from app.clients.upstream import create_upstream_client, warm_connections
+from app.main import app, lifespan
+from app.translators.request import format_cache, tools_cache
+from app.utils import warmup
+from app.utils.lifecycle import lifecycle
+
+
+class _Deferred(BaseModel):
+    """Model with a forward reference resolved after definition."""
+
+    child: "_Child"
+
+
+class _Child(BaseModel):
+    """Forward-referenced model."""
+
+    value: int
+
+
+@pytest.mark.unit
+class TestWarmupSteps:
+    """Tests for the individual warm-up steps."""
+
+    def test_build_validators_completes_deferred_models(self) -> None:
+        """Test models with pending forward references get built."""
+        assert not _Deferred.__pydantic_complete__
+
+        assert warmup.build_validators("tests.unit") > 0
+        assert _Deferred.__pydantic_complete__
+        assert _Deferred.model_validate({"child": {"value": 1}}).child.value == 1
+
+    def test_build_openapi_caches_schema(self) -> None:
+        """Test the OpenAPI document is generated once and cached."""
+        test_app = FastAPI()
+        test_app.get("/ping")(lambda: {})
+
+        assert warmup.build_openapi(test_app) == 1
+        assert test_app.openapi_schema is not None
+
+    def test_exercise_serializers(self) -> None:
+        """Test the synthetic serialization pass produces output."""
+        assert warmup.exercise_serializers() > 0
+
+    def test_exercise_translators(self) -> None:
+        """Test a synthetic request runs through every translator uncached."""
+        tools_before, formats_before = len(tools_cache), len(format_cache)
+        assert warmup.exercise_translators() > 0
+        assert (len(tools_cache), len(format_cache)) == (tools_before, formats_before)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestUpstreamWarmup:
+    """Tests for pre-opening upstream connections."""
+
+    async def test_warm_connections_counts_responses(self) -> None:
+        """Test every answered request counts, whatever its status."""
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(401, json={"error": "unauthorized"})
+
+        client = create_upstream_client(
+            "http://upstream/v1",
+            api_key="sk-test",
+            transport=httpx.MockTransport(handler),
+        )
+        async with client:
+            assert await warm_connections(client, 3, timeout=1) == 3
+
+        assert len(seen) == 3
+        assert seen[0].url.path == "/v1/models"
+        assert seen[0].headers["Authorization"] == "Bearer sk-test"
+
+    async def test_warm_connections_tolerates_failures(self) -> None:
+        """Test connection errors are not counted and not raised."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused", request=request)
+
+        client = create_upstream_client(
+            "http://upstream/v1", transport=httpx.MockTransport(handler)
+        )
+        async with client:
+            assert await warm_connections(client, 2, timeout=1) == 0
+
+    async def test_run_warmup_reports_failed_steps(self, monkeypatch) -> None:
+        """Test a failing step is logged and the rest still run."""
+
+        def broken() -> int:
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(warmup, "exercise_serializers", broken)
+        results = await warmup.run_warmup(FastAPI())
+
+        assert results["serializers"]["result"] is None
+        assert results["openapi"]["result"] == 0
+        assert results["translators"]["result"] > 0
+        assert results["upstream_connections"]["result"] == 0
+
+    async def test_lifespan_ready_only_after_warmup(
+        self, monkeypatch, configure_settings
+    ) -> None:
+        """Test readiness is reported once warm-up has finished."""
+        ready_during_warmup = []
+
+        async def fake_warmup(*args, **kwargs):
+            ready_during_warmup.append(lifecycle.ready)
+            return {}
+
+        async def no_probe(self) -> None:
+            pass
+
+        monkeypatch.setattr("app.main.run_warmup", fake_warmup)
+        monkeypatch.setattr("app.main.UpstreamProber.start", no_probe)
+        configure_settings(drain_timeout=0)
+        state = (lifecycle.ready, lifecycle.draining)
+        lifecycle.ready = False
+        try:
+            async with lifespan(app):
+                assert ready_during_warmup == [False]
+                assert lifecycle.ready
+                assert isinstance(app.state.upstream_client, httpx.AsyncClient)
+        finally:
+            lifecycle.ready, lifecycle.draining = state